@@ -1,15 +1,36 @@
-import ctranslate2
+import asyncio
 import os
-import requests
-import sentencepiece as spm
 import shutil
-from huggingface_hub import hf_hub_download
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import partial
 from ovos_plugin_manager.templates.language import LanguageTranslator
 from ovos_utils import classproperty
 from ovos_utils.log import LOG
 from ovos_utils.xdg_utils import xdg_data_home
-from typing import Union, List, Set
-from zipfile import ZipFile
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, Iterator, Union, List, Optional, TextIO, Tuple
+
+from ovos_translate_plugin_nllb.autotune import load_profile
+from ovos_translate_plugin_nllb.batching import BatchScheduler
+from ovos_translate_plugin_nllb.cache import CacheKey, DiskCache, TranslationCache
+from ovos_translate_plugin_nllb.document import DocumentTranslator
+from ovos_translate_plugin_nllb.download import download_file, install_archive, install_lock
+from ovos_translate_plugin_nllb.languages import LANG_MAP, LanguageResolver
+from ovos_translate_plugin_nllb.manifest import check_manifest, load_manifest, write_manifest
+from ovos_translate_plugin_nllb.markup import MarkupTranslator
+from ovos_translate_plugin_nllb.memory import current_rss_mb, release_memory
+from ovos_translate_plugin_nllb.metrics import NO_SPAN, Metrics, instrumented
+from ovos_translate_plugin_nllb.pretranslate import PretranslatedStore
+from ovos_translate_plugin_nllb.registry import MODEL_REGISTRY
+from ovos_translate_plugin_nllb.translation_memory import TranslationMemory
+from ovos_translate_plugin_nllb.vmap import load_vocab, vmap_model, vocab_path
+
+if TYPE_CHECKING:
+    # imported when a model is loaded, listing the plugin must stay cheap
+    import ctranslate2
+    import sentencepiece as spm
 
 
 class NLLB200Translator(LanguageTranslator):
@@ -25,326 +46,748 @@ class NLLB200Translator(LanguageTranslator):
         "nllb-200-3.3B-int8": f"{__base_url}/nllb-200_3.3B_int8_ct2.zip",
         "flores200_sacrebleu_tokenizer_spm": f"{__base_url}/flores200_sacrebleu_tokenizer_spm.model"
     }
+    # files of a CTranslate2 model, the vocabulary is json or txt depending on the converter version
+    CT2_MODEL_FILES = ["config.json", "model.bin", "shared_vocabulary.*", "source_vocabulary.*",
+                       "target_vocabulary.*"]
     HF_MODELS = {
         "nllb-200-distilled-1.3B-ct2-int8": "OpenNMT/nllb-200-distilled-1.3B-ct2-int8",
         "nllb-200-3.3B-ct2-int8": "OpenNMT/nllb-200-3.3B-ct2-int8"
     }
-    # convert BCP 47 to primary language subtag
-    LANG_MAP = {
-        "ace_Arab": "ace",
-        "ace_Latn": "ace",
-        "acm_Arab": "acm",
-        "acq_Arab": "acq",
-        "aeb_Arab": "aeb",
-        "afr_Latn": "af",
-        "ajp_Arab": "ajp",
-        "aka_Latn": "ak",
-        "amh_Ethi": "am",
-        "apc_Arab": "apc",
-        "arb_Arab": "ar",
-        "ars_Arab": "ars",
-        "ary_Arab": "ary",
-        "arz_Arab": "arz",
-        "asm_Beng": "as",
-        "ast_Latn": "ast",
-        "awa_Deva": "awa",
-        "ayr_Latn": "ayr",
-        "azb_Arab": "azb",
-        "azj_Latn": "az",
-        "bak_Cyrl": "ba",
-        "bam_Latn": "bm",
-        "ban_Latn": "ban",
-        "bel_Cyrl": "be",
-        "bem_Latn": "bem",
-        "ben_Beng": "bn",
-        "bho_Deva": "bho",
-        "bjn_Arab": "bjn",
-        "bjn_Latn": "bjn",
-        "bod_Tibt": "bo",
-        "bos_Latn": "bs",
-        "bug_Latn": "bug",
-        "bul_Cyrl": "bg",
-        "cat_Latn": "ca",
-        "ceb_Latn": "ceb",
-        "ces_Latn": "cs",
-        "cjk_Latn": "cjk",
-        "ckb_Arab": "ckb",
-        "crh_Latn": "crh",
-        "cym_Latn": "cy",
-        "dan_Latn": "da",
-        "deu_Latn": "de",
-        "dik_Latn": "dik",
-        "dyu_Latn": "dyu",
-        "dzo_Tibt": "dz",
-        "ell_Grek": "el",
-        "eng_Latn": "en",
-        "epo_Latn": "eo",
-        "est_Latn": "et",
-        "eus_Latn": "eu",
-        "ewe_Latn": "ee",
-        "fao_Latn": "fo",
-        "pes_Arab": "pes",
-        "fij_Latn": "fj",
-        "fin_Latn": "fi",
-        "fon_Latn": "fon",
-        "fra_Latn": "fr",
-        "fur_Latn": "fur",
-        "fuv_Latn": "fuv",
-        "gla_Latn": "gd",
-        "gle_Latn": "ga",
-        "glg_Latn": "gl",
-        "grn_Latn": "gn",
-        "guj_Gujr": "gu",
-        "hat_Latn": "ht",
-        "hau_Latn": "ha",
-        "heb_Hebr": "he",
-        "hin_Deva": "hi",
-        "hne_Deva": "hne",
-        "hrv_Latn": "hr",
-        "hun_Latn": "hu",
-        "hye_Armn": "hy",
-        "ibo_Latn": "ig",
-        "ilo_Latn": "ilo",
-        "ind_Latn": "id",
-        "isl_Latn": "is",
-        "ita_Latn": "it",
-        "jav_Latn": "jv",
-        "jpn_Jpan": "ja",
-        "kab_Latn": "kab",
-        "kac_Latn": "kac",
-        "kam_Latn": "kam",
-        "kan_Knda": "kn",
-        "kas_Arab": "kas",
-        "kas_Deva": "ks",
-        "kat_Geor": "ka",
-        "knc_Arab": "knc",
-        "knc_Latn": "knc",
-        "kaz_Cyrl": "kk",
-        "kbp_Latn": "kbp",
-        "kea_Latn": "kea",
-        "khm_Khmr": "km",
-        "kik_Latn": "ki",
-        "kin_Latn": "rw",
-        "kir_Cyrl": "ky",
-        "kmb_Latn": "kmb",
-        "kon_Latn": "kg",
-        "kor_Hang": "ko",
-        "kmr_Latn": "kmr",
-        "lao_Laoo": "lo",
-        "lvs_Latn": "lv",
-        "lij_Latn": "lij",
-        "lim_Latn": "li",
-        "lin_Latn": "ln",
-        "lit_Latn": "lt",
-        "lmo_Latn": "lmo",
-        "ltg_Latn": "ltg",
-        "ltz_Latn": "lb",
-        "lua_Latn": "lua",
-        "lug_Latn": "lg",
-        "luo_Latn": "luo",
-        "lus_Latn": "lus",
-        "mag_Deva": "mag",
-        "mai_Deva": "mai",
-        "mal_Mlym": "ml",
-        "mar_Deva": "mr",
-        "min_Latn": "min",
-        "mkd_Cyrl": "mk",
-        "plt_Latn": "plt",
-        "mlt_Latn": "mt",
-        "mni_Beng": "mni",
-        "khk_Cyrl": "khk",
-        "mos_Latn": "mos",
-        "mri_Latn": "mi",
-        "zsm_Latn": "zsm",
-        "mya_Mymr": "my",
-        "nld_Latn": "nl",
-        "nno_Latn": "nn",
-        "nob_Latn": "nb",
-        "npi_Deva": "npi",
-        "nso_Latn": "nso",
-        "nus_Latn": "nus",
-        "nya_Latn": "ny",
-        "oci_Latn": "oc",
-        "gaz_Latn": "gaz",
-        "ory_Orya": "or",
-        "pag_Latn": "pag",
-        "pan_Guru": "pa",
-        "pap_Latn": "pap",
-        "pol_Latn": "pl",
-        "por_Latn": "pt",
-        "prs_Arab": "prs",
-        "pbt_Arab": "pbt",
-        "quy_Latn": "quy",
-        "ron_Latn": "ro",
-        "run_Latn": "rn",
-        "rus_Cyrl": "ru",
-        "sag_Latn": "sg",
-        "san_Deva": "sa",
-        "sat_Beng": "sat",
-        "scn_Latn": "scn",
-        "shn_Mymr": "shn",
-        "sin_Sinh": "si",
-        "slk_Latn": "sk",
-        "slv_Latn": "sl",
-        "smo_Latn": "sm",
-        "sna_Latn": "sn",
-        "snd_Arab": "sd",
-        "som_Latn": "so",
-        "sot_Latn": "st",
-        "spa_Latn": "es",
-        "als_Latn": "gsw",
-        "srd_Latn": "sc",
-        "srp_Cyrl": "sr",
-        "ssw_Latn": "ss",
-        "sun_Latn": "su",
-        "swe_Latn": "sv",
-        "swh_Latn": "sw",
-        "szl_Latn": "szl",
-        "tam_Taml": "ta",
-        "tat_Cyrl": "tt",
-        "tel_Telu": "te",
-        "tgk_Cyrl": "tg",
-        "tgl_Latn": "tl",
-        "tha_Thai": "th",
-        "tir_Ethi": "ti",
-        "taq_Latn": "taq",
-        "taq_Tfng": "taq",
-        "tpi_Latn": "tpi",
-        "tsn_Latn": "tn",
-        "tso_Latn": "ts",
-        "tuk_Latn": "tk",
-        "tum_Latn": "tum",
-        "tur_Latn": "tr",
-        "twi_Latn": "tw",
-        "tzm_Tfng": "tzm",
-        "uig_Arab": "ug",
-        "ukr_Cyrl": "uk",
-        "umb_Latn": "umb",
-        "urd_Arab": "ur",
-        "uzn_Latn": "uz",
-        "vec_Latn": "vec",
-        "vie_Latn": "vi",
-        "war_Latn": "war",
-        "wol_Latn": "wo",
-        "xho_Latn": "xh",
-        "ydd_Hebr": "yi",
-        "yor_Latn": "yo",
-        "yue_Hant": "yue",
-        "zho_Hans": "zh",
-        "zho_Hant": "zh",
-        "zul_Latn": "zu"
-    }
+    # NLLB code -> primary language subtag, kept in the lightweight languages module
+    LANG_MAP = LANG_MAP
+    # built once, resolving a code is a dict lookup after the first time it is seen
+    LANGUAGES = LanguageResolver(LANG_MAP)
 
     def __init__(self, *args, **kwargs):
         """
         Initialize the NLLB200Translator with the specified configuration.
         """
         super().__init__(*args, **kwargs)
-        model = self.config.get("model", "nllb-200_600M_int8")
-        tokenizer = self.config.get("tokenizer", "flores200_sacrebleu_tokenizer_spm")
+        self.model = self.config.get("model", "nllb-200_600M_int8")
+        self.tokenizer = self.config.get("tokenizer", "flores200_sacrebleu_tokenizer_spm")
 
-        self.ct_model_path = self.download(model)
-        self.sp_model_path = self.download_tokenizer(tokenizer)
+        if self.config.get("tuned_profile", False):
+            # settings written by `ovos-nllb-autotune`, explicit config wins
+            self.config = {**load_profile(self.model), **self.config}
         self.beam_size = self.config.get("beam_size", 4)
         self.device = self.config.get("device", "cpu")
-        # Load the source SentecePiece model
-        self.sp = spm.SentencePieceProcessor()
-        self.sp.load(self.sp_model_path)
+        self.device_index = self.config.get("device_index", 0)
+        self.compute_type = self.config.get("compute_type", "default")
+        self.batch_type = self.config.get("batch_type", "tokens")
+        self.max_batch_size = self.config.get("max_batch_size", 2024)
+        self.max_decoding_length = self.config.get("max_decoding_length", 256)
+        self.length_penalty = self.config.get("length_penalty", 1)
+
+        # identifies this model and decoding setup in cache keys, known without loading the model
+        self._cache_model = os.path.realpath(self.model) if os.path.isdir(self.model) else self.model
+        self._cache_tokenizer = os.path.realpath(self.tokenizer) if os.path.isfile(self.tokenizer) \
+            else self.tokenizer
+        self._cache_vmap = ",".join(sorted(self.config.get("vmap_languages") or []))
+
+        # the model is loaded by _load_model, either now, on first use ("lazy_load")
+        # or in a background thread ("background_load")
+        self._ct_model_path: Optional[str] = None
+        self._sp_model_path: Optional[str] = None
+        self._sp: Optional["spm.SentencePieceProcessor"] = None
+        self._translator: Optional["ctranslate2.Translator"] = None
+        self._model_key: Optional[tuple] = None  # MODEL_REGISTRY key, when sharing the model
+        self._releases: List[weakref.finalize] = []  # hand the MODEL_REGISTRY references back
+        self._vmap_langs: FrozenSet[str] = frozenset()  # target languages covered by the vocabulary map
+        self._load_lock = threading.RLock()
+        self._ready = threading.Event()
+        self._loader: Optional[threading.Thread] = None  # the "background_load" thread
+
+        # optionally free the model after `idle_timeout` seconds without translations
+        self.idle_timeout = self.config.get("idle_timeout", 0)
+        self.unload_to_cpu = self.config.get("unload_to_cpu", False)
+        self.memory_budget_mb = self.config.get("memory_budget_mb", 0)
+        self._in_flight = 0
+        self._last_used = time.monotonic()
+        self._stop_idle_monitor = threading.Event()
+
+        # optionally merge concurrent translate() calls into shared batches
+        self.scheduler: Optional[BatchScheduler] = None
+        if self.config.get("micro_batching", False):
+            # a weak reference, the scheduler thread must not keep the translator alive
+            translate_fn = partial(self._weak_translate_batch, weakref.WeakMethod(self._translate_batch))
+            self.scheduler = BatchScheduler(translate_fn,
+                                            max_wait_ms=self.config.get("batch_max_wait_ms", 5),
+                                            max_batch_tokens=self.config.get("batch_max_tokens", 2024))
+            weakref.finalize(self, self.scheduler.shutdown, False)
+
+        # optionally remember finished translations, see `cache.stats` for hit/miss counters
+        self.cache: Optional[TranslationCache] = None
+        if self.config.get("cache", False):
+            disk = None
+            if self.config.get("cache_persistent", False):
+                disk = DiskCache(self.config.get("cache_path"),
+                                 max_entries=self.config.get("cache_max_disk_entries", 0),
+                                 max_bytes=self.config.get("cache_max_disk_bytes", 64 * 1024 * 1024))
+            self.cache = TranslationCache(max_entries=self.config.get("cache_max_entries", 1024),
+                                          max_bytes=self.config.get("cache_max_bytes", 4 * 1024 * 1024),
+                                          disk=disk)
+
+        # optionally reuse translations of near duplicates, eg. the same sentence with another number
+        self.memory: Optional[TranslationMemory] = None
+        if self.config.get("translation_memory", False):
+            self.memory = TranslationMemory(threshold=self.config.get("tm_threshold", 1.0),
+                                            max_entries=self.config.get("tm_max_entries", 10000),
+                                            mask_entities=self.config.get("tm_mask_entities", True))
+
+        # sentences translated ahead of time by `ovos-nllb-pretranslate`, consulted before the cache
+        self.pretranslated: Optional[PretranslatedStore] = None
+        if self.config.get("pretranslated_path"):
+            try:
+                self.pretranslated = PretranslatedStore(self.config["pretranslated_path"])
+            except FileNotFoundError as e:
+                LOG.warning(str(e))
+
+        # optionally time every stage of a translation, see `metrics.summary()`
+        self.metrics: Optional[Metrics] = None
+        if self.config.get("metrics", False):
+            self.metrics = Metrics(window=self.config.get("metrics_window", 2048))
+            # stop the log thread and free the port even if shutdown() is never called
+            weakref.finalize(self, self.metrics.close)
+            if self.config.get("metrics_log_interval", 0):
+                self.metrics.start_log_summaries(self.config["metrics_log_interval"])
+            if self.config.get("metrics_port"):
+                self.metrics.start_prometheus_server(self.config["metrics_port"])
+
+        if self.config.get("background_load", False):
+            self._loader = threading.Thread(target=self._ensure_loaded, daemon=True, name="nllb-warmup")
+            self._loader.start()
+        elif not self.config.get("lazy_load", False):
+            self._ensure_loaded()
+        if self.idle_timeout:
+            threading.Thread(target=self._idle_monitor, daemon=True, name="nllb-idle-monitor",
+                             args=(weakref.ref(self), min(self.idle_timeout, 10), self._stop_idle_monitor)).start()
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the model is loaded (and warmed up) and translations will not wait for it.
+        """
+        return self._ready.is_set()
+
+    @property
+    def loading(self) -> bool:
+        """
+        Whether the initial "background_load" is still running. A lazy or idle unloaded model is not
+        loading, the next translation loads it.
+        """
+        return self._loader is not None and self._loader.is_alive()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the model is loaded.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait. Defaults to waiting forever.
+
+        Returns:
+            bool: True if the model is ready.
+        """
+        return self._ready.wait(timeout)
+
+    def _ensure_loaded(self):
+        """
+        Load the model if needed, callers arriving during a load wait for it to finish.
+        """
+        if self._ready.is_set():
+            return
+        self.load()
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the model weights are currently in memory.
+        """
+        return self._translator is not None and self._translator.model_is_loaded
 
-        self.translator = ctranslate2.Translator(self.ct_model_path, self.device)
+    def load(self):
+        """
+        Load the model, or reload it after `unload`.
+        """
+        with self._load_lock:
+            if self._translator is None:
+                self._load_model()
+            elif not self._translator.model_is_loaded:
+                start = time.monotonic()
+                self._translator.load_model()
+                self._ready.set()
+                LOG.debug(f"NLLB model reloaded in {time.monotonic() - start:.2f}s")
+            else:
+                # a failed unload, or reloaded by another instance sharing the model
+                self._ready.set()
+
+    def unload(self, to_cpu: Optional[bool] = None) -> Dict[str, float]:
+        """
+        Free the model weights, the next translation reloads them transparently.
+
+        Args:
+            to_cpu (bool, optional): Move the weights to CPU memory instead of freeing them,
+                only meaningful on GPU devices. Defaults to the `unload_to_cpu` setting.
+
+        Returns:
+            Dict[str, float]: Process RSS in MB before and after unloading, empty if nothing was unloaded.
+        """
+        with self._load_lock:
+            if not self.is_loaded:
+                return {}
+            if self._in_flight:
+                LOG.debug("Not unloading NLLB model, translations in progress")
+                return {}
+            if self._model_key is not None and MODEL_REGISTRY.refcount(self._model_key) > 1:
+                LOG.debug("Not unloading NLLB model, it is shared with other instances")
+                return {}
+            to_cpu = self.unload_to_cpu if to_cpu is None else to_cpu
+            rss_before = current_rss_mb()
+            self._translator.unload_model(to_cpu=to_cpu and self.device != "cpu")
+            if self._translator.model_is_loaded:
+                # ctranslate2 skips the unload while its workers still hold the model
+                LOG.debug("NLLB model was not unloaded, still in use by ctranslate2")
+                return {}
+            self._ready.clear()
+            release_memory()
+            rss_after = current_rss_mb()
+        LOG.info(f"NLLB model unloaded, RSS {rss_before:.0f}MB -> {rss_after:.0f}MB")
+        return {"rss_before_mb": rss_before, "rss_after_mb": rss_after}
+
+    @contextmanager
+    def _use_model(self) -> Iterator["ctranslate2.Translator"]:
+        """
+        Give access to the loaded model, keeping it from being unloaded while in use.
+        """
+        with self._load_lock:
+            if not self.is_loaded:
+                # never loaded, unloaded by us or by another instance sharing the model
+                self.load()
+            self._in_flight += 1
+        try:
+            yield self._translator
+        finally:
+            with self._load_lock:
+                self._in_flight -= 1
+                self._last_used = time.monotonic()
+
+    def _check_idle(self):
+        """
+        Unload the model once it was idle for `idle_timeout` seconds and, if set,
+        the process uses more than `memory_budget_mb`.
+        """
+        if not self.is_loaded or self._in_flight:
+            return
+        if time.monotonic() - self._last_used < self.idle_timeout:
+            return
+        if self.memory_budget_mb and current_rss_mb() <= self.memory_budget_mb:
+            return
+        self.unload()
 
     @staticmethod
-    def _download_file(url: str, local_filename: str) -> str:
+    def _idle_monitor(ref: "weakref.ref[NLLB200Translator]", interval: float, stop: threading.Event):
+        # only holds a weak reference, so the monitor does not keep the translator alive
+        while not stop.wait(interval):
+            translator = ref()
+            if translator is None:
+                return
+            translator._check_idle()
+            del translator
+
+    @staticmethod
+    def _weak_translate_batch(method: "weakref.WeakMethod", source: List[List[str]],
+                              target_prefix: List[List[str]]) -> List[List[str]]:
+        translate_batch = method()
+        if translate_batch is None:
+            raise RuntimeError("NLLB200Translator has been garbage collected")
+        return translate_batch(source, target_prefix)
+
+    def shutdown(self):
+        """
+        Stop the batching scheduler, the idle monitor and the metrics sinks and free the model,
+        or hand it back to the other instances sharing it. The instance must not be used afterwards.
+        """
+        self._stop_idle_monitor.set()
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        with self._load_lock:
+            self._ready.clear()
+            self._translator = self._sp = None
+            self._model_key = None
+            for release in self._releases:
+                release()
+            self._releases = []
+        if self.cache is not None and self.cache.disk is not None:
+            self.cache.disk.close()
+        if self.metrics is not None:
+            self.metrics.close()
+
+    def __enter__(self) -> "NLLB200Translator":
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def _load_model(self):
+        """
+        Download and load the tokenizer and the CTranslate2 model, then optionally warm them up.
+        """
+        start = time.monotonic()
+        offline = self.config.get("offline", False)
+        self._ct_model_path = self.download(self.model,
+                                            sha256=self.config.get("model_sha256"),
+                                            connections=self.config.get("download_connections", 4),
+                                            stream=self.config.get("stream_download"),
+                                            offline=offline,
+                                            verify=self.config.get("verify_model", False))
+        self._sp_model_path = self.download_tokenizer(self.tokenizer, offline=offline)
+        if self.config.get("vmap_languages"):
+            self._ct_model_path, self._vmap_langs = self._vmap_model(self._ct_model_path,
+                                                                     self.config["vmap_languages"])
+        inter_threads = self.config.get("inter_threads", 1)
+        intra_threads = self.config.get("intra_threads", 0)
+        max_queued_batches = self.config.get("max_queued_batches", 0)
+
+        def load_sp() -> "spm.SentencePieceProcessor":
+            import sentencepiece as spm
+            # Load the source SentecePiece model
+            sp = spm.SentencePieceProcessor()
+            sp.load(self._sp_model_path)
+            return sp
+
+        def load_translator() -> "ctranslate2.Translator":
+            import ctranslate2
+            return ctranslate2.Translator(self._ct_model_path, self.device,
+                                          device_index=self.device_index,
+                                          compute_type=self.compute_type,
+                                          inter_threads=inter_threads,
+                                          intra_threads=intra_threads,
+                                          max_queued_batches=max_queued_batches)
+
+        if self.config.get("share_model", True):
+            # other instances in this process using the same weights share them
+            sp_key = ("tokenizer", os.path.realpath(self._sp_model_path))
+            model_key = ("translator", os.path.realpath(self._ct_model_path), self.device,
+                         str(self.device_index), self.compute_type,
+                         inter_threads, intra_threads, max_queued_batches)
+            sp = MODEL_REGISTRY.acquire(sp_key, load_sp)
+            try:
+                translator = MODEL_REGISTRY.acquire(model_key, load_translator)
+            except Exception:
+                MODEL_REGISTRY.release(sp_key)
+                raise
+            self._sp, self._translator = sp, translator
+            self._model_key = model_key
+            # hand the references back on shutdown() or once this instance is garbage collected
+            self._releases += [weakref.finalize(self, MODEL_REGISTRY.release, sp_key),
+                               weakref.finalize(self, MODEL_REGISTRY.release, model_key)]
+        else:
+            self._sp = load_sp()
+            self._translator = load_translator()
+        if self.config.get("warmup", self.config.get("background_load", False)):
+            # prime allocators and thread pools so the first real request is not slower
+            self._translate_batch(self._encode(["Hello world"], "eng_Latn"), [["spa_Latn"]])
+        self._ready.set()
+        LOG.debug(f"NLLB model loaded in {time.monotonic() - start:.2f}s")
+
+    @property
+    def ct_model_path(self) -> str:
+        self._ensure_loaded()
+        return self._ct_model_path
+
+    @property
+    def sp_model_path(self) -> str:
+        self._ensure_loaded()
+        return self._sp_model_path
+
+    @property
+    def sp(self) -> "spm.SentencePieceProcessor":
+        self._ensure_loaded()
+        return self._sp
+
+    @property
+    def translator(self) -> "ctranslate2.Translator":
+        self._ensure_loaded()
+        return self._translator
+
+    @staticmethod
+    def _download_file(url: str, local_filename: str, sha256: Optional[str] = None, connections: int = 4) -> str:
         """
         Download a file from a given URL and save it locally.
 
+        Large files are fetched with parallel range requests and interrupted downloads are resumed.
+
         Args:
             url (str): The URL of the file to download.
             local_filename (str): The local path where the file should be saved.
+            sha256 (str, optional): Expected hex digest of the file. Defaults to None.
+            connections (int, optional): Maximum number of concurrent range requests. Defaults to 4.
 
         Returns:
             str: The local file path of the downloaded file.
         """
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with open(local_filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        return local_filename
+        return download_file(url, local_filename, sha256=sha256, connections=connections)
 
     @classmethod
-    def _download_from_hf(cls, repo_id: str) -> str:
-        if "facebook" in cls.HF_MODELS[repo_id]:
-            files = ["config.json", "shared_vocabulary.json", "model.bin"]
-        for f in files:
-            p = hf_hub_download(repo_id=cls.HF_MODELS[repo_id], filename=f)
-            model = os.path.dirname(p)
-        return model
+    def _download_from_hf(cls, repo_id: str, offline: bool = False, force: bool = False) -> str:
+        """
+        Download the CTranslate2 files of a model hosted on the HuggingFace Hub.
+
+        Args:
+            repo_id (str): Key of the model in `HF_MODELS`.
+            offline (bool, optional): Only use the local HuggingFace cache. Defaults to False.
+            force (bool, optional): Download again even if cached. Defaults to False.
+
+        Returns:
+            str: Path to the downloaded model.
+        """
+        from huggingface_hub import snapshot_download
+        from huggingface_hub.utils import LocalEntryNotFoundError
+        try:
+            return snapshot_download(repo_id=cls.HF_MODELS[repo_id], allow_patterns=cls.CT2_MODEL_FILES,
+                                     local_files_only=offline, force_download=force)
+        except LocalEntryNotFoundError as e:
+            raise FileNotFoundError(f"Model {repo_id} is not cached and offline mode is enabled") from e
 
     @classmethod
-    def download_tokenizer(cls, tokenizer: str = "flores200_sacrebleu_tokenizer_spm") -> str:
+    def download_tokenizer(cls, tokenizer: str = "flores200_sacrebleu_tokenizer_spm", offline: bool = False) -> str:
         """
         Download and extract the specified tokenizer.
 
         Args:
-            tokenizer (str, optional): The tokenizer to download. Defaults to "flores200_sacrebleu_tokenizer_spm".
+            tokenizer (str, optional): The tokenizer to download, or the path of a local SentencePiece model.
+                Defaults to "flores200_sacrebleu_tokenizer_spm".
+            offline (bool, optional): Fail instead of downloading a missing tokenizer. Defaults to False.
 
         Returns:
             str: Path to the downloaded model.
         """
+        if os.path.isfile(tokenizer):
+            return tokenizer
         base_path = f"{xdg_data_home()}/ctranslate2"
         os.makedirs(base_path, exist_ok=True)
         tokenizer_path = f"{base_path}/{tokenizer}.model"
         if not os.path.isfile(tokenizer_path):
-            cls._download_file(cls.MODEL_URLS[tokenizer], tokenizer_path)
+            if offline:
+                raise FileNotFoundError(f"Tokenizer {tokenizer} is not installed and offline mode is enabled")
+            with install_lock(f"{base_path}/.{tokenizer}"):
+                # another process may have finished the download while we waited
+                if not os.path.isfile(tokenizer_path):
+                    cls._download_file(cls.MODEL_URLS[tokenizer], tokenizer_path)
         return tokenizer_path
 
     @classmethod
-    def download(cls, model: str = "nllb-200_600M_int8") -> str:
+    def download(cls, model: str = "nllb-200_600M_int8", sha256: Optional[str] = None,
+                 connections: int = 4, stream: Optional[bool] = None,
+                 offline: bool = False, verify: bool = False) -> str:
         """
         Download and extract the specified model.
 
+        Installed models are found through their manifest without any network access.
+        The install is atomic and locked, concurrent processes wait for a single download.
+
         Args:
-            model (str, optional): The model to download. Defaults to "nllb-200_600M_int8".
+            model (str, optional): The model to download, a local model directory or the URL of a zipped model.
+                Defaults to "nllb-200_600M_int8".
+            sha256 (str, optional): Expected hex digest of the zip archive. Defaults to None.
+            connections (int, optional): Maximum number of concurrent range requests. Defaults to 4.
+            stream (bool, optional): Extract while downloading instead of storing the archive first, halving
+                peak disk use but without resume. Defaults to None, only when disk space is short.
+            offline (bool, optional): Fail instead of downloading a missing model. Defaults to False.
+            verify (bool, optional): Check the hashes of the installed files, not only their sizes. Defaults to False.
 
         Returns:
             str: Path to the downloaded model.
         """
-        base_path = f"{xdg_data_home()}/ctranslate2"
-        os.makedirs(base_path, exist_ok=True)
+        if os.path.isdir(model):
+            return model
+        name = model.split("/")[-1].rsplit(".zip", 1)[0] if model.startswith("http") else model
 
-        model_path = model if os.path.isdir(model) else f"{base_path}/{model}"
+        manifest = load_manifest(name)
+        corrupted = False
+        if manifest is not None:
+            if check_manifest(manifest, full=verify):
+                return manifest["path"]
+            LOG.warning(f"Installed model {name} does not match its manifest, reinstalling")
+            corrupted = True
+        if offline and corrupted:
+            raise FileNotFoundError(f"Model {name} is corrupted and offline mode is enabled")
 
         if model in cls.HF_MODELS:
-            model_path = cls._download_from_hf(model)
+            model_path = cls._download_from_hf(model, offline=offline, force=corrupted)
+            write_manifest(name, model_path, source=f"https://huggingface.co/{cls.HF_MODELS[model]}")
             return model_path
 
-        if not os.path.isdir(model_path):
-            if model_path.startswith("http"):
-                url = model_path
-            else:
-                url = cls.MODEL_URLS[model]
-
-            zipped = f"{base_path}/{url.split('/')[-1]}"
-            if not os.path.isfile(zipped):
-                LOG.info(f"Downloading {url}")
-                cls._download_file(url, zipped)
-
-            with ZipFile(zipped, 'r') as z:
-                tmp = f"{base_path}/.extracted"
-                LOG.debug(f"Unzipping downloaded model to {model_path}")
-                # Extracting all the members of the zip
-                # into a specific location.
-                z.extractall(path=tmp)
-                dl_path = f"{tmp}/{os.listdir(tmp)[0]}"
-                shutil.move(dl_path, model_path)
-                shutil.rmtree(tmp)
-
-            LOG.debug(f"Deleting temporary zip file: {zipped}")
-            os.remove(zipped)
+        base_path = f"{xdg_data_home()}/ctranslate2"
+        os.makedirs(base_path, exist_ok=True)
+        url = model if model.startswith("http") else cls.MODEL_URLS[model]
+        model_path = f"{base_path}/{name}"
 
+        if corrupted:
+            shutil.rmtree(model_path, ignore_errors=True)
+        if not os.path.isdir(model_path):
+            if offline:
+                raise FileNotFoundError(f"Model {name} is not installed and offline mode is enabled")
+            install_archive(url, model_path, sha256=sha256, connections=connections, stream=stream)
+        # also covers models installed before manifests existed
+        write_manifest(name, model_path, source=url)
         return model_path
 
+    def _vmap_model(self, model_path: str, languages: List[str]) -> Tuple[str, FrozenSet[str]]:
+        """
+        View of the model restricted to the vocabularies of the given target languages.
+
+        Args:
+            model_path (str): The CTranslate2 model directory.
+            languages (List[str]): Target language codes with a vocabulary written by `ovos-nllb-vmap`.
+
+        Returns:
+            Tuple[str, FrozenSet[str]]: The model directory to load and the NLLB codes its vocabulary map covers,
+                the unchanged model and no codes if a vocabulary is missing.
+        """
+        tokens, codes = set(), set()
+        for lang in languages:
+            flores = self.LANGUAGES.resolve(lang)
+            path = vocab_path(flores, self.config.get("vmap_dir")) if flores else ""
+            if not os.path.isfile(path):
+                LOG.warning(f"No vocabulary for {lang}, run `ovos-nllb-vmap {lang}`. Using the full vocabulary")
+                return model_path, frozenset()
+            tokens |= load_vocab(path)
+            codes.add(flores)
+        return vmap_model(model_path, tokens), frozenset(codes)
+
+    def _use_vmap(self, tgt_langs: Iterable[str]) -> bool:
+        """
+        Whether the vocabulary map holds the tokens of every target language of a batch.
+        """
+        return bool(self._vmap_langs) and all(lang in self._vmap_langs for lang in tgt_langs)
+
+    def _translate_batch(self, source: List[List[str]], target_prefix: List[List[str]],
+                         max_batch_tokens: Optional[int] = None) -> List[List[str]]:
+        """
+        Run subworded sentences through the CTranslate2 model.
+
+        Args:
+            source (List[List[str]]): The subworded source sentences, ending with the source language token.
+            target_prefix (List[List[str]]): The target language prefix of each sentence.
+            max_batch_tokens (int, optional): Source tokens per batch CTranslate2 splits the input into.
+                Defaults to `max_batch_size` and `batch_type`.
+
+        Returns:
+            List[List[str]]: The best hypothesis tokens of each sentence.
+        """
+        options = self._translate_options()
+        if max_batch_tokens:
+            options.update(max_batch_size=max_batch_tokens, batch_type="tokens")
+        with self._use_model() as translator:
+            with self._span("translate_batch"):
+                results = translator.translate_batch(
+                    source,
+                    target_prefix=target_prefix,
+                    use_vmap=self._use_vmap(prefix[0] for prefix in target_prefix),
+                    **options
+                )
+        hypotheses = [translation.hypotheses[0] for translation in results]
+        if self.metrics is not None:
+            self.metrics.add_batch(len(source), sum(len(s) for s in source), sum(len(h) for h in hypotheses))
+        return hypotheses
+
+    def _span(self, stage: str):
+        """
+        Time a stage if metrics are enabled, a shared no-op context manager otherwise.
+        """
+        if self.metrics is None:
+            return NO_SPAN
+        return self.metrics.span(stage)
+
+    def _translate_options(self) -> dict:
+        """
+        Decoding options shared by every `translate_batch` call.
+        """
+        return {"batch_type": self.batch_type,
+                "max_batch_size": self.max_batch_size,
+                "beam_size": self.beam_size,
+                "max_decoding_length": self.max_decoding_length,
+                "length_penalty": self.length_penalty}
+
+    @staticmethod
+    def _per_sentence(lang: Union[str, List[str]], n: int) -> List[str]:
+        """
+        Expand a single language code into one code per sentence.
+        """
+        if isinstance(lang, str):
+            return [lang] * n
+        return lang
+
+    def _encode(self, source_sents: List[str], src_lang: Union[str, List[str]]) -> List[List[str]]:
+        """
+        Subword sentences and append the NLLB source language token.
+
+        Args:
+            source_sents (List[str]): The stripped source sentences.
+            src_lang (Union[str, List[str]]): The source NLLB language code, eg. "eng_Latn", or one code per sentence.
+
+        Returns:
+            List[List[str]]: The subworded sentences.
+        """
+        src_langs = self._per_sentence(src_lang, len(source_sents))
+        # the tokenizer stays loaded until shutdown(), and the warmup inside _load_model must not go
+        # through `sp`, whose _ensure_loaded() would mark the model ready before it finished
+        sp = self._sp if self._sp is not None else self.sp
+        with self._span("encode"):
+            source_sents_subworded = sp.encode(source_sents, out_type=str)
+        return [sent + ["</s>", lang] for sent, lang in zip(source_sents_subworded, src_langs)]
+
+    def _decode(self, translations: List[List[str]], tgt_lang: Union[str, List[str]]) -> List[str]:
+        """
+        Detokenize hypotheses and strip the target language prefix.
+
+        Args:
+            translations (List[List[str]]): The hypothesis tokens, starting with the target prefix.
+            tgt_lang (Union[str, List[str]]): The target NLLB language code, eg. "spa_Latn", or one code per sentence.
+
+        Returns:
+            List[str]: The translated sentences.
+        """
+        tgt_langs = self._per_sentence(tgt_lang, len(translations))
+        with self._span("decode"):
+            decoded = self.sp.decode(translations)
+        with self._span("strip"):
+            return [sent[len(lang):].strip() for sent, lang in zip(decoded, tgt_langs)]
+
+    def _translate_sentences(self, source_sents: List[str],
+                             src_lang: Union[str, List[str]],
+                             tgt_lang: Union[str, List[str]],
+                             max_batch_tokens: Optional[int] = None) -> List[str]:
+        """
+        Subword, translate and detokenize sentences between resolved NLLB language codes.
+
+        Identical sentences are translated once. The others go to the model in a single call,
+        CTranslate2 sorts them by length into sub-batches and spreads those over its `inter_threads` replicas.
+
+        Args:
+            source_sents (List[str]): The stripped source sentences.
+            src_lang (Union[str, List[str]]): The source NLLB language code, eg. "eng_Latn", or one code per sentence.
+            tgt_lang (Union[str, List[str]]): The target NLLB language code, eg. "spa_Latn", or one code per sentence.
+            max_batch_tokens (int, optional): Source tokens per sub-batch. Defaults to `max_batch_size`.
+
+        Returns:
+            List[str]: The translated sentences.
+        """
+        src_langs = self._per_sentence(src_lang, len(source_sents))
+        tgt_langs = self._per_sentence(tgt_lang, len(source_sents))
+        # one model input per distinct sentence and language pair, whitespace differences do not matter
+        unique: Dict[Tuple[str, str, str], int] = {}
+        positions = [unique.setdefault((" ".join(sent.split()), src, tgt), len(unique))
+                     for sent, src, tgt in zip(source_sents, src_langs, tgt_langs)]
+        keys = list(unique)
+        subworded = self._encode([sent for sent, _, _ in keys], [src for _, src, _ in keys])
+        tgt_langs = [tgt for _, _, tgt in keys]
+        hypotheses = self._run_model(subworded, [[lang] for lang in tgt_langs], max_batch_tokens)
+        translated = self._decode(hypotheses, tgt_langs)
+        return [translated[idx] for idx in positions]
+
+    def _run_model(self, source: List[List[str]], target_prefix: List[List[str]],
+                   max_batch_tokens: Optional[int] = None) -> List[List[str]]:
+        """
+        Translate subworded sentences, through the micro-batching scheduler if enabled.
+        """
+        if self.scheduler is not None:
+            return self.scheduler.translate(source, target_prefix)
+        return self._translate_batch(source, target_prefix, max_batch_tokens)
+
+    def resolve_languages(self, source: str, target: str) -> Tuple[str, str]:
+        """
+        Validate a language pair without loading the model.
+
+        Args:
+            source (str): The source language code, eg. "en-us".
+            target (str): The target language code, eg. "es".
+
+        Returns:
+            Tuple[str, str]: The NLLB source and target codes, eg. ("eng_Latn", "spa_Latn").
+
+        Raises:
+            ValueError: If the model does not support one of the languages.
+        """
+        return self._resolve_languages(source, target)
+
+    def _resolve_languages(self, source: str, target: str) -> Tuple[str, str]:
+        """
+        Convert BCP 47 codes into the NLLB codes used by the model.
+
+        Script and region subtags pick the script variant, eg. "zh-TW" -> "zho_Hant".
+
+        Args:
+            source (str): The source language code, eg. "en-us".
+            target (str): The target language code, eg. "es".
+
+        Returns:
+            Tuple[str, str]: The NLLB source and target codes, eg. ("eng_Latn", "spa_Latn").
+        """
+        with self._span("resolve"):
+            src_lang = self.LANGUAGES.resolve(source)
+            tgt_lang = self.LANGUAGES.resolve(target)
+        if not src_lang:
+            raise ValueError(f"Invalid source language: {source}")
+        if not tgt_lang:
+            raise ValueError(f"Invalid target language: {target}")
+        return src_lang, tgt_lang
+
+    def _cache_key(self, sent: str, src: str, tgt: str, beam_size: Optional[int] = None) -> CacheKey:
+        """
+        Cache key of a sentence, built from the configuration so lookups never load the model.
+        """
+        return (self._cache_model, self._cache_tokenizer, self._cache_vmap, src, tgt, self.compute_type,
+                beam_size or self.beam_size, self.max_decoding_length, self.length_penalty, sent)
+
+    def _lookup_cache(self, source_sents: List[str],
+                      src_lang: Union[str, List[str]],
+                      tgt_lang: Union[str, List[str]],
+                      beam_size: Optional[int] = None) -> Tuple[List[Optional[str]], List[int]]:
+        """
+        Look up sentences in the pretranslated store, the translation cache and the translation memory.
+
+        Args:
+            beam_size (int, optional): Beam size the cached translations were decoded with. Defaults to `beam_size`.
+
+        Returns:
+            Tuple[List[Optional[str]], List[int]]: The known translations (None for misses) and the indexes of the misses.
+        """
+        if self.cache is None and self.pretranslated is None and self.memory is None:
+            return [None] * len(source_sents), list(range(len(source_sents)))
+        src_langs = self._per_sentence(src_lang, len(source_sents))
+        tgt_langs = self._per_sentence(tgt_lang, len(source_sents))
+        translations = []
+        for sent, src, tgt in zip(source_sents, src_langs, tgt_langs):
+            tx = self.pretranslated.get(sent, src, tgt) if self.pretranslated is not None else None
+            if tx is None and self.cache is not None:
+                tx = self.cache.get(self._cache_key(sent, src, tgt, beam_size))
+            if tx is None and self.memory is not None:
+                tx = self.memory.get(sent, src, tgt)
+            translations.append(tx)
+        return translations, [idx for idx, tx in enumerate(translations) if tx is None]
+
+    def _store_translations(self, translations: List[Optional[str]], missing: List[int], translated: List[str],
+                            source_sents: List[str],
+                            src_lang: Union[str, List[str]],
+                            tgt_lang: Union[str, List[str]],
+                            beam_size: Optional[int] = None):
+        """
+        Fill the cache misses with freshly translated sentences and remember them in the cache and translation memory.
+
+        Args:
+            beam_size (int, optional): Beam size the translations were decoded with. Defaults to `beam_size`.
+        """
+        src_langs = self._per_sentence(src_lang, len(source_sents))
+        tgt_langs = self._per_sentence(tgt_lang, len(source_sents))
+        for idx, tx in zip(missing, translated):
+            translations[idx] = tx
+            if self.cache is not None:
+                self.cache.put(self._cache_key(source_sents[idx], src_langs[idx], tgt_langs[idx], beam_size), tx)
+            if self.memory is not None:
+                self.memory.put(source_sents[idx], tx, src_langs[idx], tgt_langs[idx])
+
+    @instrumented("translate")
     def translate(self, text: Union[str, List[str]], target: str = "", source: str = "") -> Union[str, List[str]]:
         """
         Translate text(s) into the target language using the NLLB200 model.
@@ -362,55 +805,263 @@ class NLLB200Translator(LanguageTranslator):
         else:
             utterances = text
 
-        mapping = {v: k for k, v in self.LANG_MAP.items()}
-        tgt_lang = target
+        src_lang, tgt_lang = self._resolve_languages(source, target)
+        source_sents = [sent.strip() for sent in utterances]
+
+        translations_desubword, missing = self._lookup_cache(source_sents, src_lang, tgt_lang)
+        if missing:
+            # only cache misses go through the model
+            translated = self._translate_sentences([source_sents[idx] for idx in missing], src_lang, tgt_lang)
+            self._store_translations(translations_desubword, missing, translated, source_sents, src_lang, tgt_lang)
+
+        if len(utterances) == 1:
+            return translations_desubword[0]
+        return translations_desubword
+
+    @instrumented("translate_many")
+    def translate_many(self, items: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Translate sentences with their own language pairs in a single batch.
+
+        NLLB encodes the source language as a token and the target language as the
+        target prefix, so mixed language pairs can share one `translate_batch` call.
+
+        Args:
+            items (List[Tuple[str, str, str]]): (text, source, target) tuples.
+
+        Returns:
+            List[str]: The translated sentences, in input order.
+        """
+        source_sents, src_langs, tgt_langs = [], [], []
+        resolved = {}
+        for text, source, target in items:
+            if (source, target) not in resolved:
+                resolved[(source, target)] = self._resolve_languages(source, target)
+            src_lang, tgt_lang = resolved[(source, target)]
+            source_sents.append(text.strip())
+            src_langs.append(src_lang)
+            tgt_langs.append(tgt_lang)
+
+        translations, missing = self._lookup_cache(source_sents, src_langs, tgt_langs)
+        if missing:
+            translated = self._translate_sentences([source_sents[idx] for idx in missing],
+                                                   [src_langs[idx] for idx in missing],
+                                                   [tgt_langs[idx] for idx in missing])
+            self._store_translations(translations, missing, translated, source_sents, src_langs, tgt_langs)
+        return translations
+
+    @instrumented("translate_to_many")
+    def translate_to_many(self, text: str, targets: List[str], source: str = "") -> Dict[str, str]:
+        """
+        Translate a sentence into several target languages in a single pass.
+
+        The sentence is subworded once and decoded in one batch with a target prefix per language.
+
+        Args:
+            text (str): The sentence to translate.
+            targets (List[str]): The target language codes.
+            source (str, optional): The source language code. Defaults to "".
+
+        Returns:
+            Dict[str, str]: The translations, keyed by the requested target codes.
+        """
+        source_sent = text.strip()
         src_lang = source
+        tgt_langs = []
+        for target in targets:
+            src_lang, tgt_lang = self._resolve_languages(source, target)
+            tgt_langs.append(tgt_lang)
 
-        if source not in self.LANG_MAP:
-            lang = mapping.get(source) or mapping.get(source.split("-")[0])
-            if not lang:
-                raise ValueError(f"Invalid source language: {source}")
-            src_lang = lang
+        source_sents = [source_sent] * len(targets)
+        translations, missing = self._lookup_cache(source_sents, src_lang, tgt_langs)
+        if missing:
+            source_sent_subworded = self._encode([source_sent], src_lang)[0]
+            missing_langs = [tgt_langs[idx] for idx in missing]
+            hypotheses = self._run_model([source_sent_subworded] * len(missing),
+                                         [[lang] for lang in missing_langs])
+            translated = self._decode(hypotheses, missing_langs)
+            self._store_translations(translations, missing, translated, source_sents, src_lang, tgt_langs)
+        return dict(zip(targets, translations))
 
-        if target not in self.LANG_MAP:
-            lang = mapping.get(target) or mapping.get(target.split("-")[0])
-            if not lang:
-                raise ValueError(f"Invalid target language: {target}")
-            tgt_lang = lang
+    def translate_document(self, document: Union[str, TextIO, Iterable[str]],
+                           target: str = "", source: str = "",
+                           max_batch_tokens: int = 2048) -> Iterator[str]:
+        """
+        Translate a long document, streaming back translated paragraphs.
 
-        source_sents = [sent.strip() for sent in utterances]
-        target_prefix = [[tgt_lang]] * len(source_sents)
+        The text is split into sentences that are translated in length sorted batches,
+        paragraphs and whitespace of the original document are kept.
 
-        # Subword the source sentences
-        source_sents_subworded = self.sp.encode(source_sents, out_type=str)
-        source_sents_subworded = [sent + ["</s>", src_lang] for sent in source_sents_subworded]
+        Args:
+            document (Union[str, TextIO, Iterable[str]]): A string, an open text file or an iterable of lines.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+            max_batch_tokens (int, optional): Padded token budget of a single batch. Defaults to 2048.
+
+        Yields:
+            str: Translated paragraphs, including the blank lines following them.
+        """
+        return DocumentTranslator(self, max_batch_tokens=max_batch_tokens).translate(document, target, source)
 
-        results = self.translator.translate_batch(
-            source_sents_subworded,
-            batch_type="tokens",
-            max_batch_size=2024,
-            beam_size=self.beam_size,
-            target_prefix=target_prefix
-        )
+    @instrumented("translate_markup")
+    def translate_markup(self, payload: Union[str, List[str]], target: str = "", source: str = "",
+                         markup: str = "html") -> Union[str, List[str]]:
+        """
+        Translate the text of HTML, SSML or Markdown, keeping tags, attributes and character references.
 
-        translations = [translation.hypotheses[0] for translation in results]
-        translations_desubword = [sent[len(tgt_lang):].strip() for sent in self.sp.decode(translations)]
+        The text nodes of all payloads are deduplicated and translated in one batch instead of one call per node.
 
-        if len(utterances) == 1:
-            return translations_desubword[0]
+        Args:
+            payload (Union[str, List[str]]): The document(s).
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+            markup (str, optional): "html", "ssml" or "markdown". Defaults to "html".
+
+        Returns:
+            Union[str, List[str]]: The translated document(s).
+        """
+        payloads = [payload] if isinstance(payload, str) else payload
+        translated = MarkupTranslator(self, markup).translate(payloads, target, source)
+        return translated[0] if isinstance(payload, str) else translated
+
+    def translate_stream(self, text: str, target: str = "", source: str = "") -> Iterator[str]:
+        """
+        Translate a sentence, yielding words as soon as the model produces them.
+
+        Tokens are generated greedily with `generate_tokens`, beam search needs the full
+        hypothesis and can not be streamed. Joining all the chunks gives the full translation,
+        it is cached like a `beam_size` 1 translation before the last chunk is yielded.
+
+        The model is kept loaded until the generator is exhausted, a caller that stops early
+        should `close()` it (or wrap it in `contextlib.closing`) to release the model right away.
+
+        Args:
+            text (str): The sentence to translate.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Yields:
+            str: Translated words, every chunk after the first one starts with its separating whitespace.
+        """
+        src_lang, tgt_lang = self._resolve_languages(source, target)
+        source_sent = text.strip()
+
+        cached, missing = self._lookup_cache([source_sent], src_lang, tgt_lang, beam_size=1)
+        if cached[0] is not None:
+            yield cached[0]
+            return
+
+        source_sent_subworded = self._encode([source_sent], src_lang)[0]
+        tokens = []
+        emitted = ""
+        with self._use_model() as translator:
+            # no use_vmap, generate_tokens returns ids of the restricted vocabulary as ids of the full one
+            steps = translator.generate_tokens(source_sent_subworded, target_prefix=[tgt_lang],
+                                               max_decoding_length=self.max_decoding_length)
+            try:
+                for step in steps:
+                    if not tokens and step.token == tgt_lang:
+                        continue  # target language prefix
+                    if step.token == "</s>":
+                        break
+                    if step.token.startswith("▁") and tokens:
+                        # a new word started, everything before it is final
+                        chunk = self.sp.decode(tokens).lstrip()[len(emitted):]
+                        if chunk:
+                            emitted += chunk
+                            yield chunk
+                    tokens.append(step.token)
+            finally:
+                # stops decoding and waits for it, the model must not be released while in use
+                steps.close()
+        translation = self.sp.decode(tokens).strip()
+        self._store_translations(cached, missing, [translation], [source_sent], src_lang, tgt_lang, beam_size=1)
+        chunk = translation[len(emitted):]
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    async def _wait_for_result(result: "ctranslate2.AsyncTranslationResult",
+                               poll_interval: float = 0.001, max_poll_interval: float = 0.02):
+        """
+        Await an asynchronous CTranslate2 result without blocking the event loop.
+        """
+        while not result.done():
+            await asyncio.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, max_poll_interval)
+        return result.result()
+
+    async def atranslate_batch(self, texts: List[str], target: str = "", source: str = "") -> List[str]:
+        """
+        Translate a list of texts without blocking the event loop.
+
+        Tokenization runs in the default executor and decoding is queued in CTranslate2 with
+        `asynchronous=True`. Cancelling the coroutine stops waiting for the result,
+        batches already handed to CTranslate2 still finish in the background.
+
+        Args:
+            texts (List[str]): The sentences to translate.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Returns:
+            List[str]: The translated sentences.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.ready:
+            # do not block the event loop while the model loads
+            await loop.run_in_executor(None, self._ensure_loaded)
+        src_lang, tgt_lang = self._resolve_languages(source, target)
+        source_sents = [sent.strip() for sent in texts]
+
+        translations_desubword, missing = self._lookup_cache(source_sents, src_lang, tgt_lang)
+        if missing:
+            source_sents_subworded = await loop.run_in_executor(
+                None, self._encode, [source_sents[idx] for idx in missing], src_lang)
+            with self._use_model() as translator:
+                async_results = translator.translate_batch(
+                    source_sents_subworded,
+                    target_prefix=[[tgt_lang]] * len(source_sents_subworded),
+                    asynchronous=True,
+                    use_vmap=self._use_vmap([tgt_lang]),
+                    **self._translate_options()
+                )
+                results = await asyncio.gather(*[self._wait_for_result(r) for r in async_results])
+            translated = await loop.run_in_executor(
+                None, self._decode, [r.hypotheses[0] for r in results], tgt_lang)
+            self._store_translations(translations_desubword, missing, translated, source_sents, src_lang, tgt_lang)
         return translations_desubword
 
+    async def atranslate(self, text: Union[str, List[str]], target: str = "", source: str = "") -> Union[str, List[str]]:
+        """
+        Asynchronous version of `translate`.
+
+        Args:
+            text (Union[str, List[str]]): The sentence(s) to translate.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Returns:
+            Union[str, List[str]]: The translated sentence(s).
+        """
+        if isinstance(text, str):
+            return (await self.atranslate_batch([text], target, source))[0]
+        translations = await self.atranslate_batch(text, target, source)
+        if len(translations) == 1:
+            return translations[0]
+        return translations
+
     @classproperty
-    def available_languages(cls) -> Set[str]:
+    def available_languages(cls) -> FrozenSet[str]:
         """
         Get the available target languages with the service.
 
         Returns:
-            Set[str]: A set of language codes.
+            FrozenSet[str]: A set of language codes.
         """
-        return set(cls.LANG_MAP.values())
+        return cls.LANGUAGES.codes
 
-    def supported_translations(self, source_lang: str) -> Set[str]:
+    def supported_translations(self, source_lang: str) -> FrozenSet[str]:
         """
         Get the set of target languages to which the source language can be translated.
 
@@ -418,7 +1069,7 @@ class NLLB200Translator(LanguageTranslator):
             source_lang (Optional[str]): The source language code.
 
         Returns:
-            Set[str]: A set of language codes that the source language can be translated to.
+            FrozenSet[str]: A set of language codes that the source language can be translated to.
         """
         return self.available_languages
 
@@ -0,0 +1,162 @@
+"""
+Benchmark CTranslate2 runtime settings on this machine and save the fastest as a config profile.
+
+    ovos-nllb-autotune --model nllb-200_600M_int8
+
+Enable the saved profile with `"tuned_profile": true` in the plugin config.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ovos_utils.log import LOG
+from ovos_utils.xdg_utils import xdg_data_home
+
+# settings that are benchmarked and saved in a profile
+TUNABLE_KEYS = ("compute_type", "inter_threads", "intra_threads", "max_batch_size", "batch_type")
+
+SAMPLE_SENTENCES = [
+    "I didn't catch that",
+    "Setting a timer for five minutes",
+    "The weather today is sunny with a high of twenty degrees",
+    "Here is what I found on the web about the history of the printing press",
+    "Your package has been delivered and is waiting at the front door",
+    "Good morning, you have three meetings scheduled for today",
+    "Playing your favourite playlist",
+    "The nearest pharmacy is two kilometres away and closes at nine in the evening",
+]
+
+
+def profile_path(model: str) -> str:
+    """
+    Location of the tuned profile of a model.
+
+    Args:
+        model (str): The model name or path, as given in the plugin config.
+
+    Returns:
+        str: Path of the profile json file.
+    """
+    name = os.path.basename(model.rstrip("/"))
+    return f"{xdg_data_home()}/ctranslate2/{name}.profile.json"
+
+
+def load_profile(model: str) -> Dict:
+    """
+    Load the tuned settings of a model.
+
+    Args:
+        model (str): The model name or path, as given in the plugin config.
+
+    Returns:
+        Dict: The tuned settings, empty if the model was never tuned.
+    """
+    path = profile_path(model)
+    if not os.path.isfile(path):
+        LOG.warning(f"No tuned profile for {model}, run ovos-nllb-autotune to create one")
+        return {}
+    with open(path) as f:
+        profile = json.load(f)
+    return {k: v for k, v in profile.items() if k in TUNABLE_KEYS}
+
+
+def candidate_settings(device: str = "cpu", n_cores: Optional[int] = None,
+                       batch_sizes: List[int] = (512, 2024)) -> List[Dict]:
+    """
+    Settings combinations worth benchmarking on this machine.
+
+    Every way of splitting the cores into `inter_threads` workers of `intra_threads` threads is tried
+    for every compute type supported by the device.
+    """
+    import ctranslate2
+
+    n_cores = n_cores or os.cpu_count() or 1
+    compute_types = sorted(ctranslate2.get_supported_compute_types(device) &
+                           {"int8", "int8_float32", "int8_float16", "int8_bfloat16", "float16", "float32"})
+    splits = []
+    inter = 1
+    while inter <= n_cores:
+        splits.append((inter, n_cores // inter))
+        inter *= 2
+    return [{"compute_type": compute_type,
+             "inter_threads": inter,
+             "intra_threads": intra,
+             "max_batch_size": batch_size,
+             "batch_type": "tokens"}
+            for compute_type, (inter, intra), batch_size in itertools.product(compute_types, splits, batch_sizes)]
+
+
+def benchmark(config: Dict, sentences: List[str] = SAMPLE_SENTENCES, rounds: int = 4,
+              target: str = "es", source: str = "en") -> float:
+    """
+    Measure translation throughput with the given plugin config.
+
+    Requests are sent from `inter_threads` threads so parallel translators are kept busy.
+
+    Returns:
+        float: Translated sentences per second.
+    """
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    tx = NLLB200Translator(config=config)
+    tx.translate(sentences[:2], target, source)  # warm up
+    n_workers = config.get("inter_threads", 1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_workers) as pool:
+        list(pool.map(lambda _: tx.translate(sentences, target, source), range(rounds * n_workers)))
+    elapsed = time.perf_counter() - start
+    return len(sentences) * rounds * n_workers / elapsed
+
+
+def autotune(base_config: Dict, candidates: Optional[List[Dict]] = None, rounds: int = 4) -> Dict:
+    """
+    Benchmark every candidate and return the fastest settings.
+
+    Args:
+        base_config (Dict): Plugin config the candidates are applied on top of.
+        candidates (List[Dict], optional): Settings to try. Defaults to `candidate_settings()`.
+        rounds (int, optional): Benchmark rounds per candidate. Defaults to 4.
+
+    Returns:
+        Dict: The fastest settings, plus the measured `sentences_per_second`.
+    """
+    candidates = candidates or candidate_settings(base_config.get("device", "cpu"))
+    best, best_speed = {}, 0.0
+    for settings in candidates:
+        try:
+            speed = benchmark({**base_config, **settings}, rounds=rounds)
+        except Exception as e:
+            LOG.warning(f"Skipping {settings}: {e}")
+            continue
+        LOG.info(f"{speed:8.1f} sentences/s  {settings}")
+        if speed > best_speed:
+            best, best_speed = settings, speed
+    return {**best, "sentences_per_second": round(best_speed, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--beam-size", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--output", help="profile path, defaults to the location used by `tuned_profile`")
+    args = parser.parse_args()
+
+    base_config = {"model": args.model, "tokenizer": args.tokenizer,
+                   "device": args.device, "beam_size": args.beam_size}
+    profile = autotune(base_config, rounds=args.rounds)
+    output = args.output or profile_path(args.model)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(f"fastest: {profile}\nsaved to {output}")
+
+
+if __name__ == "__main__":
+    main()
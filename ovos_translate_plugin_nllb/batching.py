@@ -0,0 +1,158 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from ovos_utils.log import LOG
+
+# (source tokens, target prefixes) -> best hypothesis tokens, one per input
+BatchTranslateFn = Callable[[List[List[str]], List[List[str]]], List[List[str]]]
+
+
+class _PendingTranslation:
+    """
+    A single subworded sentence waiting to be merged into a batch, with the context of its caller.
+    """
+    __slots__ = ("source", "target_prefix", "future", "context")
+
+    def __init__(self, source: List[str], target_prefix: List[str]):
+        self.source = source
+        self.target_prefix = target_prefix
+        self.future = Future()
+        self.context = contextvars.copy_context()
+
+
+class BatchScheduler:
+    """
+    Merges concurrent translation requests into shared `translate_batch` calls.
+
+    Callers submit subworded sentences and get a Future back, a single worker thread
+    collects whatever arrives within `max_wait_ms` (or until `max_batch_tokens` is reached)
+    and runs it through `translate_fn` as one batch.
+
+    `translate_fn` runs in a copy of the context variables of the caller whose sentence opened the
+    batch, eg. the metrics record of its `translate()` call, sentences merged into it from other
+    callers are counted there too.
+    """
+
+    def __init__(self, translate_fn: BatchTranslateFn,
+                 max_wait_ms: float = 5.0,
+                 max_batch_tokens: int = 2024):
+        """
+        Args:
+            translate_fn (BatchTranslateFn): Callable translating a list of subworded sentences.
+            max_wait_ms (float, optional): How long to wait for more requests before running a batch. Defaults to 5.
+            max_batch_tokens (int, optional): Source token budget of a single batch. Defaults to 2024.
+        """
+        self.translate_fn = translate_fn
+        self.max_wait = max(max_wait_ms, 0) / 1000
+        self.max_batch_tokens = max_batch_tokens
+        self._queue = queue.Queue()
+        self._carry: Optional[_PendingTranslation] = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="nllb-batch-scheduler")
+        self._thread.start()
+
+    def submit(self, source: List[str], target_prefix: List[str]) -> Future:
+        """
+        Queue a single subworded sentence for translation.
+
+        Args:
+            source (List[str]): The subworded source sentence.
+            target_prefix (List[str]): The target prefix tokens for this sentence.
+
+        Returns:
+            Future: Resolves to the best hypothesis tokens.
+        """
+        if not self._running:
+            raise RuntimeError("BatchScheduler has been shut down")
+        pending = _PendingTranslation(source, target_prefix)
+        self._queue.put(pending)
+        return pending.future
+
+    def translate(self, sources: List[List[str]], target_prefixes: List[List[str]]) -> List[List[str]]:
+        """
+        Submit several sentences and block until all of them are translated.
+
+        Args:
+            sources (List[List[str]]): The subworded source sentences.
+            target_prefixes (List[List[str]]): The target prefix tokens, one per sentence.
+
+        Returns:
+            List[List[str]]: The best hypothesis tokens, in input order.
+        """
+        futures = [self.submit(src, prefix) for src, prefix in zip(sources, target_prefixes)]
+        return [f.result() for f in futures]
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting requests, translate whatever is still queued and stop the worker thread.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def _next_batch(self) -> List[_PendingTranslation]:
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = self._queue.get()
+            if first is None:
+                return []
+        batch = [first]
+        n_tokens = len(first.source)
+        deadline = time.monotonic() + self.max_wait
+        while n_tokens < self.max_batch_tokens:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    pending = self._queue.get(timeout=remaining)
+                else:
+                    # window closed, but still drain anything that is already waiting
+                    pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                # shutdown requested, put the sentinel back for the main loop
+                self._queue.put(None)
+                break
+            if n_tokens + len(pending.source) > self.max_batch_tokens:
+                self._carry = pending
+                break
+            batch.append(pending)
+            n_tokens += len(pending.source)
+        return batch
+
+    def _fail_pending(self):
+        # requests that raced with shutdown() would otherwise wait forever
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if pending is not None:
+                pending.future.set_exception(RuntimeError("BatchScheduler has been shut down"))
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                self._fail_pending()
+                break
+            try:
+                hypotheses = batch[0].context.run(self.translate_fn,
+                                                  [p.source for p in batch],
+                                                  [p.target_prefix for p in batch])
+            except Exception as e:
+                LOG.error(f"Batched translation failed: {e}")
+                for p in batch:
+                    p.future.set_exception(e)
+                continue
+            for p, hyp in zip(batch, hypotheses):
+                p.future.set_result(hyp)
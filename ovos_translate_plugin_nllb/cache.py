@@ -0,0 +1,249 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ovos_utils.xdg_utils import xdg_data_home
+
+# (model, tokenizer, vocabulary map languages, source code, target code, compute type, beam size,
+#  max decoding length, length penalty, text)
+CacheKey = Tuple[str, str, str, str, str, str, int, int, float, str]
+
+# hits whose last_used update is held back before it is written
+TOUCH_BATCH = 256
+
+
+class DiskCache:
+    """
+    Persistent SQLite tier of the translation cache, survives restarts.
+
+    Once `max_entries` or `max_bytes` is exceeded the least recently used rows are deleted.
+    Hits do not write, their `last_used` updates are buffered and written with the next `put`,
+    every `TOUCH_BATCH` hits or on `close`.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 0, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path (str, optional): Database file. Defaults to `xdg_data_home()/ctranslate2/translation_cache.db`.
+            max_entries (int, optional): Maximum number of stored translations, 0 for no limit. Defaults to 0.
+            max_bytes (int, optional): Maximum size of the stored translations and keys, 0 for no limit.
+                Defaults to 64 MB.
+        """
+        if path is None:
+            base_path = f"{xdg_data_home()}/ctranslate2"
+            os.makedirs(base_path, exist_ok=True)
+            path = f"{base_path}/translation_cache.db"
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS translations "
+                         "(key TEXT PRIMARY KEY, translation TEXT NOT NULL)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(translations)")}
+        if "last_used" not in columns:
+            # databases written before eviction existed, their rows count as least recently used
+            self._db.execute("ALTER TABLE translations ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute("ALTER TABLE translations ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._db.execute("UPDATE translations SET size = length(key) + length(CAST(translation AS BLOB))")
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._db.commit()
+        self.n_entries, self.n_bytes, self._last_used = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(MAX(last_used), 0) FROM translations").fetchone()
+        # the limits may have been lowered since the last run
+        self._prune()
+        self._db.commit()
+
+    @staticmethod
+    def _hash(key: CacheKey) -> str:
+        return hashlib.sha256("\x1f".join(str(k) for k in key).encode("utf-8")).hexdigest()
+
+    def _now(self) -> float:
+        """ strictly increasing timestamps, rows used within the clock resolution keep their order """
+        self._last_used = max(time.time(), self._last_used + 1e-6)
+        return self._last_used
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        digest = self._hash(key)
+        with self._lock:
+            row = self._db.execute("SELECT translation FROM translations WHERE key = ?", (digest,)).fetchone()
+            if row is None:
+                return None
+            self._touched[digest] = self._now()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self._db.commit()
+        return row[0]
+
+    def _flush_touched(self):
+        """ write the buffered last_used updates, the lock must be held, the caller commits """
+        if self._touched:
+            self._db.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                 [(used, digest) for digest, used in self._touched.items()])
+            self._touched.clear()
+
+    def put(self, key: CacheKey, translation: str):
+        digest = self._hash(key)
+        size = len(digest) + len(translation.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM translations WHERE key = ?", (digest,)).fetchone()
+            if old is not None:
+                self.n_entries -= 1
+                self.n_bytes -= old[0]
+            self._db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                             (digest, translation, self._now(), size))
+            self.n_entries += 1
+            self.n_bytes += size
+            # eviction order must see the recent hits
+            self._flush_touched()
+            self._prune()
+            self._db.commit()
+
+    def _prune(self):
+        """ delete least recently used rows until both limits are met, the lock must be held """
+        excess = self.n_entries - self.max_entries if self.max_entries else 0
+        if self.max_bytes and self.n_bytes > self.max_bytes:
+            # the oldest rows whose sizes add up to the overflow
+            overflow = self.n_bytes - self.max_bytes
+            excess = max(excess, self._db.execute(
+                "SELECT COUNT(*) FROM (SELECT SUM(size) OVER (ORDER BY last_used, key ROWS UNBOUNDED PRECEDING) "
+                "AS total FROM translations) WHERE total - ? < 0", (overflow,)).fetchone()[0] + 1)
+        if excess <= 0:
+            return
+        freed = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT size FROM translations "
+                                 "ORDER BY last_used, key LIMIT ?)", (excess,)).fetchone()
+        self._db.execute("DELETE FROM translations WHERE key IN "
+                         "(SELECT key FROM translations ORDER BY last_used, key LIMIT ?)", (excess,))
+        self.n_entries -= freed[0]
+        self.n_bytes -= freed[1]
+        self.evictions += freed[0]
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM translations")
+            self._db.commit()
+            self.n_entries = self.n_bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+
+class TranslationCache:
+    """
+    Thread-safe in-memory LRU of finished translations with an optional disk tier.
+
+    Entries are evicted least-recently-used first once either `max_entries`
+    or `max_bytes` (utf-8 size of texts and translations) is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 4 * 1024 * 1024,
+                 disk: Optional[DiskCache] = None):
+        """
+        Args:
+            max_entries (int, optional): Maximum number of entries kept in memory. Defaults to 1024.
+            max_bytes (int, optional): Maximum size of the entries kept in memory. Defaults to 4 MB.
+            disk (DiskCache, optional): Persistent tier consulted on memory misses.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._entries: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.n_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(key: CacheKey, translation: str) -> int:
+        return len(key[-1].encode("utf-8")) + len(translation.encode("utf-8"))
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        """
+        Look up a translation, promoting disk hits into memory.
+
+        Returns:
+            Optional[str]: The cached translation, or None on a miss.
+        """
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return translation
+        if self.disk is not None:
+            translation = self.disk.get(key)
+            if translation is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._put_memory(key, translation)
+                return translation
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, translation: str):
+        """
+        Store a translation in memory and, if configured, on disk.
+        """
+        self._put_memory(key, translation)
+        if self.disk is not None:
+            self.disk.put(key, translation)
+
+    def _put_memory(self, key: CacheKey, translation: str):
+        size = self._sizeof(key, translation)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.n_bytes -= self._sizeof(key, old)
+            self._entries[key] = translation
+            self.n_bytes += size
+            while len(self._entries) > self.max_entries or self.n_bytes > self.max_bytes:
+                k, v = self._entries.popitem(last=False)
+                self.n_bytes -= self._sizeof(k, v)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all entries, including the disk tier, and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = self.hits = self.disk_hits = self.misses = self.evictions = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: hit, miss and eviction counters plus the current memory usage.
+        """
+        with self._lock:
+            return {"hits": self.hits,
+                    "disk_hits": self.disk_hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self._entries),
+                    "bytes": self.n_bytes}
+
+    def __len__(self) -> int:
+        return len(self._entries)
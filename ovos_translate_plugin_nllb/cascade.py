@@ -0,0 +1,247 @@
+"""
+Route requests between NLLB checkpoints of different sizes.
+
+The smaller models answer high resource language pairs and requests with tight deadlines,
+the larger ones low resource pairs, where they translate noticeably better.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from ovos_utils.log import LOG
+
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.download import _probe
+from ovos_translate_plugin_nllb.manifest import load_manifest
+
+# smallest to largest
+DEFAULT_MODELS = ["nllb-200_600M_int8", "nllb-200-distilled-1.3B-ct2-int8", "nllb-200-3.3B-ct2-int8"]
+# the distilled 600M model is close to the larger ones for these
+HIGH_RESOURCE = ["ar", "cs", "de", "en", "es", "fr", "hi", "id", "it", "ja", "ko", "nl", "pl", "pt", "ru",
+                 "sv", "tr", "uk", "vi", "zh"]
+# approximate size on disk of the known checkpoints, checked against the budget before downloading
+MODEL_SIZES_MB = {"nllb-200_600M_int8": 600, "nllb-200_1.2B_int8": 1300, "nllb-200-3.3B-int8": 3300,
+                  "nllb-200-distilled-1.3B-ct2-int8": 1400, "nllb-200-3.3B-ct2-int8": 3300}
+# characters per subword token, a rough estimate to route before tokenizing
+_CHARS_PER_TOKEN = 4
+# weight of the newest sample in the per token latency estimate
+_EWMA_ALPHA = 0.2
+
+
+def model_size_mb(path: str) -> float:
+    """
+    Size of a model directory, a good estimate of the memory its weights take once loaded.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1024 / 1024
+
+
+def expected_size_mb(model: str) -> Optional[float]:
+    """
+    Size of a model without downloading it, from its directory, its install manifest, `MODEL_SIZES_MB`
+    or the Content-Length of its zip archive.
+
+    Args:
+        model (str): A model name, a local model directory or the URL of a zipped model.
+
+    Returns:
+        Optional[float]: The size in MB, None if it can not be known before downloading.
+    """
+    if os.path.isdir(model):
+        return model_size_mb(model)
+    name = model.split("/")[-1].rsplit(".zip", 1)[0] if model.startswith("http") else model
+    manifest = load_manifest(name)
+    if manifest is not None:
+        return sum(info["size"] for info in manifest["files"].values()) / 1024 / 1024
+    if name in MODEL_SIZES_MB:
+        return MODEL_SIZES_MB[name]
+    url = model if model.startswith("http") else NLLB200Translator.MODEL_URLS.get(model)
+    if url is None:
+        return None
+    size, _ = _probe(url, timeout=30)
+    return size / 1024 / 1024 if size is not None else None
+
+
+class _Tier:
+    __slots__ = ("name", "translator", "size_mb", "in_flight", "requests", "sentences", "fallbacks",
+                 "latencies", "seconds_per_token")
+
+    def __init__(self, name: str, translator: NLLB200Translator, size_mb: float, window: int):
+        self.name = name
+        self.translator = translator
+        self.size_mb = size_mb
+        self.in_flight = 0
+        self.requests = 0
+        self.sentences = 0
+        self.fallbacks = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.seconds_per_token: Optional[float] = None
+
+
+class NLLBCascade:
+    """
+    Keeps several checkpoints loaded within a memory budget and picks one per request.
+
+    A request starts at the smallest model for high resource pairs, the largest for low resource pairs
+    and `default_model` otherwise. It moves to the next smaller model while that one has `max_in_flight`
+    requests running or its measured latency would miss the deadline.
+    """
+
+    def __init__(self, config: Optional[Dict] = None,
+                 models: Optional[List[Union[str, Dict]]] = None,
+                 memory_budget_mb: float = 4096,
+                 high_resource: Optional[Iterable[str]] = None,
+                 low_resource: Iterable[str] = (),
+                 default_model: Optional[int] = None,
+                 max_in_flight: int = 4,
+                 deadline_ms: Optional[float] = None,
+                 window: int = 1024):
+        """
+        Args:
+            config (Dict, optional): Plugin config shared by every model.
+            models (List[Union[str, Dict]], optional): Models from smallest to largest, names or configs
+                overriding `config` for that model, eg. {"model": "nllb-200-3.3B-ct2-int8", "beam_size": 2}.
+                Defaults to DEFAULT_MODELS.
+            memory_budget_mb (float, optional): Larger models that do not fit next to the smaller ones are
+                not loaded, the smallest always is. Defaults to 4096.
+            high_resource (Iterable[str], optional): Language codes served by the smallest model. Defaults to HIGH_RESOURCE.
+            low_resource (Iterable[str], optional): Language codes served by the largest model.
+            default_model (int, optional): Index of the loaded model for other pairs. Defaults to the middle one.
+            max_in_flight (int, optional): Concurrent requests per model before falling back to a smaller one. Defaults to 4.
+            deadline_ms (float, optional): Default latency deadline of a request. Defaults to None, no deadline.
+            window (int, optional): Latency samples kept per model for the percentiles. Defaults to 1024.
+        """
+        self.config = config or {}
+        self.memory_budget_mb = memory_budget_mb
+        self.max_in_flight = max_in_flight
+        self.deadline_ms = deadline_ms
+        resolve = NLLB200Translator.LANGUAGES.resolve
+        self.high_resource = {resolve(code) for code in (HIGH_RESOURCE if high_resource is None else high_resource)}
+        self.low_resource = {resolve(code) for code in low_resource}
+        self._lock = threading.Lock()
+        self.tiers = self._load_tiers(models or DEFAULT_MODELS, window)
+        self.default_model = len(self.tiers) // 2 if default_model is None else min(default_model,
+                                                                                     len(self.tiers) - 1)
+
+    def _load_tiers(self, models: List[Union[str, Dict]], window: int) -> List[_Tier]:
+        tiers: List[_Tier] = []
+        used_mb = 0.0
+        for model in models:
+            overrides = {"model": model} if isinstance(model, str) else model
+            config = {**self.config, **overrides}
+            if tiers:
+                # known sizes are checked before downloading, a model over budget is never fetched
+                size_mb = expected_size_mb(config["model"])
+                if size_mb is not None and used_mb + size_mb > self.memory_budget_mb:
+                    LOG.info(f"Not loading {config['model']} ({size_mb:.0f}MB), "
+                             f"it does not fit the {self.memory_budget_mb:.0f}MB budget")
+                    continue
+            path = NLLB200Translator.download(config["model"], offline=config.get("offline", False))
+            size_mb = model_size_mb(path)
+            if tiers and used_mb + size_mb > self.memory_budget_mb:
+                LOG.info(f"Not loading {config['model']} ({size_mb:.0f}MB), "
+                         f"it does not fit the {self.memory_budget_mb:.0f}MB budget")
+                continue
+            tiers.append(_Tier(config["model"], NLLB200Translator(config=config), size_mb, window))
+            used_mb += size_mb
+        return tiers
+
+    @property
+    def models(self) -> List[str]:
+        """ names of the loaded models, smallest first """
+        return [tier.name for tier in self.tiers]
+
+    def _preferred(self, src_lang: str, tgt_lang: str) -> int:
+        if src_lang in self.low_resource or tgt_lang in self.low_resource:
+            return len(self.tiers) - 1
+        if src_lang in self.high_resource and tgt_lang in self.high_resource:
+            return 0
+        return self.default_model
+
+    def route(self, n_tokens: int, src_lang: str, tgt_lang: str, deadline: Optional[float] = None) -> Tuple[int, bool]:
+        """
+        Pick the model for a request, must be called with the lock held.
+
+        Args:
+            n_tokens (int): Estimated source tokens of the request.
+            src_lang (str): The source NLLB language code, eg. "eng_Latn".
+            tgt_lang (str): The target NLLB language code, eg. "spa_Latn".
+            deadline (float, optional): Seconds the translation may take.
+
+        Returns:
+            Tuple[int, bool]: Index of the model, and whether it is a fallback from the preferred one.
+        """
+        preferred = idx = self._preferred(src_lang, tgt_lang)
+        while idx > 0:
+            tier = self.tiers[idx]
+            saturated = tier.in_flight >= self.max_in_flight
+            too_slow = (deadline is not None and tier.seconds_per_token is not None
+                        and tier.seconds_per_token * n_tokens > deadline)
+            if not saturated and not too_slow:
+                break
+            idx -= 1
+        return idx, idx != preferred
+
+    def translate(self, text: Union[str, List[str]], target: str = "", source: str = "",
+                  deadline_ms: Optional[float] = None) -> Union[str, List[str]]:
+        """
+        Translate text with the model chosen for the language pair, length and deadline.
+
+        Args:
+            text (Union[str, List[str]]): The sentence(s) to translate.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+            deadline_ms (float, optional): Latency deadline of this request. Defaults to `deadline_ms`.
+
+        Returns:
+            Union[str, List[str]]: The translated sentence(s).
+        """
+        texts = [text] if isinstance(text, str) else text
+        src_lang, tgt_lang = self.tiers[0].translator._resolve_languages(source, target)
+        n_tokens = sum(len(t) // _CHARS_PER_TOKEN + 1 for t in texts)
+        deadline_ms = self.deadline_ms if deadline_ms is None else deadline_ms
+        with self._lock:
+            idx, fallback = self.route(n_tokens, src_lang, tgt_lang,
+                                       deadline_ms / 1000 if deadline_ms is not None else None)
+            tier = self.tiers[idx]
+            tier.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return tier.translator.translate(text, target, source)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                tier.in_flight -= 1
+                tier.requests += 1
+                tier.sentences += len(texts)
+                tier.fallbacks += fallback
+                tier.latencies.append(elapsed)
+                sample = elapsed / n_tokens
+                tier.seconds_per_token = sample if tier.seconds_per_token is None else \
+                    _EWMA_ALPHA * sample + (1 - _EWMA_ALPHA) * tier.seconds_per_token
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            Dict[str, Dict[str, float]]: Per model requests, sentences, fallbacks (requests it got because
+                a larger model was saturated or too slow), latency percentiles and memory estimate.
+        """
+        stats = {}
+        with self._lock:
+            for tier in self.tiers:
+                latencies = sorted(tier.latencies)
+                stats[tier.name] = {
+                    "requests": tier.requests,
+                    "sentences": tier.sentences,
+                    "fallbacks": tier.fallbacks,
+                    "in_flight": tier.in_flight,
+                    "latency_p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+                    "latency_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+                    "ms_per_token": (tier.seconds_per_token or 0.0) * 1000,
+                    "size_mb": tier.size_mb}
+        return stats
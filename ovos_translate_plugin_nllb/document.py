@@ -0,0 +1,195 @@
+import io
+import re
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Sequence, TextIO, Tuple, Union
+
+if TYPE_CHECKING:
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+# a sentence boundary is terminal punctuation (optionally followed by a closing quote/bracket) plus whitespace,
+# CJK full stops that need no whitespace, or a line break
+_BOUNDARY = re.compile(r"(?<=[.!?…][\"'”’»)\]])\s+|(?<=[.!?…])\s+|(?<=[。！？])\s*|\s*\n\s*")
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no", "fig",
+                  "inc", "ltd", "co", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept",
+                  "oct", "nov", "dec"}
+
+
+def _is_abbreviation(sentence: str, following: str) -> bool:
+    if not sentence.endswith("."):
+        return False
+    last_word = sentence.rsplit(None, 1)[-1][:-1].lower()
+    if last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+        return True
+    # "approx. three" - a sentence does not start in lower case
+    return following[:1].islower()
+
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """
+    Rule based sentence segmentation that keeps the original whitespace.
+
+    Args:
+        text (str): The text to segment.
+
+    Returns:
+        List[Tuple[str, str]]: (sentence, whitespace following it) pairs, joining them gives back `text`.
+    """
+    pieces = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        sentence = text[start:match.start()]
+        if not sentence.strip():
+            # leading whitespace, keep it in front of the next sentence
+            continue
+        if "\n" not in match.group() and _is_abbreviation(sentence, text[match.end():]):
+            continue
+        pieces.append((sentence, match.group()))
+        start = match.end()
+    if start < len(text):
+        pieces.append((text[start:], ""))
+    return pieces
+
+
+def iter_paragraphs(document: Union[str, TextIO, Iterable[str]], max_chars: int = 0) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily group lines into paragraphs separated by blank lines.
+
+    Args:
+        document (Union[str, TextIO, Iterable[str]]): A string, an open text file or an iterable of lines.
+        max_chars (int, optional): Cut longer paragraphs at the next line break, so text without blank
+            lines is not buffered whole. Defaults to 0, no limit.
+
+    Yields:
+        Tuple[str, str]: (paragraph, blank lines following it), joining them gives back the document.
+    """
+    if isinstance(document, str):
+        document = io.StringIO(document)
+    paragraph, separator, n_chars = [], [], 0
+    for line in document:
+        if not line.strip():
+            separator.append(line)
+            continue
+        if separator:
+            yield "".join(paragraph), "".join(separator)
+            paragraph, separator, n_chars = [], [], 0
+        paragraph.append(line)
+        n_chars += len(line)
+        if max_chars and n_chars >= max_chars:
+            # a line break always ends a sentence, the cut never splits one
+            yield "".join(paragraph), ""
+            paragraph, n_chars = [], 0
+    if paragraph or separator:
+        yield "".join(paragraph), "".join(separator)
+
+
+def bucket_by_length(lengths: Sequence[int], max_batch_tokens: int) -> List[List[int]]:
+    """
+    Sort items by length and group them into batches whose padded size fits the token budget.
+
+    Args:
+        lengths (Sequence[int]): The token length of each item.
+        max_batch_tokens (int): Budget of a batch, counted as longest item times batch size.
+
+    Returns:
+        List[List[int]]: Batches of item indexes.
+    """
+    batches, batch = [], []
+    for idx in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        # sorted ascending, so the current item is the longest of the batch
+        if batch and lengths[idx] * (len(batch) + 1) > max_batch_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(idx)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class DocumentTranslator:
+    """
+    Translates long documents sentence by sentence, streaming back translated paragraphs.
+
+    Paragraphs are read lazily and translated in windows of `window_tokens` source tokens,
+    so memory use does not depend on the size of the document. A paragraph larger than the window,
+    eg. text without blank lines, is flushed line by line.
+    """
+
+    def __init__(self, translator: "NLLB200Translator",
+                 max_batch_tokens: int = 2048,
+                 window_tokens: int = 8192,
+                 max_sentence_words: int = 200):
+        """
+        Args:
+            translator (NLLB200Translator): The loaded translator.
+            max_batch_tokens (int, optional): Padded token budget of a single `translate_batch` call. Defaults to 2048.
+            window_tokens (int, optional): Source tokens buffered before translating. Defaults to 8192.
+            max_sentence_words (int, optional): Longer sentences are cut into chunks of this many words. Defaults to 200.
+        """
+        self.translator = translator
+        self.max_batch_tokens = max_batch_tokens
+        self.window_tokens = window_tokens
+        self.max_sentence_words = max_sentence_words
+
+    def _segments(self, paragraph: str) -> List[Tuple[str, str, str]]:
+        """ (leading whitespace, text, trailing whitespace) of every sentence in the paragraph """
+        segments = []
+        for sentence, whitespace in split_sentences(paragraph):
+            text = sentence.strip()
+            lead = sentence[:len(sentence) - len(sentence.lstrip())]
+            trail = sentence[len(sentence.rstrip()):] + whitespace
+            words = text.split()
+            if len(words) <= self.max_sentence_words:
+                segments.append((lead, text, trail))
+                continue
+            # too long for the model input, cut at word boundaries
+            chunks = [" ".join(words[i:i + self.max_sentence_words])
+                      for i in range(0, len(words), self.max_sentence_words)]
+            segments.append((lead, chunks[0], " "))
+            segments += [("", chunk, " ") for chunk in chunks[1:-1]]
+            segments.append(("", chunks[-1], trail))
+        return segments
+
+    def _translate_sentences(self, sentences: List[str], src_lang: str, tgt_lang: str) -> List[str]:
+        tx = self.translator
+        translations, missing = tx._lookup_cache(sentences, src_lang, tgt_lang)
+        if not missing:
+            return translations
+        translated = tx._translate_sentences([sentences[idx] for idx in missing], src_lang, tgt_lang,
+                                             max_batch_tokens=self.max_batch_tokens)
+        tx._store_translations(translations, missing, translated, sentences, src_lang, tgt_lang)
+        return translations
+
+    def _translate_window(self, window: List[Tuple[str, str, List[Tuple[str, str, str]]]],
+                          src_lang: str, tgt_lang: str) -> Iterator[str]:
+        sentences = [text for _, _, segments in window for _, text, _ in segments if text]
+        translations = iter(self._translate_sentences(sentences, src_lang, tgt_lang))
+        for paragraph, separator, segments in window:
+            out = [lead + (next(translations) if text else "") + trail for lead, text, trail in segments]
+            yield "".join(out) + separator
+
+    def translate(self, document: Union[str, TextIO, Iterable[str]],
+                  target: str = "", source: str = "") -> Iterator[str]:
+        """
+        Translate a document, yielding translated paragraphs in order.
+
+        Args:
+            document (Union[str, TextIO, Iterable[str]]): A string, an open text file or an iterable of lines.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Yields:
+            str: Translated paragraphs, including the original blank lines following them.
+                Paragraphs longer than the window come in several parts, cut at line breaks.
+        """
+        src_lang, tgt_lang = self.translator._resolve_languages(source, target)
+        window, n_tokens = [], 0
+        # ~3 characters per token, a paragraph longer than the window is translated a few lines at a time
+        for paragraph, separator in iter_paragraphs(document, max_chars=self.window_tokens * 3):
+            segments = self._segments(paragraph)
+            window.append((paragraph, separator, segments))
+            # rough estimate, the exact length is only known after subwording
+            n_tokens += sum(len(text) for _, text, _ in segments) // 3
+            if n_tokens >= self.window_tokens:
+                yield from self._translate_window(window, src_lang, tgt_lang)
+                window, n_tokens = [], 0
+        if window:
+            yield from self._translate_window(window, src_lang, tgt_lang)
@@ -0,0 +1,469 @@
+"""
+Resumable, parallel and checksum verified downloads of model files.
+
+Files are fetched with concurrent HTTP range requests into a `.part` file, progress is tracked in a
+`.part.json` sidecar so an interrupted download continues where it stopped. Model archives are
+installed atomically under a process wide lock, so concurrent processes never see half extracted models.
+`requests` is only imported once something is downloaded.
+"""
+import hashlib
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from combo_lock import ComboLock
+from ovos_utils.log import LOG
+
+CHUNK_SIZE = 1024 * 1024
+# do not split files in ranges smaller than this
+MIN_PART_SIZE = 8 * 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_LOCAL_HEADER_SIG = 0x04034b50
+_DATA_DESCRIPTOR_SIG = 0x08074b50
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+_ZIP64_EXTRA_ID = 0x0001
+
+
+class ChecksumError(ValueError):
+    """ The downloaded file does not match the expected size or hash """
+
+
+def sha256sum(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    Hex sha256 digest of a file.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@contextmanager
+def install_lock(path: str) -> Iterator[None]:
+    """
+    Lock shared by every thread and process installing to `path`.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lock = ComboLock(f"{path}.lock")
+    with lock:
+        yield
+
+
+def _probe(url: str, timeout: float) -> Tuple[Optional[int], bool]:
+    """ (size in bytes, whether range requests are supported) of a remote file """
+    import requests
+    try:
+        r = requests.head(url, allow_redirects=True, timeout=timeout)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        LOG.debug(f"HEAD {url} failed, downloading without ranges: {e}")
+        return None, False
+    size = r.headers.get("Content-Length")
+    accepts_ranges = r.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return (int(size) if size is not None else None), accepts_ranges
+
+
+class _PartialDownload:
+    """
+    Byte ranges of a file still to be downloaded, persisted next to the `.part` file.
+    """
+
+    def __init__(self, state_path: str, url: str, size: int, parts: List[List[int]]):
+        self.state_path = state_path
+        self.url = url
+        self.size = size
+        # [start, end (inclusive), next offset to download]
+        self.parts = parts
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @classmethod
+    def load(cls, state_path: str, url: str, size: int) -> Optional["_PartialDownload"]:
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size:
+            # the remote file changed, start over
+            return None
+        return cls(state_path, url, size, state["parts"])
+
+    @classmethod
+    def new(cls, state_path: str, url: str, size: int, connections: int) -> "_PartialDownload":
+        n_parts = max(1, min(connections, size // MIN_PART_SIZE))
+        step = -(-size // n_parts)
+        parts = [[start, min(start + step, size) - 1, start] for start in range(0, size, step)]
+        return cls(state_path, url, size, parts or [[0, -1, 0]])
+
+    @property
+    def pending(self) -> List[List[int]]:
+        return [part for part in self.parts if part[2] <= part[1]]
+
+    def advance(self, part: List[int], offset: int):
+        with self._lock:
+            part[2] = offset
+            # checkpointing every chunk would rewrite the state thousands of times for large models
+            if time.monotonic() - self._saved_at > 1:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"url": self.url, "size": self.size, "parts": self.parts}, f)
+        os.replace(tmp, self.state_path)
+        self._saved_at = time.monotonic()
+
+    def remove(self):
+        if os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+
+
+def _fetch_range(url: str, part_path: str, state: _PartialDownload, part: List[int],
+                 chunk_size: int, timeout: float, retries: int):
+    import requests
+    for attempt in range(retries + 1):
+        headers = {"Range": f"bytes={part[2]}-{part[1]}"}
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    raise requests.RequestException(f"server ignored range request, got HTTP {r.status_code}")
+                with open(part_path, "r+b") as f:
+                    f.seek(part[2])
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        state.advance(part, part[2] + len(chunk))
+            if part[2] > part[1]:
+                return
+            raise requests.RequestException(f"connection closed at byte {part[2]} of range ending at {part[1]}")
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            LOG.warning(f"Download of {url} interrupted at byte {part[2]}, retrying: {e}")
+            time.sleep(min(2 ** attempt, 10))
+
+
+def _fetch_whole(url: str, part_path: str, chunk_size: int, timeout: float):
+    import requests
+    with requests.get(url, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        with open(part_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+
+
+def _verify(path: str, size: Optional[int], sha256: Optional[str]):
+    if size is not None and os.path.getsize(path) != size:
+        raise ChecksumError(f"{path} is {os.path.getsize(path)} bytes, expected {size}")
+    if sha256 and sha256sum(path) != sha256.lower():
+        raise ChecksumError(f"sha256 of {path} does not match {sha256}")
+
+
+def download_file(url: str, local_filename: str, sha256: Optional[str] = None,
+                  connections: int = 4, chunk_size: int = CHUNK_SIZE,
+                  timeout: float = 30, retries: int = 3) -> str:
+    """
+    Download a file with parallel range requests, resuming a previous partial download if there is one.
+
+    The file only appears at `local_filename` once complete and verified.
+
+    Args:
+        url (str): The URL of the file to download.
+        local_filename (str): The local path where the file should be saved.
+        sha256 (str, optional): Expected hex digest, the download is discarded on mismatch. Defaults to None.
+        connections (int, optional): Maximum number of concurrent range requests. Defaults to 4.
+        chunk_size (int, optional): Bytes read from the network at a time. Defaults to 1 MB.
+        timeout (float, optional): Connection and read timeout in seconds. Defaults to 30.
+        retries (int, optional): Times an interrupted range is resumed before giving up. Defaults to 3.
+
+    Returns:
+        str: The local file path of the downloaded file.
+    """
+    part_path = f"{local_filename}.part"
+    size, accepts_ranges = _probe(url, timeout)
+    if not accepts_ranges or size is None:
+        _fetch_whole(url, part_path, chunk_size, timeout)
+    else:
+        state_path = f"{part_path}.json"
+        state = _PartialDownload.load(state_path, url, size) if os.path.isfile(part_path) else None
+        if state is None:
+            state = _PartialDownload.new(state_path, url, size, connections)
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+        else:
+            done = size - sum(end - offset + 1 for _, end, offset in state.pending)
+            LOG.info(f"Resuming download of {url} at {done}/{size} bytes")
+        pending = state.pending
+        try:
+            if len(pending) == 1:
+                _fetch_range(url, part_path, state, pending[0], chunk_size, timeout, retries)
+            elif pending:
+                with ThreadPoolExecutor(len(pending)) as pool:
+                    futures = [pool.submit(_fetch_range, url, part_path, state, part, chunk_size, timeout, retries)
+                               for part in pending]
+                    for future in futures:
+                        future.result()
+        finally:
+            # keep the progress of finished ranges for the next attempt
+            state.save()
+        state.remove()
+    try:
+        _verify(part_path, size, sha256)
+    except ChecksumError:
+        os.remove(part_path)
+        raise
+    os.replace(part_path, local_filename)
+    return local_filename
+
+
+class _StreamReader:
+    """ Exact reads with push back over a file-like object, optionally hashing everything read """
+
+    def __init__(self, stream: BinaryIO, hasher=None):
+        self.stream = stream
+        self.hasher = hasher
+        self._pushed_back = b""
+
+    def read(self, n: int) -> bytes:
+        if self._pushed_back:
+            data, self._pushed_back = self._pushed_back[:n], self._pushed_back[n:]
+            return data
+        data = self.stream.read(n)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        return data
+
+    def read_exact(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self.read(n - len(data))
+            if not chunk:
+                raise EOFError("truncated zip archive")
+            data += chunk
+        return data
+
+    def unread(self, data: bytes):
+        self._pushed_back = data + self._pushed_back
+
+    def drain(self):
+        """ consume the rest of the stream, so the hash covers the whole file """
+        self._pushed_back = b""
+        while self.read(CHUNK_SIZE):
+            pass
+
+
+def _zip64_sizes(extra: bytes, compressed: int, uncompressed: int) -> Tuple[int, int, bool]:
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, pos)
+        if header_id == _ZIP64_EXTRA_ID:
+            values = extra[pos + 4:pos + 4 + length]
+            # only the sizes that overflowed in the header are present, uncompressed first
+            if uncompressed == 0xFFFFFFFF:
+                uncompressed, = struct.unpack_from("<Q", values)
+                values = values[8:]
+            if compressed == 0xFFFFFFFF:
+                compressed, = struct.unpack_from("<Q", values)
+            return compressed, uncompressed, True
+        pos += 4 + length
+    return compressed, uncompressed, False
+
+
+def _safe_path(dest: str, name: str) -> str:
+    path = os.path.realpath(os.path.join(dest, name))
+    if os.path.commonpath([path, os.path.realpath(dest)]) != os.path.realpath(dest):
+        raise ValueError(f"zip member {name} points outside of {dest}")
+    return path
+
+
+def stream_unzip(stream: BinaryIO, dest: str, chunk_size: int = CHUNK_SIZE, hasher=None) -> List[str]:
+    """
+    Extract a zip archive read sequentially from a file-like object, eg. an HTTP response.
+
+    Unlike `zipfile` this needs no seekable file, so archives can be unpacked while being downloaded
+    and never take disk space themselves. CRCs of the extracted files are checked.
+
+    Args:
+        stream (BinaryIO): The archive.
+        dest (str): Directory to extract to.
+        chunk_size (int, optional): Bytes read at a time. Defaults to 1 MB.
+        hasher (optional): A `hashlib` object updated with every byte of the archive.
+
+    Returns:
+        List[str]: Names of the extracted members.
+    """
+    reader = _StreamReader(stream, hasher)
+    names = []
+    while True:
+        signature = reader.read(4)
+        if len(signature) < 4 or struct.unpack("<I", signature)[0] != _LOCAL_HEADER_SIG:
+            # central directory, everything was extracted
+            break
+        (_, _, flags, method, _, _, crc, compressed, uncompressed, name_len, extra_len) = \
+            _LOCAL_HEADER.unpack(signature + reader.read_exact(_LOCAL_HEADER.size - 4))
+        name = reader.read_exact(name_len).decode("utf-8" if flags & _FLAG_UTF8 else "cp437")
+        compressed, uncompressed, zip64 = _zip64_sizes(reader.read_exact(extra_len), compressed, uncompressed)
+        if flags & _FLAG_ENCRYPTED:
+            raise ValueError(f"zip member {name} is encrypted")
+        has_descriptor = bool(flags & _FLAG_DATA_DESCRIPTOR)
+        path = _safe_path(dest, name)
+        if name.endswith("/"):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        actual_crc = 0
+        with open(os.devnull if name.endswith("/") else path, "wb") as out:
+            if method == 0:
+                if has_descriptor:
+                    raise ValueError(f"zip member {name} is stored with unknown size")
+                remaining = compressed
+                while remaining:
+                    data = reader.read_exact(min(chunk_size, remaining))
+                    remaining -= len(data)
+                    actual_crc = zlib.crc32(data, actual_crc)
+                    out.write(data)
+            elif method == 8:
+                decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                remaining = None if has_descriptor else compressed
+                while not decompressor.eof and remaining != 0:
+                    data = reader.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                    if not data:
+                        raise EOFError("truncated zip archive")
+                    if remaining is not None:
+                        remaining -= len(data)
+                    data = decompressor.decompress(data)
+                    actual_crc = zlib.crc32(data, actual_crc)
+                    out.write(data)
+                data = decompressor.flush()
+                actual_crc = zlib.crc32(data, actual_crc)
+                out.write(data)
+                # without sizes in the header, the compressed stream ends wherever zlib says
+                reader.unread(decompressor.unused_data)
+            else:
+                raise ValueError(f"zip member {name} uses unsupported compression method {method}")
+        if has_descriptor:
+            descriptor = reader.read_exact(4)
+            if struct.unpack("<I", descriptor)[0] == _DATA_DESCRIPTOR_SIG:
+                descriptor = reader.read_exact(4)
+            crc = struct.unpack("<I", descriptor)[0]
+            reader.read_exact(16 if zip64 else 8)
+        if actual_crc != crc:
+            raise ChecksumError(f"CRC mismatch for zip member {name}")
+        names.append(name)
+    reader.drain()
+    return names
+
+
+def unzip(path: str, dest: str) -> List[str]:
+    """
+    Extract a zip archive stored on disk.
+
+    The central directory of a seekable file has the sizes of every member, so unlike `stream_unzip` this
+    handles any archive `zipfile` can read, including stored members followed by a data descriptor.
+
+    Args:
+        path (str): The archive.
+        dest (str): Directory to extract to.
+
+    Returns:
+        List[str]: Names of the extracted members.
+    """
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        for name in names:
+            _safe_path(dest, name)
+        # zipfile checks the CRC of every member while extracting
+        z.extractall(dest)
+    return names
+
+
+def _move_into_place(extracted: str, dest: str):
+    entries = os.listdir(extracted)
+    # archives usually wrap the model in a single top level folder
+    if len(entries) == 1 and os.path.isdir(os.path.join(extracted, entries[0])):
+        os.replace(os.path.join(extracted, entries[0]), dest)
+        shutil.rmtree(extracted)
+    else:
+        os.replace(extracted, dest)
+
+
+def install_archive(url: str, dest: str, sha256: Optional[str] = None, connections: int = 4,
+                    stream: Optional[bool] = None, timeout: float = 30) -> str:
+    """
+    Download a zipped model and extract it to `dest`, unless another process already did.
+
+    With `stream` the archive is unpacked while it downloads and never stored, so peak disk use is the
+    size of the model, but an interrupted download starts over. Otherwise the archive is downloaded with
+    parallel, resumable range requests, extracted and then deleted.
+    By default streaming is only used when there is not enough free disk space for both copies.
+
+    Args:
+        url (str): The URL of the zip archive.
+        dest (str): Directory the model is installed to.
+        sha256 (str, optional): Expected hex digest of the archive. Defaults to None.
+        connections (int, optional): Maximum number of concurrent range requests. Defaults to 4.
+        stream (bool, optional): Extract while downloading. Defaults to None (automatic).
+        timeout (float, optional): Connection and read timeout in seconds. Defaults to 30.
+
+    Returns:
+        str: `dest`.
+    """
+    base_path = os.path.dirname(os.path.abspath(dest))
+    name = os.path.basename(dest.rstrip("/"))
+    with install_lock(os.path.join(base_path, f".{name}")):
+        if os.path.isdir(dest):
+            # installed by another process while waiting for the lock
+            return dest
+        staging = os.path.join(base_path, f".{name}.installing")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            zipped = os.path.join(base_path, url.split("/")[-1])
+            if stream is None:
+                size, _ = _probe(url, timeout)
+                stream = size is not None and not os.path.isfile(f"{zipped}.part") and \
+                    shutil.disk_usage(base_path).free < 2 * size
+            if stream:
+                LOG.info(f"Downloading and extracting {url}")
+                import requests
+                hasher = hashlib.sha256()
+                with requests.get(url, stream=True, timeout=timeout) as r:
+                    r.raise_for_status()
+                    r.raw.decode_content = True
+                    stream_unzip(r.raw, staging, hasher=hasher)
+                if sha256 and hasher.hexdigest() != sha256.lower():
+                    raise ChecksumError(f"sha256 of {url} does not match {sha256}")
+            else:
+                if os.path.isfile(zipped) and sha256 and sha256sum(zipped) != sha256.lower():
+                    # left behind by an older version, or corrupted since
+                    LOG.warning(f"sha256 of {zipped} does not match {sha256}, downloading it again")
+                    os.remove(zipped)
+                if not os.path.isfile(zipped):
+                    LOG.info(f"Downloading {url}")
+                    download_file(url, zipped, sha256=sha256, connections=connections, timeout=timeout)
+                LOG.debug(f"Unzipping downloaded model to {dest}")
+                unzip(zipped, staging)
+                LOG.debug(f"Deleting temporary zip file: {zipped}")
+                os.remove(zipped)
+            _move_into_place(staging, dest)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    return dest
@@ -0,0 +1,339 @@
+import re
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+# FLORES-200 codes of every language NLLB translates, and the primary language subtag of each
+LANG_MAP = {
+    "ace_Arab": "ace",
+    "ace_Latn": "ace",
+    "acm_Arab": "acm",
+    "acq_Arab": "acq",
+    "aeb_Arab": "aeb",
+    "afr_Latn": "af",
+    "ajp_Arab": "ajp",
+    "aka_Latn": "ak",
+    "amh_Ethi": "am",
+    "apc_Arab": "apc",
+    "arb_Arab": "ar",
+    "ars_Arab": "ars",
+    "ary_Arab": "ary",
+    "arz_Arab": "arz",
+    "asm_Beng": "as",
+    "ast_Latn": "ast",
+    "awa_Deva": "awa",
+    "ayr_Latn": "ayr",
+    "azb_Arab": "azb",
+    "azj_Latn": "az",
+    "bak_Cyrl": "ba",
+    "bam_Latn": "bm",
+    "ban_Latn": "ban",
+    "bel_Cyrl": "be",
+    "bem_Latn": "bem",
+    "ben_Beng": "bn",
+    "bho_Deva": "bho",
+    "bjn_Arab": "bjn",
+    "bjn_Latn": "bjn",
+    "bod_Tibt": "bo",
+    "bos_Latn": "bs",
+    "bug_Latn": "bug",
+    "bul_Cyrl": "bg",
+    "cat_Latn": "ca",
+    "ceb_Latn": "ceb",
+    "ces_Latn": "cs",
+    "cjk_Latn": "cjk",
+    "ckb_Arab": "ckb",
+    "crh_Latn": "crh",
+    "cym_Latn": "cy",
+    "dan_Latn": "da",
+    "deu_Latn": "de",
+    "dik_Latn": "dik",
+    "dyu_Latn": "dyu",
+    "dzo_Tibt": "dz",
+    "ell_Grek": "el",
+    "eng_Latn": "en",
+    "epo_Latn": "eo",
+    "est_Latn": "et",
+    "eus_Latn": "eu",
+    "ewe_Latn": "ee",
+    "fao_Latn": "fo",
+    "pes_Arab": "pes",
+    "fij_Latn": "fj",
+    "fin_Latn": "fi",
+    "fon_Latn": "fon",
+    "fra_Latn": "fr",
+    "fur_Latn": "fur",
+    "fuv_Latn": "fuv",
+    "gla_Latn": "gd",
+    "gle_Latn": "ga",
+    "glg_Latn": "gl",
+    "grn_Latn": "gn",
+    "guj_Gujr": "gu",
+    "hat_Latn": "ht",
+    "hau_Latn": "ha",
+    "heb_Hebr": "he",
+    "hin_Deva": "hi",
+    "hne_Deva": "hne",
+    "hrv_Latn": "hr",
+    "hun_Latn": "hu",
+    "hye_Armn": "hy",
+    "ibo_Latn": "ig",
+    "ilo_Latn": "ilo",
+    "ind_Latn": "id",
+    "isl_Latn": "is",
+    "ita_Latn": "it",
+    "jav_Latn": "jv",
+    "jpn_Jpan": "ja",
+    "kab_Latn": "kab",
+    "kac_Latn": "kac",
+    "kam_Latn": "kam",
+    "kan_Knda": "kn",
+    "kas_Arab": "kas",
+    "kas_Deva": "ks",
+    "kat_Geor": "ka",
+    "knc_Arab": "knc",
+    "knc_Latn": "knc",
+    "kaz_Cyrl": "kk",
+    "kbp_Latn": "kbp",
+    "kea_Latn": "kea",
+    "khm_Khmr": "km",
+    "kik_Latn": "ki",
+    "kin_Latn": "rw",
+    "kir_Cyrl": "ky",
+    "kmb_Latn": "kmb",
+    "kon_Latn": "kg",
+    "kor_Hang": "ko",
+    "kmr_Latn": "kmr",
+    "lao_Laoo": "lo",
+    "lvs_Latn": "lv",
+    "lij_Latn": "lij",
+    "lim_Latn": "li",
+    "lin_Latn": "ln",
+    "lit_Latn": "lt",
+    "lmo_Latn": "lmo",
+    "ltg_Latn": "ltg",
+    "ltz_Latn": "lb",
+    "lua_Latn": "lua",
+    "lug_Latn": "lg",
+    "luo_Latn": "luo",
+    "lus_Latn": "lus",
+    "mag_Deva": "mag",
+    "mai_Deva": "mai",
+    "mal_Mlym": "ml",
+    "mar_Deva": "mr",
+    "min_Latn": "min",
+    "mkd_Cyrl": "mk",
+    "plt_Latn": "plt",
+    "mlt_Latn": "mt",
+    "mni_Beng": "mni",
+    "khk_Cyrl": "khk",
+    "mos_Latn": "mos",
+    "mri_Latn": "mi",
+    "zsm_Latn": "zsm",
+    "mya_Mymr": "my",
+    "nld_Latn": "nl",
+    "nno_Latn": "nn",
+    "nob_Latn": "nb",
+    "npi_Deva": "npi",
+    "nso_Latn": "nso",
+    "nus_Latn": "nus",
+    "nya_Latn": "ny",
+    "oci_Latn": "oc",
+    "gaz_Latn": "gaz",
+    "ory_Orya": "or",
+    "pag_Latn": "pag",
+    "pan_Guru": "pa",
+    "pap_Latn": "pap",
+    "pol_Latn": "pl",
+    "por_Latn": "pt",
+    "prs_Arab": "prs",
+    "pbt_Arab": "pbt",
+    "quy_Latn": "quy",
+    "ron_Latn": "ro",
+    "run_Latn": "rn",
+    "rus_Cyrl": "ru",
+    "sag_Latn": "sg",
+    "san_Deva": "sa",
+    "sat_Beng": "sat",
+    "scn_Latn": "scn",
+    "shn_Mymr": "shn",
+    "sin_Sinh": "si",
+    "slk_Latn": "sk",
+    "slv_Latn": "sl",
+    "smo_Latn": "sm",
+    "sna_Latn": "sn",
+    "snd_Arab": "sd",
+    "som_Latn": "so",
+    "sot_Latn": "st",
+    "spa_Latn": "es",
+    "als_Latn": "gsw",
+    "srd_Latn": "sc",
+    "srp_Cyrl": "sr",
+    "ssw_Latn": "ss",
+    "sun_Latn": "su",
+    "swe_Latn": "sv",
+    "swh_Latn": "sw",
+    "szl_Latn": "szl",
+    "tam_Taml": "ta",
+    "tat_Cyrl": "tt",
+    "tel_Telu": "te",
+    "tgk_Cyrl": "tg",
+    "tgl_Latn": "tl",
+    "tha_Thai": "th",
+    "tir_Ethi": "ti",
+    "taq_Latn": "taq",
+    "taq_Tfng": "taq",
+    "tpi_Latn": "tpi",
+    "tsn_Latn": "tn",
+    "tso_Latn": "ts",
+    "tuk_Latn": "tk",
+    "tum_Latn": "tum",
+    "tur_Latn": "tr",
+    "twi_Latn": "tw",
+    "tzm_Tfng": "tzm",
+    "uig_Arab": "ug",
+    "ukr_Cyrl": "uk",
+    "umb_Latn": "umb",
+    "urd_Arab": "ur",
+    "uzn_Latn": "uz",
+    "vec_Latn": "vec",
+    "vie_Latn": "vi",
+    "war_Latn": "war",
+    "wol_Latn": "wo",
+    "xho_Latn": "xh",
+    "ydd_Hebr": "yi",
+    "yor_Latn": "yo",
+    "yue_Hant": "yue",
+    "zho_Hans": "zh",
+    "zho_Hant": "zh",
+    "zul_Latn": "zu"
+}
+# several FLORES codes share a language, the script used when the language code alone is given
+DEFAULT_SCRIPTS = {
+    "ace": "Latn",
+    "bjn": "Latn",
+    "knc": "Latn",
+    "taq": "Latn",
+    "zho": "Hans",
+}
+# regions writing a language in another script than its default
+REGION_SCRIPTS = {
+    ("zh", "TW"): "Hant",
+    ("zh", "HK"): "Hant",
+    ("zh", "MO"): "Hant",
+    ("zho", "TW"): "Hant",
+    ("zho", "HK"): "Hant",
+    ("zho", "MO"): "Hant",
+}
+# common codes of languages NLLB knows under a more specific code
+ALIASES = {
+    "fa": "pes_Arab",
+    "fil": "tgl_Latn",
+    "in": "ind_Latn",
+    "iw": "heb_Hebr",
+    "ji": "ydd_Hebr",
+    "mg": "plt_Latn",
+    "mn": "khk_Cyrl",
+    "ms": "zsm_Latn",
+    "ne": "npi_Deva",
+    "no": "nob_Latn",
+    "om": "gaz_Latn",
+    "ps": "pbt_Arab",
+    "qu": "quy_Latn",
+}
+
+MAX_CACHED_CODES = 4096
+
+_SUBTAG = re.compile(r"[A-Za-z0-9]+")
+
+
+def normalize_tag(code: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Split a BCP 47 (or FLORES) language code into normalized subtags.
+
+    Case and "_" / "-" separators are ignored, extension and variant subtags are dropped.
+
+    Args:
+        code (str): The language code, eg. "zh_hant-TW", "en-us" or "eng_Latn".
+
+    Returns:
+        Tuple[str, Optional[str], Optional[str]]: (language, script, region), eg. ("zh", "Hant", "TW").
+    """
+    subtags = _SUBTAG.findall(code.strip())
+    if not subtags:
+        return "", None, None
+    language, script, region = subtags[0].lower(), None, None
+    for subtag in subtags[1:]:
+        if len(subtag) == 4 and subtag.isalpha() and script is None and region is None:
+            script = subtag.title()
+        elif (len(subtag) == 2 and subtag.isalpha()) or (len(subtag) == 3 and subtag.isdigit()):
+            if region is None:
+                region = subtag.upper()
+        elif len(subtag) == 1:
+            # singleton, extensions and private use follow
+            break
+    return language, script, region
+
+
+class LanguageResolver:
+    """
+    Maps BCP 47 language codes to the FLORES-200 codes used by NLLB.
+
+    The lookup tables are built once from the plugin's language map, results are memoized per code.
+    """
+
+    def __init__(self, lang_map: Mapping[str, str]):
+        """
+        Args:
+            lang_map (Mapping[str, str]): FLORES code -> BCP 47 primary language subtag.
+        """
+        self.lang_map = dict(lang_map)
+        self.codes: FrozenSet[str] = frozenset(self.lang_map.values())
+        by_iso3: Dict[str, List[str]] = {}
+        for flores in self.lang_map:
+            by_iso3.setdefault(flores.split("_")[0], []).append(flores)
+        # language subtag (BCP 47 or the ISO 639-3 part of the FLORES code) -> every script variant
+        self._by_language: Dict[str, List[str]] = {}
+        for flores, lang in self.lang_map.items():
+            for key in (lang, flores.split("_")[0]):
+                variants = self._by_language.setdefault(key, [])
+                for variant in [flores] + by_iso3[flores.split("_")[0]]:
+                    if variant not in variants:
+                        variants.append(variant)
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def resolve(self, code: str) -> Optional[str]:
+        """
+        FLORES code for a language code.
+
+        Args:
+            code (str): The language code, eg. "en-us", "zh-TW", "sr-Latn" or "eng_Latn".
+
+        Returns:
+            Optional[str]: The FLORES code, eg. "eng_Latn", None for unsupported languages.
+        """
+        try:
+            return self._cache[code]
+        except KeyError:
+            pass
+        flores = self._resolve(code)
+        if len(self._cache) >= MAX_CACHED_CODES:
+            # arbitrary user input (eg. over HTTP) must not grow the cache forever
+            self._cache.clear()
+        self._cache[code] = flores
+        return flores
+
+    def _resolve(self, code: str) -> Optional[str]:
+        if code in self.lang_map:
+            return code
+        language, script, region = normalize_tag(code)
+        candidates = self._by_language.get(language)
+        if not candidates:
+            return ALIASES.get(language)
+        if len(candidates) == 1:
+            # single script language, a different script subtag (eg. sr-Latn) still gets the language right
+            return candidates[0]
+        iso3 = candidates[0].split("_")[0]
+        script = script or REGION_SCRIPTS.get((language, region)) or DEFAULT_SCRIPTS.get(iso3)
+        for flores in candidates:
+            if flores.split("_")[1] == script:
+                return flores
+        return candidates[0]
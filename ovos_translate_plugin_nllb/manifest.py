@@ -0,0 +1,113 @@
+"""
+Per-model install manifests, so startup finds installed models without touching the network.
+
+A manifest lists the files of a model with their size and sha256, written once at install time.
+At startup the sizes are compared against the files on disk, a check that costs a few `stat` calls.
+"""
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from ovos_utils.log import LOG
+from ovos_utils.xdg_utils import xdg_data_home
+
+from ovos_translate_plugin_nllb.download import sha256sum
+
+
+def manifest_path(name: str) -> str:
+    """
+    Location of the manifest of a model or tokenizer.
+
+    Args:
+        name (str): The model name, as given in the plugin config.
+
+    Returns:
+        str: Path of the manifest json file.
+    """
+    name = os.path.basename(name.rstrip("/"))
+    return f"{xdg_data_home()}/ctranslate2/{name}.manifest.json"
+
+
+def write_manifest(name: str, path: str, source: str = "", hashes: bool = True) -> Dict:
+    """
+    Record the files of an installed model.
+
+    Args:
+        name (str): The model name, as given in the plugin config.
+        path (str): The model directory, or the file of a single file model such as a tokenizer.
+        source (str, optional): Where the model was installed from. Defaults to "".
+        hashes (bool, optional): Also store the sha256 of every file. Defaults to True.
+
+    Returns:
+        Dict: The manifest.
+    """
+    if os.path.isfile(path):
+        files = [os.path.basename(path)]
+        root = os.path.dirname(path)
+    else:
+        root = path
+        files = sorted(os.path.relpath(os.path.join(d, f), root)
+                       for d, _, names in os.walk(path, followlinks=True) for f in names)
+    manifest = {
+        "name": name,
+        "path": os.path.abspath(path),
+        "source": source,
+        "installed_at": time.time(),
+        "files": {f: {"size": os.path.getsize(os.path.join(root, f)),
+                      "sha256": sha256sum(os.path.join(root, f)) if hashes else None}
+                  for f in files}
+    }
+    target = manifest_path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, target)
+    return manifest
+
+
+def load_manifest(name: str) -> Optional[Dict]:
+    """
+    Load the manifest of a model.
+
+    Args:
+        name (str): The model name, as given in the plugin config.
+
+    Returns:
+        Dict: The manifest, None if the model was installed without one.
+    """
+    try:
+        with open(manifest_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def check_manifest(manifest: Dict, full: bool = False) -> bool:
+    """
+    Check that the files of an installed model are all there.
+
+    Args:
+        manifest (Dict): The manifest of the model.
+        full (bool, optional): Also compare hashes, which reads every file. Defaults to False, sizes only.
+
+    Returns:
+        bool: True when the installed model matches its manifest.
+    """
+    path = manifest["path"]
+    root = os.path.dirname(path) if os.path.isfile(path) else path
+    for name, info in manifest["files"].items():
+        file_path = os.path.join(root, name)
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            LOG.warning(f"{manifest['name']} is missing {name}")
+            return False
+        if size != info["size"]:
+            LOG.warning(f"{manifest['name']}: {name} is {size} bytes, expected {info['size']}")
+            return False
+        if full and info.get("sha256") and sha256sum(file_path) != info["sha256"]:
+            LOG.warning(f"{manifest['name']}: {name} is corrupted")
+            return False
+    return True
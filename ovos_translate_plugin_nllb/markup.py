@@ -0,0 +1,220 @@
+"""
+Translate HTML, SSML and Markdown payloads without sending markup to the model.
+
+The payload is split into markup and text nodes, joining the pieces gives back the payload unchanged.
+Only the text nodes are translated, tags, attributes, comments and code are copied through.
+"""
+import html
+import re
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+FORMATS = ("html", "ssml", "markdown")
+# elements whose content is code, or must be spoken exactly as written
+SKIP_ELEMENTS = {
+    "html": {"script", "style", "code", "pre", "kbd", "samp", "var", "textarea", "math", "svg", "template"},
+    "ssml": {"phoneme", "say-as", "sub", "lang"},
+}
+# elements without content, they have no closing tag
+_VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source",
+                  "track", "wbr"}
+# content of these is not parsed as markup, "<" in a script does not open a tag
+_RAW_TEXT_ELEMENTS = {"script", "style"}
+
+_TAG = re.compile(r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<[!?][^>]*>"
+                  r"|</?[A-Za-z][^\s/>]*(?:[^>\"']|\"[^\"]*\"|'[^']*')*>", re.S)
+_TAG_NAME = re.compile(r"</?([A-Za-z][^\s/>]*)")
+# the HTML translate attribute and the class honoured by most translation tools
+_NO_TRANSLATE = re.compile(r"\btranslate\s*=\s*[\"']?no\b|\bclass\s*=\s*[\"'][^\"']*\bnotranslate\b", re.I)
+# markup whitespace, a non breaking space is text
+_SPACES = re.compile(r"[ \t\r\n\f]+")
+_ENTITY = re.compile(r"&(?:#\d+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);")
+_MARKDOWN = re.compile(r"""
+    ^[ \t]*(?P<fence>```|~~~).*?^[ \t]*(?P=fence)[ \t]*$       # fenced code block
+  | `[^`\n]+`                                                   # inline code
+  | <!--.*?--> | </?[A-Za-z][^>\n]*>                           # inline html and autolinks
+  | !?\[ | \]\([^)\n]*\) | \]\[[^\]\n]*\] | \]:[^\n]*          # links, images and references
+  | ^[ \t]*(?:\#{1,6}|[-*+]|\d+[.)]|>)[ \t]+                    # headings, list items and quotes
+  | \*\*|__|~~|(?<!\w)[*_]|[*_](?!\w)                           # emphasis
+  | \| | \n
+""", re.M | re.S | re.X)
+
+
+def split_html(payload: str, skip: frozenset = frozenset()) -> List[Tuple[str, bool]]:
+    """
+    Split HTML or XML (SSML) into markup and text.
+
+    Args:
+        payload (str): The markup.
+        skip (frozenset, optional): Lowercase element names whose content is not translated.
+
+    Returns:
+        List[Tuple[str, bool]]: (piece, is translatable text) pairs, joining the pieces gives back `payload`.
+    """
+    pieces = []
+    skipping: List[str] = []  # open elements since the first one that is not translated
+    pos = 0
+    while pos < len(payload):
+        match = _TAG.search(payload, pos)
+        if match is None:
+            pieces.append((payload[pos:], not skipping))
+            break
+        if match.start() > pos:
+            pieces.append((payload[pos:match.start()], not skipping))
+        tag, end = match.group(), match.end()
+        name = _TAG_NAME.match(tag)
+        if name is not None:
+            name = name.group(1).lower()
+            if tag.startswith("</"):
+                if name in skipping:
+                    while skipping.pop() != name:
+                        pass
+            elif not tag.endswith("/>") and name not in _VOID_ELEMENTS:
+                if name in _RAW_TEXT_ELEMENTS:
+                    close = re.compile(rf"</{name}\s*>", re.I).search(payload, end)
+                    end = close.end() if close else len(payload)
+                    tag = payload[match.start():end]
+                elif skipping or name in skip or _NO_TRANSLATE.search(tag):
+                    skipping.append(name)
+        pieces.append((tag, False))
+        pos = end
+    return pieces
+
+
+def split_markdown(payload: str) -> List[Tuple[str, bool]]:
+    """
+    Split Markdown into syntax and text, every line is translated on its own.
+
+    Args:
+        payload (str): The Markdown document.
+
+    Returns:
+        List[Tuple[str, bool]]: (piece, is translatable text) pairs, joining the pieces gives back `payload`.
+    """
+    pieces = []
+    pos = 0
+    for match in _MARKDOWN.finditer(payload):
+        if match.start() > pos:
+            pieces.append((payload[pos:match.start()], True))
+        if match.group():
+            pieces.append((match.group(), False))
+        pos = match.end()
+    if pos < len(payload):
+        pieces.append((payload[pos:], True))
+    return pieces
+
+
+def split_markup(payload: str, markup: str = "html") -> List[Tuple[str, bool]]:
+    """
+    Args:
+        payload (str): The document.
+        markup (str, optional): "html", "ssml" or "markdown". Defaults to "html".
+
+    Returns:
+        List[Tuple[str, bool]]: (piece, is translatable text) pairs, joining the pieces gives back `payload`.
+    """
+    if markup == "markdown":
+        return split_markdown(payload)
+    if markup in SKIP_ELEMENTS:
+        return split_html(payload, frozenset(SKIP_ELEMENTS[markup]))
+    raise ValueError(f"Unsupported markup: {markup}, expected one of {FORMATS}")
+
+
+def unescape(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Replace character references with the characters they stand for.
+
+    Returns:
+        Tuple[str, Dict[str, str]]: The plain text, and the reference used in `text` for each character.
+    """
+    entities = {}
+    for match in _ENTITY.finditer(text):
+        char = html.unescape(match.group())
+        if char != match.group():
+            entities.setdefault(char, match.group())
+    return html.unescape(text), entities
+
+
+def escape(text: str, entities: Dict[str, str], escape_markup: bool = True) -> str:
+    """
+    Write characters back as the references the source text used for them.
+
+    Args:
+        text (str): The plain text.
+        entities (Dict[str, str]): References by character, as returned by `unescape`.
+        escape_markup (bool, optional): Escape "&", "<" and ">" even if the source did not. Defaults to True.
+
+    Returns:
+        str: The text to insert into the document.
+    """
+    if escape_markup:
+        text = html.escape(text, quote=False)
+    # "&" first, the references inserted later must not be escaped again
+    for char, entity in sorted(entities.items(), key=lambda item: item[0] != "&"):
+        if not (escape_markup and char in "&<>"):
+            text = text.replace(char, entity)
+    return text
+
+
+class MarkupTranslator:
+    """
+    Translates the text nodes of HTML, SSML or Markdown payloads in a single deduplicated batch.
+
+    Whitespace around text nodes, tags, attributes and character references are kept. Elements whose content
+    is code or spelled out speech (`<code>`, `<say-as>`, ...), `translate="no"` and `class="notranslate"`
+    elements and Markdown code are not translated.
+    """
+
+    def __init__(self, translator: "NLLB200Translator", markup: str = "html"):
+        """
+        Args:
+            translator (NLLB200Translator): The loaded translator.
+            markup (str, optional): "html", "ssml" or "markdown". Defaults to "html".
+        """
+        if markup not in FORMATS:
+            raise ValueError(f"Unsupported markup: {markup}, expected one of {FORMATS}")
+        self.translator = translator
+        self.markup = markup
+
+    def translate(self, payloads: List[str], target: str = "", source: str = "") -> List[str]:
+        """
+        Translate documents, the text nodes of all of them are translated together.
+
+        Args:
+            payloads (List[str]): The documents.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Returns:
+            List[str]: The translated documents, in input order.
+        """
+        tx = self.translator
+        src_lang, tgt_lang = tx._resolve_languages(source, target)
+        documents = [split_markup(payload, self.markup) for payload in payloads]
+        escape_markup = self.markup != "markdown"
+        nodes: List[Tuple[List[str], int, Dict[str, str]]] = []  # (output pieces, piece index, entities)
+        sentences = []
+        outputs = []
+        for pieces in documents:
+            out = [piece for piece, _ in pieces]
+            for idx, (piece, translatable) in enumerate(pieces):
+                text, entities = unescape(piece)
+                text = _SPACES.sub(" ", text).strip(" ")
+                if translatable and any(c.isalpha() for c in text):
+                    nodes.append((out, idx, entities))
+                    sentences.append(text)
+            outputs.append(out)
+
+        if sentences:
+            translations, missing = tx._lookup_cache(sentences, src_lang, tgt_lang)
+            if missing:
+                translated = tx._translate_sentences([sentences[idx] for idx in missing], src_lang, tgt_lang)
+                tx._store_translations(translations, missing, translated, sentences, src_lang, tgt_lang)
+            for (out, idx, entities), translation in zip(nodes, translations):
+                piece = out[idx]
+                lead = piece[:len(piece) - len(piece.lstrip())]
+                trail = piece[len(piece.rstrip()):]
+                out[idx] = lead + escape(translation, entities, escape_markup) + trail
+        return ["".join(out) for out in outputs]
@@ -0,0 +1,39 @@
+import ctypes
+import ctypes.util
+import os
+import platform
+import resource
+
+from ovos_utils.log import LOG
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of this process.
+
+    Returns:
+        float: Current RSS in MB, the peak RSS where the current value is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on linux, bytes on macos
+        return peak / 1024 / 1024 if platform.system() == "Darwin" else peak / 1024
+
+
+def release_memory():
+    """
+    Ask the allocator to hand freed memory back to the OS.
+
+    glibc keeps freed heap pages around, without this the RSS barely drops after unloading a model.
+    """
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return
+    try:
+        ctypes.CDLL(libc_name).malloc_trim(0)
+    except (OSError, AttributeError) as e:
+        LOG.debug(f"malloc_trim not available: {e}")
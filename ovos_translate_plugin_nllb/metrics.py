@@ -0,0 +1,283 @@
+"""
+Timing spans and token counters of the translation hot path.
+
+Disabled unless the `metrics` config key is set, the translator then only checks for `None`.
+"""
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional
+
+from ovos_utils.log import LOG
+
+# language resolution, sp.encode, translate_batch, sp.decode and removing the target language prefix
+STAGES = ("resolve", "encode", "translate_batch", "decode", "strip")
+QUANTILES = (0.5, 0.95, 0.99)
+# shared by every disabled span
+NO_SPAN = nullcontext()
+
+_current_call: "contextvars.ContextVar[Optional[Dict]]" = contextvars.ContextVar("nllb_call", default=None)
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    """ nearest rank quantile """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_span(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _Call:
+    __slots__ = ("metrics", "name", "record", "token", "start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        if _current_call.get() is not None:
+            # translate() inside translate_many() & co, the outer call owns the record
+            self.record = None
+            return self
+        self.record = {"call": self.name, "spans": {}, "sentences": 0, "batch_sizes": [],
+                       "input_tokens": 0, "output_tokens": 0}
+        self.token = _current_call.set(self.record)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.record is not None:
+            _current_call.reset(self.token)
+            self.metrics._finish_call(self.record, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Collects per stage timings, batch sizes and token counts.
+
+    Percentiles are computed over the last `window` samples of every stage, counters are totals since start.
+    Every finished call is passed to the registered callbacks as a dict:
+
+        {"call": "translate", "seconds": 0.12, "spans": {"encode": 0.001, "translate_batch": 0.11, ...},
+         "sentences": 2, "batch_sizes": [2], "input_tokens": 14, "output_tokens": 16, "tokens_per_second": 145.4}
+    """
+
+    def __init__(self, window: int = 2048):
+        """
+        Args:
+            window (int, optional): Samples kept per stage for percentiles. Defaults to 2048.
+        """
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {stage: deque(maxlen=window) for stage in STAGES + ("call",)}
+        self._batch_sizes: Deque[int] = deque(maxlen=window)
+        self.seconds: Dict[str, float] = {stage: 0.0 for stage in STAGES + ("call",)}
+        self.counts: Dict[str, int] = {stage: 0 for stage in STAGES + ("call",)}
+        self.sentences = 0
+        self.batches = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.callbacks: List[Callable[[Dict], None]] = []
+        self._stop = threading.Event()
+        self._http: Optional[ThreadingHTTPServer] = None
+
+    # recording
+    def span(self, stage: str) -> _Span:
+        """
+        Context manager timing one stage, eg. `with metrics.span("encode"): ...`.
+        """
+        return _Span(self, stage)
+
+    def call(self, name: str) -> _Call:
+        """
+        Context manager grouping the spans of one public call into a record for the callbacks.
+        """
+        return _Call(self, name)
+
+    def add_span(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self.seconds[stage] += seconds
+            self.counts[stage] += 1
+        record = _current_call.get()
+        if record is not None:
+            record["spans"][stage] = record["spans"].get(stage, 0.0) + seconds
+
+    def add_batch(self, sentences: int, input_tokens: int, output_tokens: int):
+        """
+        Count a `translate_batch` call.
+        """
+        with self._lock:
+            self._batch_sizes.append(sentences)
+            self.batches += 1
+            self.sentences += sentences
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+        record = _current_call.get()
+        if record is not None:
+            record["batch_sizes"].append(sentences)
+            record["sentences"] += sentences
+            record["input_tokens"] += input_tokens
+            record["output_tokens"] += output_tokens
+
+    def _finish_call(self, record: Dict, seconds: float):
+        record["seconds"] = seconds
+        model_seconds = record["spans"].get("translate_batch", 0.0)
+        record["tokens_per_second"] = record["output_tokens"] / model_seconds if model_seconds else 0.0
+        with self._lock:
+            self._samples["call"].append(seconds)
+            self.seconds["call"] += seconds
+            self.counts["call"] += 1
+        for callback in self.callbacks:
+            try:
+                callback(record)
+            except Exception:
+                LOG.exception("Metrics callback failed")
+
+    def add_callback(self, callback: Callable[[Dict], None]):
+        """
+        Call `callback(record)` after every translation call, see the class docstring for the record.
+        """
+        self.callbacks.append(callback)
+
+    # reporting
+    def summary(self) -> Dict:
+        """
+        Returns:
+            Dict: p50/p95/p99 seconds and totals per stage, batch size percentiles and token counters.
+        """
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            batch_sizes = sorted(self._batch_sizes)
+            stages = {stage: {"count": self.counts[stage], "seconds": self.seconds[stage],
+                              **{f"p{int(q * 100)}": _quantile(samples[stage], q) for q in QUANTILES}}
+                      for stage in samples}
+            model_seconds = self.seconds["translate_batch"]
+            return {"stages": stages,
+                    "batch_size": {f"p{int(q * 100)}": _quantile(batch_sizes, q) for q in QUANTILES},
+                    "batches": self.batches,
+                    "sentences": self.sentences,
+                    "input_tokens": self.input_tokens,
+                    "output_tokens": self.output_tokens,
+                    "input_tokens_per_second": self.input_tokens / model_seconds if model_seconds else 0.0,
+                    "output_tokens_per_second": self.output_tokens / model_seconds if model_seconds else 0.0}
+
+    def prometheus(self, prefix: str = "nllb") -> str:
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        summary = self.summary()
+        lines = [f"# HELP {prefix}_stage_seconds Time spent in each stage of a translation.",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, values in summary["stages"].items():
+            for q in QUANTILES:
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f'{values[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {values["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+        lines += [f"# HELP {prefix}_batch_size Sentences per translate_batch call.",
+                  f"# TYPE {prefix}_batch_size summary"]
+        for q in QUANTILES:
+            lines.append(f'{prefix}_batch_size{{quantile="{q}"}} {summary["batch_size"][f"p{int(q * 100)}"]}')
+        lines.append(f"{prefix}_batch_size_sum {summary['sentences']}")
+        lines.append(f"{prefix}_batch_size_count {summary['batches']}")
+        for name, help_text in (("input_tokens", "Source tokens translated."),
+                                ("output_tokens", "Target tokens generated.")):
+            lines += [f"# HELP {prefix}_{name}_total {help_text}",
+                      f"# TYPE {prefix}_{name}_total counter",
+                      f"{prefix}_{name}_total {summary[name]}"]
+        lines += [f"# HELP {prefix}_output_tokens_per_second Generated tokens per second of translate_batch.",
+                  f"# TYPE {prefix}_output_tokens_per_second gauge",
+                  f"{prefix}_output_tokens_per_second {summary['output_tokens_per_second']:.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def log_summary(self):
+        summary = self.summary()
+        stages = ", ".join(f"{stage} {v['p50'] * 1000:.1f}/{v['p95'] * 1000:.1f}/{v['p99'] * 1000:.1f}"
+                           for stage, v in summary["stages"].items() if v["count"])
+        LOG.info(f"NLLB p50/p95/p99 ms: {stages or 'no translations'} | "
+                 f"{summary['batches']} batches, {summary['output_tokens_per_second']:.1f} tokens/s")
+
+    # sinks
+    def start_log_summaries(self, interval: float = 60):
+        """
+        Log p50/p95/p99 of every stage every `interval` seconds until `close`.
+        """
+        def run():
+            while not self._stop.wait(interval):
+                self.log_summary()
+
+        threading.Thread(target=run, daemon=True, name="nllb-metrics-log").start()
+
+    def start_prometheus_server(self, port: int = 9464, host: str = "0.0.0.0") -> int:
+        """
+        Serve `prometheus()` on http://host:port/metrics in a background thread.
+
+        Returns:
+            int: The bound port, useful when started with port 0.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._http.serve_forever, daemon=True, name="nllb-metrics-http").start()
+        return self._http.server_address[1]
+
+    def close(self):
+        """
+        Stop the log summaries and the Prometheus server.
+        """
+        self._stop.set()
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+
+def instrumented(name: str):
+    """
+    Decorator recording a translator method as one call, free when the translator has no `metrics`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return func(self, *args, **kwargs)
+            with self.metrics.call(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,432 @@
+"""
+Multi-process front end for many-core hosts.
+
+Each worker process owns its own model pinned to a disjoint set of cores, so SentencePiece and the Python
+side of translation run in parallel instead of contending for a single GIL.
+"""
+import glob
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from ovos_utils.log import LOG
+
+# characters per subword token, a rough estimate good enough to balance load
+_CHARS_PER_TOKEN = 4
+
+
+def _parse_cpulist(cpulist: str) -> Set[int]:
+    """ "0-3,8-11" -> {0, 1, 2, 3, 8, 9, 10, 11} """
+    cpus = set()
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cpus.update(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def numa_nodes() -> List[Set[int]]:
+    """
+    CPUs usable by this process, grouped by NUMA node.
+
+    Returns:
+        List[Set[int]]: One set of CPU ids per node, a single set on machines without NUMA information.
+    """
+    available = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else set(range(os.cpu_count() or 1))
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        try:
+            with open(path) as f:
+                cpus = _parse_cpulist(f.read()) & available
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [available]
+
+
+def split_cores(workers: int, nodes: Optional[List[Set[int]]] = None) -> List[List[int]]:
+    """
+    Give each worker its own cores, keeping a worker within a single NUMA node where possible.
+
+    Args:
+        workers (int): Number of worker processes.
+        nodes (List[Set[int]], optional): CPUs per NUMA node. Defaults to `numa_nodes()`.
+
+    Returns:
+        List[List[int]]: The CPU ids of each worker.
+    """
+    nodes = [sorted(node) for node in (nodes or numa_nodes())]
+    if workers <= len(nodes):
+        # fewer workers than nodes, spread the nodes over the workers
+        return [list(itertools.chain(*nodes[i::workers])) for i in range(workers)]
+    # workers per node proportional to its size
+    total = sum(len(node) for node in nodes)
+    counts = [max(1, round(workers * len(node) / total)) for node in nodes]
+    while sum(counts) > workers:
+        counts[counts.index(max(counts))] -= 1
+    while sum(counts) < workers:
+        counts[counts.index(min(counts))] += 1
+    cpu_sets = []
+    for node, count in zip(nodes, counts):
+        for i in range(count):
+            if count > len(node):
+                # more workers than cores, they take turns on them
+                cpu_sets.append([node[i % len(node)]])
+            else:
+                cpu_sets.append(node[i * len(node) // count:(i + 1) * len(node) // count])
+    return cpu_sets
+
+
+def _worker_main(worker_id: int, config: Dict, cpus: List[int],
+                 jobs: multiprocessing.Queue, results: multiprocessing.Queue):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    # imported here so only the worker processes load the model
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    try:
+        tx = NLLB200Translator(config={**config, "intra_threads": len(cpus), "inter_threads": 1,
+                                       "lazy_load": False, "background_load": False})
+    except Exception as e:
+        results.put((worker_id, None, False, e))
+        return
+    results.put((worker_id, None, True, "ready"))
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, texts, target, source = job
+        try:
+            translations = tx.translate(texts, target, source)
+            # a single sentence comes back as a plain string
+            if isinstance(translations, str):
+                translations = [translations]
+            results.put((worker_id, job_id, True, translations))
+        except Exception as e:
+            results.put((worker_id, job_id, False, e))
+
+
+class _Job:
+    __slots__ = ("texts", "target", "source", "future", "tokens", "worker", "attempts")
+
+    def __init__(self, texts: List[str], target: str, source: str):
+        self.texts = texts
+        self.target = target
+        self.source = source
+        self.future = Future()
+        self.tokens = sum(len(t) for t in texts) // _CHARS_PER_TOKEN + len(texts)
+        self.worker = None
+        self.attempts = 0
+
+
+class _Worker:
+    __slots__ = ("worker_id", "cpus", "process", "jobs", "pending", "tokens", "ready", "crashes", "error")
+
+    def __init__(self, worker_id: int, cpus: List[int]):
+        self.worker_id = worker_id
+        self.cpus = cpus
+        self.process = None
+        self.jobs = None
+        self.pending: Set[int] = set()
+        self.tokens = 0
+        self.ready = False
+        self.crashes = 0
+        self.error: Optional[BaseException] = None  # why the model could not be loaded
+
+
+class NLLBWorkerPool:
+    """
+    Translates with several processes, each owning an `NLLB200Translator` pinned to its own cores.
+
+    Requests go to the worker with the least queued tokens, lists of sentences are split into chunks
+    that are translated in parallel. Crashed workers are restarted and their requests retried.
+    A worker that can not load the model is not restarted, once no worker is left the pool has failed.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, workers: Optional[int] = None,
+                 chunk_tokens: int = 512, max_retries: int = 1, max_crashes: int = 3):
+        """
+        Args:
+            config (Dict, optional): Plugin config of every worker, `intra_threads` is set per worker.
+            workers (int, optional): Number of worker processes. Defaults to the `workers` config value,
+                or one per NUMA node.
+            chunk_tokens (int, optional): Approximate source tokens per job when splitting lists. Defaults to 512.
+            max_retries (int, optional): Times a request is resubmitted after its worker crashed. Defaults to 1.
+            max_crashes (int, optional): A worker crashing this many times in a row without finishing a
+                request is not restarted again. Defaults to 3.
+        """
+        self.config = config or {}
+        nodes = numa_nodes()
+        n_workers = workers or self.config.get("workers") or len(nodes)
+        self.chunk_tokens = chunk_tokens
+        self.max_retries = max_retries
+        self.max_crashes = max_crashes
+        # fork is unsafe once ctranslate2 started its threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._jobs: Dict[int, _Job] = {}
+        self._job_ids = itertools.count()
+        self._running = True
+        self._all_ready = threading.Event()
+        # notified when every worker is ready or the pool failed
+        self._state = threading.Condition(self._lock)
+        self._error: Optional[RuntimeError] = None
+        self._workers = [_Worker(i, cpus) for i, cpus in enumerate(split_cores(n_workers, nodes))]
+        for worker in self._workers:
+            self._start_worker(worker)
+        self._collector = threading.Thread(target=self._collect, daemon=True, name="nllb-pool-collector")
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch, daemon=True, name="nllb-pool-monitor")
+        self._monitor.start()
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    @property
+    def ready(self) -> bool:
+        """ True once every worker loaded its model """
+        return self._all_ready.is_set()
+
+    @property
+    def error(self) -> Optional[RuntimeError]:
+        """ set once every worker crashed `max_crashes` times or could not load the model """
+        return self._error
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every worker loaded its model.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait. Defaults to None (forever).
+
+        Returns:
+            bool: True if the workers are ready, False on timeout.
+
+        Raises:
+            RuntimeError: If the pool failed, chained to the error of the worker if it could not load the model.
+        """
+        with self._state:
+            self._state.wait_for(lambda: self._all_ready.is_set() or self._error is not None or not self._running,
+                                 timeout)
+            if self._error is not None:
+                raise self._error
+            return self._all_ready.is_set()
+
+    def _start_worker(self, worker: _Worker):
+        worker.ready = False
+        worker.jobs = self._ctx.Queue()
+        worker.process = self._ctx.Process(target=_worker_main, daemon=True, name=f"nllb-worker-{worker.worker_id}",
+                                           args=(worker.worker_id, self.config, worker.cpus,
+                                                 worker.jobs, self._results))
+        worker.process.start()
+
+    def _pick_worker(self) -> Optional[_Worker]:
+        alive = [w for w in self._workers if w.crashes < self.max_crashes]
+        if not alive:
+            return None
+        # prefer loaded workers, then the least queued tokens, then the shortest queue
+        return min(alive, key=lambda w: (not w.ready, w.tokens, len(w.pending)))
+
+    def _dispatch(self, job_id: int, job: _Job):
+        """ must be called with the lock held """
+        worker = self._pick_worker()
+        if worker is None:
+            self._jobs.pop(job_id, None)
+            job.future.set_exception(self._error or RuntimeError("every NLLB worker crashed, the pool is unusable"))
+            return
+        job.worker = worker
+        job.attempts += 1
+        worker.pending.add(job_id)
+        worker.tokens += job.tokens
+        worker.jobs.put((job_id, job.texts, job.target, job.source))
+
+    def submit(self, texts: List[str], target: str = "", source: str = "") -> Future:
+        """
+        Queue sentences for translation by a single worker.
+
+        Args:
+            texts (List[str]): The sentences to translate.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Returns:
+            Future: Resolves to the translations, in input order.
+        """
+        if not self._running:
+            raise RuntimeError("NLLBWorkerPool has been shut down")
+        job = _Job(list(texts), target, source)
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = job
+            self._dispatch(job_id, job)
+        return job.future
+
+    def _chunks(self, texts: List[str]) -> List[List[str]]:
+        chunks, chunk, n_tokens = [], [], 0
+        for text in texts:
+            tokens = len(text) // _CHARS_PER_TOKEN + 1
+            if chunk and n_tokens + tokens > self.chunk_tokens:
+                chunks.append(chunk)
+                chunk, n_tokens = [], 0
+            chunk.append(text)
+            n_tokens += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def translate(self, text: Union[str, List[str]], target: str = "", source: str = "") -> Union[str, List[str]]:
+        """
+        Translate text, spreading lists of sentences over the workers.
+
+        Args:
+            text (Union[str, List[str]]): The text or list of sentences to translate.
+            target (str, optional): The target language code. Defaults to "".
+            source (str, optional): The source language code. Defaults to "".
+
+        Returns:
+            Union[str, List[str]]: The translated text, like `NLLB200Translator.translate` a string
+                for a string or a single sentence list, a list otherwise.
+        """
+        if isinstance(text, str):
+            return self.submit([text], target, source).result()[0]
+        futures = [self.submit(chunk, target, source) for chunk in self._chunks(text)]
+        translations = [tr for future in futures for tr in future.result()]
+        if len(translations) == 1:
+            return translations[0]
+        return translations
+
+    def translate_many(self, items: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Translate sentences with their own language pairs, each pair handled as separate jobs.
+
+        Args:
+            items (List[Tuple[str, str, str]]): (text, source, target) tuples.
+
+        Returns:
+            List[str]: The translated sentences, in input order.
+        """
+        by_pair: Dict[Tuple[str, str], List[int]] = {}
+        for idx, (_, source, target) in enumerate(items):
+            by_pair.setdefault((source, target), []).append(idx)
+        futures = []
+        for (source, target), indexes in by_pair.items():
+            start = 0
+            for chunk in self._chunks([items[i][0] for i in indexes]):
+                futures.append((indexes[start:start + len(chunk)], self.submit(chunk, target, source)))
+                start += len(chunk)
+        translations = [""] * len(items)
+        for indexes, future in futures:
+            for idx, tr in zip(indexes, future.result()):
+                translations[idx] = tr
+        return translations
+
+    def _collect(self):
+        while True:
+            try:
+                worker_id, job_id, ok, payload = self._results.get()
+            except (EOFError, OSError):
+                return
+            if worker_id is None:
+                return
+            with self._lock:
+                worker = self._workers[worker_id]
+                if job_id is None:
+                    # worker startup
+                    if ok:
+                        worker.ready = True
+                        if all(w.ready for w in self._workers):
+                            self._all_ready.set()
+                            self._state.notify_all()
+                    else:
+                        # the worker exits, it is retired instead of restarted by the monitor
+                        LOG.error(f"NLLB worker {worker_id} failed to load the model: {payload}")
+                        worker.error = payload
+                    continue
+                worker.crashes = 0
+                job = self._jobs.pop(job_id, None)
+                if job is None or job.worker is not worker:
+                    # already retried elsewhere after a crash
+                    continue
+                worker.pending.discard(job_id)
+                worker.tokens -= job.tokens
+            if ok:
+                job.future.set_result(payload)
+            else:
+                job.future.set_exception(payload)
+
+    def _watch(self, interval: float = 0.2):
+        while self._running:
+            time.sleep(interval)
+            with self._lock:
+                for worker in self._workers:
+                    if not self._running or worker.process.is_alive() or worker.crashes >= self.max_crashes:
+                        continue
+                    self._restart(worker)
+
+    def _restart(self, worker: _Worker):
+        """ must be called with the lock held """
+        if worker.error is not None:
+            # loading the model failed, it would fail again
+            worker.crashes = self.max_crashes
+        else:
+            worker.crashes += 1
+            LOG.warning(f"NLLB worker {worker.worker_id} died with exit code {worker.process.exitcode}, "
+                        f"restart {worker.crashes}/{self.max_crashes}")
+        lost = [(job_id, self._jobs[job_id]) for job_id in worker.pending if job_id in self._jobs]
+        worker.pending.clear()
+        worker.tokens = 0
+        worker.ready = False
+        self._all_ready.clear()
+        if worker.crashes < self.max_crashes:
+            self._start_worker(worker)
+        elif all(w.crashes >= self.max_crashes for w in self._workers):
+            errors = [w.error for w in self._workers if w.error is not None]
+            reason = f", the model could not be loaded: {errors[0]}" if errors else ""
+            self._error = RuntimeError(f"every NLLB worker crashed, the pool is unusable{reason}")
+            self._error.__cause__ = errors[0] if errors else None
+            LOG.error(str(self._error))
+            self._state.notify_all()
+        for job_id, job in lost:
+            if job.attempts > self.max_retries:
+                self._jobs.pop(job_id)
+                job.future.set_exception(RuntimeError(f"NLLB worker {worker.worker_id} crashed "
+                                                      f"while translating"))
+            else:
+                self._dispatch(job_id, job)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the workers, failing requests that were not translated yet.
+        """
+        if not self._running:
+            return
+        self._running = False
+        with self._lock:
+            for worker in self._workers:
+                worker.jobs.put(None)
+            self._state.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.process.join(timeout=10)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+        self._results.put((None, None, False, None))
+        with self._lock:
+            jobs, self._jobs = self._jobs, {}
+        for job in jobs.values():
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("NLLBWorkerPool has been shut down"))
+
+    def __enter__(self) -> "NLLBWorkerPool":
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
@@ -0,0 +1,271 @@
+"""
+Translate the resource files of installed skills ahead of time.
+
+    ovos-nllb-pretranslate ~/.local/share/mycroft/skills --source en-us --targets es pt-pt de
+
+Lines of `.dialog`, `.intent` and `.voc` files are expanded, deduplicated and translated in large batches
+into a read-only SQLite store. With `pretranslated_path` configured, `translate` answers known sentences
+from the store without running the model. Rebuilding only translates lines that changed since the last build.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set
+
+from ovos_utils.bracket_expansion import expand_template
+from ovos_utils.log import LOG
+from ovos_utils.xdg_utils import xdg_data_home
+
+from ovos_translate_plugin_nllb.download import install_lock
+
+if TYPE_CHECKING:
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+RESOURCE_EXTENSIONS = (".dialog", ".intent", ".voc")
+
+
+def default_store_path() -> str:
+    return f"{xdg_data_home()}/ctranslate2/pretranslated.db"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Key of a sentence in the store, unicode (NFC) and whitespace differences do not matter.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def expand_line(line: str, extension: str = ".dialog") -> List[str]:
+    """
+    Expand a resource file line into the sentences it stands for.
+
+    Args:
+        line (str): The line, eg. "(hello|hi) [there]".
+        extension (str, optional): Extension of the file it comes from, `.voc` lines are "|" separated synonyms.
+
+    Returns:
+        List[str]: The normalized sentences, empty for blank lines and comments.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return []
+    if extension == ".voc":
+        line = f"({line})"
+    sentences = []
+    for sentence in expand_template(line):
+        sentence = normalize_text(sentence)
+        if sentence and sentence not in sentences:
+            sentences.append(sentence)
+    return sentences
+
+
+def find_resource_files(paths: Iterable[str], lang: str,
+                        extensions: Iterable[str] = RESOURCE_EXTENSIONS) -> Iterator[str]:
+    """
+    Resource files of a language below the given directories.
+
+    Only files with a `lang` directory (case insensitive, eg. "locale/en-us") in their path are used,
+    so both a skills folder and a single locale folder can be passed.
+
+    Args:
+        paths (Iterable[str]): Directories or single files.
+        lang (str): The language directory name, eg. "en-us".
+        extensions (Iterable[str], optional): File extensions to read. Defaults to RESOURCE_EXTENSIONS.
+
+    Yields:
+        str: Paths of the resource files, sorted.
+    """
+    lang = lang.lower()
+    extensions = tuple(extensions)
+    for path in paths:
+        path = os.path.abspath(os.path.expanduser(path))
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if lang not in [part.lower() for part in Path(root).parts]:
+                continue
+            for name in sorted(files):
+                if name.endswith(extensions):
+                    yield os.path.join(root, name)
+
+
+def collect_sentences(files: Iterable[str]) -> List[str]:
+    """
+    Expanded and deduplicated sentences of resource files, in the order they were first seen.
+    """
+    sentences: Dict[str, None] = {}
+    for path in files:
+        extension = os.path.splitext(path)[1]
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                for sentence in expand_line(line, extension):
+                    sentences[sentence] = None
+    return list(sentences)
+
+
+class PretranslatedStore:
+    """
+    Read-only lookup of sentences translated by `build_store`.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The store written by `build_store`.
+
+        Raises:
+            FileNotFoundError: If the store does not exist.
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Pretranslated store not found: {path}")
+        self.path = path
+        self._lock = threading.Lock()
+        # rebuilds replace the file, the open one never changes under us
+        self._db = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro&immutable=1",
+                                   uri=True, check_same_thread=False)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str, source: str, target: str) -> Optional[str]:
+        """
+        Look up a translation.
+
+        Args:
+            text (str): The source sentence.
+            source (str): The source NLLB language code, eg. "eng_Latn".
+            target (str): The target NLLB language code, eg. "spa_Latn".
+
+        Returns:
+            Optional[str]: The translation, or None if the sentence is not in the store.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT translation FROM translations WHERE source = ? AND target = ? AND text = ?",
+                                   (source, target, normalize_text(text))).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _create_tables(db: sqlite3.Connection):
+    db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    db.execute("CREATE TABLE IF NOT EXISTS translations (source TEXT NOT NULL, target TEXT NOT NULL, "
+               "text TEXT NOT NULL, translation TEXT NOT NULL, "
+               "PRIMARY KEY (source, target, text)) WITHOUT ROWID")
+
+
+def build_store(translator: "NLLB200Translator", sentences: List[str], source: str, targets: List[str],
+                path: Optional[str] = None, batch_size: int = 512, prune: bool = True) -> Dict[str, int]:
+    """
+    Translate sentences into the target languages and write them to a store.
+
+    Sentences already in the store are kept, only new ones are translated. The store is rebuilt
+    next to the old one and moved into place, running translators keep reading the previous version.
+
+    Args:
+        translator (NLLB200Translator): The translator used for the missing sentences.
+        sentences (List[str]): The source sentences, see `collect_sentences`.
+        source (str): The source language code, eg. "en-us".
+        targets (List[str]): The target language codes.
+        path (str, optional): The store. Defaults to `xdg_data_home()/ctranslate2/pretranslated.db`.
+        batch_size (int, optional): Sentences per `translate` batch. Defaults to 512.
+        prune (bool, optional): Drop stored sentences of these languages that are no longer given. Defaults to True.
+
+    Returns:
+        Dict[str, int]: Number of sentences, translations made, translations kept and translations removed.
+    """
+    path = path or default_store_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    sentences = list(dict.fromkeys(normalize_text(s) for s in sentences if s.strip()))
+    stats = {"sentences": len(sentences), "translated": 0, "kept": 0, "removed": 0}
+    with install_lock(path):
+        tmp = f"{path}.building"
+        if os.path.isfile(path):
+            shutil.copyfile(path, tmp)
+        elif os.path.isfile(tmp):
+            os.remove(tmp)
+        db = sqlite3.connect(tmp)
+        try:
+            # a crash leaves only the temporary copy behind
+            db.execute("PRAGMA journal_mode=OFF")
+            db.execute("PRAGMA synchronous=OFF")
+            _create_tables(db)
+            row = db.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+            if row is not None and row[0] != translator.model:
+                LOG.info(f"Store was built with {row[0]}, translating everything again with {translator.model}")
+                db.execute("DELETE FROM translations")
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('model', ?)", (translator.model,))
+
+            for target in targets:
+                src_lang, tgt_lang = translator._resolve_languages(source, target)
+                stored: Set[str] = {text for text, in db.execute(
+                    "SELECT text FROM translations WHERE source = ? AND target = ?", (src_lang, tgt_lang))}
+                wanted = set(sentences)
+                if prune:
+                    stale = [(src_lang, tgt_lang, text) for text in stored - wanted]
+                    db.executemany("DELETE FROM translations WHERE source = ? AND target = ? AND text = ?", stale)
+                    stats["removed"] += len(stale)
+                stats["kept"] += len(stored & wanted)
+                missing = [s for s in sentences if s not in stored]
+                LOG.info(f"{tgt_lang}: translating {len(missing)} of {len(sentences)} sentences")
+                for i in range(0, len(missing), batch_size):
+                    batch = missing[i:i + batch_size]
+                    translated = translator._translate_sentences(batch, src_lang, tgt_lang)
+                    db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                                   [(src_lang, tgt_lang, s, t) for s, t in zip(batch, translated)])
+                    db.commit()
+                    stats["translated"] += len(batch)
+            db.commit()
+            db.execute("VACUUM")
+        finally:
+            db.close()
+        os.replace(tmp, path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="skill folders, locale folders or resource files")
+    parser.add_argument("--source", required=True, help="language of the resource files, eg. en-us")
+    parser.add_argument("--targets", nargs="+", required=True, help="languages to translate into")
+    parser.add_argument("--output", default=default_store_path(), help="the store to create or update")
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--beam-size", type=int, default=4)
+    parser.add_argument("--config", help="json file with extra plugin config")
+    parser.add_argument("--batch-size", type=int, default=512, help="sentences per translate batch")
+    parser.add_argument("--keep-stale", action="store_true", help="keep sentences no longer in the resource files")
+    args = parser.parse_args()
+
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    config = {"model": args.model, "tokenizer": args.tokenizer, "device": args.device,
+              "beam_size": args.beam_size}
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+    sentences = collect_sentences(find_resource_files(args.paths, args.source))
+    stats = build_store(NLLB200Translator(config=config), sentences, args.source, args.targets,
+                        path=args.output, batch_size=args.batch_size, prune=not args.keep_stale)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
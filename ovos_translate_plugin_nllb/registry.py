@@ -0,0 +1,82 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class SharedModelRegistry:
+    """
+    Thread-safe, reference counted store of loaded models shared by every plugin instance in the process.
+
+    The first `acquire` of a key builds the model with the given factory, later ones reuse it.
+    It is dropped once every holder called `release`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Hashable, Any] = {}
+        self._refcounts: Dict[Hashable, int] = {}
+        self._building: Dict[Hashable, threading.Lock] = {}
+
+    def acquire(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get the model for `key`, loading it if no other instance holds it.
+
+        Args:
+            key (Hashable): Identifies the model, eg. (model path, device, device index, compute type).
+            factory (Callable[[], Any]): Loads the model.
+
+        Returns:
+            Any: The shared model.
+        """
+        with self._lock:
+            if key in self._models:
+                self._refcounts[key] += 1
+                return self._models[key]
+            build_lock = self._building.setdefault(key, threading.Lock())
+        # load outside the registry lock so other models can be acquired meanwhile
+        with build_lock:
+            with self._lock:
+                if key in self._models:
+                    self._refcounts[key] += 1
+                    return self._models[key]
+            model = factory()
+            with self._lock:
+                self._models[key] = model
+                self._refcounts[key] = 1
+                self._building.pop(key, None)
+            return model
+
+    def release(self, key: Hashable):
+        """
+        Drop a reference to the model for `key`, freeing it when it was the last one.
+        """
+        with self._lock:
+            if key not in self._refcounts:
+                return
+            self._refcounts[key] -= 1
+            if self._refcounts[key] <= 0:
+                del self._refcounts[key]
+                del self._models[key]
+
+    def refcount(self, key: Hashable) -> int:
+        """
+        Number of holders of the model for `key`.
+        """
+        with self._lock:
+            return self._refcounts.get(key, 0)
+
+    @property
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._models)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+
+# shared by every NLLB200Translator in the process
+MODEL_REGISTRY = SharedModelRegistry()
@@ -0,0 +1,333 @@
+"""
+Serve the plugin over HTTP with a LibreTranslate compatible API.
+
+    ovos-nllb-server --model nllb-200_600M_int8 --port 5000
+
+Requests from every client are merged into shared batches. When the queue is full new requests
+are rejected with 429, `/health` reports whether the model finished loading.
+Lazy and idle unloaded models are loaded by the next translation, only a `background_load` still
+in progress answers 503.
+
+Endpoints:
+    POST /translate   {"q": "Hello", "source": "en", "target": "es"} -> {"translatedText": "Hola"}
+    GET  /languages   [{"code": "en", "name": "English", "targets": [...]}, ...]
+    GET  /health      {"status": "ok", "ready": true, "loaded": true, "queued": 0}
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ovos_utils.log import LOG
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+# largest accepted request body
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _language_name(code: str) -> str:
+    try:
+        # language names need the optional language_data package
+        import language_data  # noqa: F401
+        import langcodes
+        return langcodes.Language.get(code).display_name()
+    except Exception:
+        return code
+
+
+class _PendingSentence:
+    __slots__ = ("text", "source", "target", "future")
+
+    def __init__(self, text: str, source: str, target: str, future: asyncio.Future):
+        self.text = text
+        self.source = source
+        self.target = target
+        self.future = future
+
+
+class TranslationServer:
+    """
+    Asyncio HTTP server merging the sentences of concurrent requests into shared `translate_many` batches.
+    """
+
+    def __init__(self, translator, host: str = "0.0.0.0", port: int = 5000,
+                 max_queue: int = 1024, max_batch: int = 64, max_wait_ms: float = 10):
+        """
+        Args:
+            translator (NLLB200Translator): The translator, may still be loading in the background.
+            host (str, optional): Interface to listen on. Defaults to "0.0.0.0".
+            port (int, optional): Port to listen on. Defaults to 5000.
+            max_queue (int, optional): Sentences waiting for translation before requests get 429. Defaults to 1024.
+            max_batch (int, optional): Maximum sentences per batch. Defaults to 64.
+            max_wait_ms (float, optional): How long a sentence may wait for others to join its batch. Defaults to 10.
+        """
+        self.translator = translator
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._languages: Optional[List[Dict]] = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        False only while the model loads in the background, lazy and idle unloaded models are
+        loaded by the next translation.
+        """
+        return not getattr(self.translator, "loading", False)
+
+    async def start(self):
+        """
+        Start listening, `port` is updated with the bound port when started with port 0.
+        """
+        self._queue = asyncio.Queue(self.max_queue)
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        LOG.info(f"Serving translations on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+
+    # batching
+    async def _next_batch(self) -> List[_PendingSentence]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+        return batch
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [p for p in await self._next_batch() if not p.future.done()]
+            if not batch:
+                continue
+            items = [(p.text, p.source, p.target) for p in batch]
+            try:
+                translations = await loop.run_in_executor(None, self.translator.translate_many, items)
+            except Exception as e:
+                if len(batch) == 1:
+                    if not batch[0].future.done():
+                        batch[0].future.set_exception(e)
+                    continue
+                # one bad sentence must not fail the requests it was merged with
+                LOG.warning(f"Batched translation failed, retrying sentence by sentence: {e}")
+                await self._run_one_by_one(batch)
+                continue
+            for p, tr in zip(batch, translations):
+                if not p.future.done():
+                    p.future.set_result(tr)
+
+    async def _run_one_by_one(self, batch: List[_PendingSentence]):
+        loop = asyncio.get_running_loop()
+        for p in batch:
+            if p.future.done():
+                continue
+            try:
+                translations = await loop.run_in_executor(None, self.translator.translate_many,
+                                                          [(p.text, p.source, p.target)])
+            except Exception as e:
+                if not p.future.done():
+                    p.future.set_exception(e)
+                continue
+            if not p.future.done():
+                p.future.set_result(translations[0])
+
+    async def translate(self, texts: List[str], source: str, target: str) -> List[str]:
+        """
+        Queue sentences for the next batches.
+
+        Raises:
+            HTTPError: 429 if the queue has no room for all of them.
+        """
+        if self._queue.maxsize - self._queue.qsize() < len(texts):
+            raise HTTPError(429, "Too many requests, translation queue is full")
+        loop = asyncio.get_running_loop()
+        pending = [_PendingSentence(text, source, target, loop.create_future()) for text in texts]
+        for p in pending:
+            self._queue.put_nowait(p)
+        return list(await asyncio.gather(*(p.future for p in pending)))
+
+    # endpoints
+    async def _translate_endpoint(self, params: Dict) -> Tuple[int, object]:
+        if not self.ready:
+            raise HTTPError(503, "Model is still loading")
+        q, source, target = params.get("q"), params.get("source", ""), params.get("target", "")
+        if q is None or not target:
+            raise HTTPError(400, "Invalid request: missing q or target parameter")
+        if not source or source == "auto":
+            raise HTTPError(400, "Language detection is not supported, pass a source language")
+        texts = [q] if isinstance(q, str) else q
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise HTTPError(400, "Invalid request: q must be a string or a list of strings")
+        try:
+            self.translator.resolve_languages(source, target)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        translations = await self.translate(texts, source, target) if texts else []
+        return 200, {"translatedText": translations[0] if isinstance(q, str) else translations}
+
+    def _languages_endpoint(self) -> Tuple[int, object]:
+        if self._languages is None:
+            codes = sorted(self.translator.available_languages)
+            self._languages = [{"code": code, "name": _language_name(code), "targets": codes} for code in codes]
+        return 200, self._languages
+
+    def _health_endpoint(self) -> Tuple[int, object]:
+        ready = self.ready
+        return (200 if ready else 503), {"status": "ok" if ready else "loading",
+                                         "ready": ready,
+                                         "loaded": getattr(self.translator, "is_loaded", True),
+                                         "queued": self._queue.qsize()}
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, object]:
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        if path == "/health":
+            return self._health_endpoint()
+        if path == "/languages":
+            return self._languages_endpoint()
+        if path != "/translate":
+            raise HTTPError(404, f"Not found: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Use POST")
+        content_type = headers.get("content-type", "")
+        if "json" in content_type:
+            try:
+                params = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "Invalid JSON body")
+            if not isinstance(params, dict):
+                raise HTTPError(400, "Invalid JSON body")
+        else:
+            # LibreTranslate also accepts form data
+            form = parse_qs(body.decode("utf-8", "replace"))
+            form.update(parse_qs(url.query))
+            params = {k: v[0] if len(v) == 1 else v for k, v in form.items()}
+        return await self._translate_endpoint(params)
+
+    # HTTP/1.1
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            raise HTTPError(400, "Chunked request bodies are not supported")
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, version, headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: object, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Access-Control-Allow-Origin: *\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    status, payload = await self._dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    LOG.exception("Translation request failed")
+                    status, payload = 500, {"error": str(e)}
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--beam-size", type=int, default=4)
+    parser.add_argument("--config", help="json file with extra plugin config")
+    parser.add_argument("--max-queue", type=int, default=1024, help="queued sentences before answering 429")
+    parser.add_argument("--max-batch", type=int, default=64, help="sentences per batch")
+    parser.add_argument("--batch-wait-ms", type=float, default=10, help="how long a batch waits for more sentences")
+    args = parser.parse_args()
+
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    config = {"model": args.model, "tokenizer": args.tokenizer, "device": args.device,
+              "beam_size": args.beam_size, "background_load": True}
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+    server = TranslationServer(NLLB200Translator(config=config), args.host, args.port,
+                               max_queue=args.max_queue, max_batch=args.max_batch,
+                               max_wait_ms=args.batch_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Fuzzy translation memory, reuses finished translations for near duplicate sentences.
+
+Numbers and capitalized words (names, places) are masked into slots before indexing, so
+"set a timer for 5 minutes" and "set a timer for 10 minutes" share the template "set a timer for {} minutes".
+When the values of a stored sentence are found verbatim in its translation, the translation is kept as a
+template too and new values are substituted into it. By default only identical templates are reused.
+Opting in with a threshold below 1, templates that are not identical are matched with a MinHash LSH index
+over character trigrams and accepted above a Jaccard similarity threshold. A fuzzy hit returns the
+translation of the stored sentence, words outside the slots ("not", "don't") are not translated.
+"""
+import random
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+# numbers, including decimals, times and thousands separators
+NUMBER = r"\d+(?:[.,:]\d+)*"
+# capitalized words that do not start the sentence, most of the time names and places
+ENTITY = r"(?<=\s)(?!I')[A-Z][\w'-]+"
+SLOT = "\x00"
+SHINGLE_SIZE = 3
+NUM_PERM = 32
+BANDS = 8
+_PRIME = (1 << 61) - 1
+
+# an entry's target template, literal strings and source slot indexes, eg. ["pon un temporizador de ", 0, " minutos"]
+Template = List[Union[str, int]]
+
+
+class _Entry:
+    __slots__ = ("template", "shingles", "n_slots", "target", "bands")
+
+    def __init__(self, template: str, shingles: Set[int], n_slots: int, target: Template, bands: List[int]):
+        self.template = template
+        self.shingles = shingles
+        self.n_slots = n_slots
+        self.target = target
+        self.bands = bands
+
+
+class TranslationMemory:
+    """
+    Thread-safe in-memory store of translations answering exact and near duplicate sentences.
+    """
+
+    def __init__(self, threshold: float = 1.0, max_entries: int = 10000, mask_entities: bool = True,
+                 seed: int = 1):
+        """
+        Args:
+            threshold (float, optional): Minimum Jaccard similarity of the templates, below it the
+                model is used. Defaults to 1.0, only translations of identical templates are reused,
+                lower values also reuse the translation of a similar sentence as is.
+            max_entries (int, optional): Templates kept per language pair, least recently used are dropped. Defaults to 10000.
+            mask_entities (bool, optional): Mask capitalized words besides numbers. Defaults to True.
+            seed (int, optional): Seed of the MinHash permutations. Defaults to 1.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._mask = re.compile(f"{NUMBER}|{ENTITY}" if mask_entities else NUMBER)
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+        self._rows = NUM_PERM // BANDS
+        self._lock = threading.Lock()
+        # (source, target) -> template -> entry
+        self._entries: Dict[Tuple[str, str], "OrderedDict[str, _Entry]"] = {}
+        # (source, target, band, band hash) -> templates in that LSH bucket
+        self._buckets: Dict[Tuple[str, str, int, int], Set[str]] = {}
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    # templates
+    def mask(self, text: str) -> Tuple[str, List[str]]:
+        """
+        Replace numbers and entities by slots.
+
+        Args:
+            text (str): The sentence, eg. "call Anna at 5".
+
+        Returns:
+            Tuple[str, List[str]]: The template and the masked values, eg. ("call \\x00 at \\x00", ["Anna", "5"]).
+        """
+        text = " ".join(text.split())
+        values = self._mask.findall(text)
+        return self._mask.sub(SLOT, text), values
+
+    @staticmethod
+    def _target_template(translation: str, values: List[str]) -> Optional[Template]:
+        """ split a translation around the source values, None unless each one appears exactly once """
+        spans = []
+        for idx, value in enumerate(values):
+            if translation.count(value) != 1:
+                return None
+            start = translation.index(value)
+            spans.append((start, start + len(value), idx))
+        spans.sort()
+        template: Template = []
+        end = 0
+        for start, stop, idx in spans:
+            if start < end:
+                return None  # overlapping values, eg. "5" inside "15"
+            template += [translation[end:start], idx]
+            end = stop
+        template.append(translation[end:])
+        return template
+
+    @staticmethod
+    def _fill(target: Template, values: List[str]) -> str:
+        return "".join(values[part] if isinstance(part, int) else part for part in target)
+
+    # minhash
+    @staticmethod
+    def _shingles(template: str) -> Set[int]:
+        padded = f" {template.lower()} "
+        return {zlib.crc32(padded[i:i + SHINGLE_SIZE].encode("utf-8"))
+                for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))}
+
+    def _bands(self, shingles: Set[int]) -> List[int]:
+        signature = [min((a * h + b) % _PRIME for h in shingles) for a, b in self._perms]
+        return [hash(tuple(signature[i:i + self._rows])) for i in range(0, NUM_PERM, self._rows)]
+
+    # public api
+    def get(self, text: str, source: str, target: str) -> Optional[str]:
+        """
+        Translation of a sentence, reusing the closest stored template.
+
+        Args:
+            text (str): The source sentence.
+            source (str): The source NLLB language code, eg. "eng_Latn".
+            target (str): The target NLLB language code, eg. "spa_Latn".
+
+        Returns:
+            Optional[str]: The translation, or None if nothing is similar enough.
+        """
+        template, values = self.mask(text)
+        with self._lock:
+            entries = self._entries.get((source, target))
+            if entries:
+                # sentences stored without slots (their values were translated too) are keyed by the text itself
+                for key, key_values in ((template, values), (" ".join(text.split()), [])):
+                    entry = entries.get(key)
+                    if entry is not None and entry.n_slots == len(key_values):
+                        entries.move_to_end(key)
+                        self.hits += 1
+                        return self._fill(entry.target, key_values)
+                if self.threshold < 1:
+                    entry = self._nearest(source, target, template, len(values))
+                    if entry is not None:
+                        entries.move_to_end(entry.template)
+                        self.fuzzy_hits += 1
+                        return self._fill(entry.target, values)
+            self.misses += 1
+        return None
+
+    def _nearest(self, source: str, target: str, template: str, n_slots: int) -> Optional[_Entry]:
+        shingles = self._shingles(template)
+        candidates: Set[str] = set()
+        for band, band_hash in enumerate(self._bands(shingles)):
+            candidates |= self._buckets.get((source, target, band, band_hash), set())
+        best, best_similarity = None, self.threshold
+        entries = self._entries[(source, target)]
+        for candidate in candidates:
+            entry = entries[candidate]
+            if entry.n_slots != n_slots:
+                continue
+            shared = len(shingles & entry.shingles)
+            similarity = shared / (len(shingles) + len(entry.shingles) - shared)
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        return best
+
+    def put(self, text: str, translation: str, source: str, target: str):
+        """
+        Remember a translation.
+
+        Args:
+            text (str): The source sentence.
+            translation (str): Its translation.
+            source (str): The source NLLB language code, eg. "eng_Latn".
+            target (str): The target NLLB language code, eg. "spa_Latn".
+        """
+        template, values = self.mask(text)
+        target_template = self._target_template(translation, values)
+        if target_template is None:
+            # the values were translated too, only reuse this for the very same sentence
+            template, values, target_template = " ".join(text.split()), [], [translation]
+        shingles = self._shingles(template)
+        bands = self._bands(shingles) if self.threshold < 1 else []
+        with self._lock:
+            entries = self._entries.setdefault((source, target), OrderedDict())
+            if template in entries:
+                self._remove(source, target, template)
+            entries[template] = _Entry(template, shingles, len(values), target_template, bands)
+            for band, band_hash in enumerate(bands):
+                self._buckets.setdefault((source, target, band, band_hash), set()).add(template)
+            while len(entries) > self.max_entries:
+                self._remove(source, target, next(iter(entries)))
+
+    def _remove(self, source: str, target: str, template: str):
+        entry = self._entries[(source, target)].pop(template)
+        for band, band_hash in enumerate(entry.bands):
+            bucket = self._buckets[(source, target, band, band_hash)]
+            bucket.discard(template)
+            if not bucket:
+                del self._buckets[(source, target, band, band_hash)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.hits = self.fuzzy_hits = self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: exact template hits, fuzzy hits, misses and stored templates.
+        """
+        with self._lock:
+            return {"hits": self.hits,
+                    "fuzzy_hits": self.fuzzy_hits,
+                    "misses": self.misses,
+                    "entries": sum(len(e) for e in self._entries.values())}
+
+    def __len__(self) -> int:
+        return self.stats["entries"]
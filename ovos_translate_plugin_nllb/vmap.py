@@ -0,0 +1,228 @@
+"""
+Vocabulary maps restricting the output of the model to the subwords of the target languages.
+
+NLLB shares a ~256k subword vocabulary between 200 languages, a single target language uses a small part of it.
+CTranslate2 only scores the tokens listed in the `vmap.txt` of the model directory when translating with
+`use_vmap=True`, which makes the output projection and beam search cheaper on CPU.
+
+    ovos-nllb-vmap es pt --corpus es=spanish.txt
+
+Vocabularies are built per target language, from a local corpus or from the pieces of the SentencePiece
+model written in the script of the language, and stored as one token per line in `vmap_dir`.
+"""
+import argparse
+import hashlib
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ovos_utils.log import LOG
+from ovos_utils.xdg_utils import xdg_data_home
+
+# unicode ranges of the scripts NLLB writes, by FLORES script subtag
+SCRIPT_RANGES: Dict[str, List[Tuple[int, int]]] = {
+    "Latn": [(0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F), (0x1E00, 0x1EFF), (0x0250, 0x02FF),
+             (0x0300, 0x036F), (0x2C60, 0x2C7F), (0xA720, 0xA7FF)],
+    "Arab": [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "Cyrl": [(0x0400, 0x052F), (0x1C80, 0x1C8F), (0x2DE0, 0x2DFF), (0xA640, 0xA69F)],
+    "Deva": [(0x0900, 0x097F), (0xA8E0, 0xA8FF)],
+    "Beng": [(0x0980, 0x09FF)],
+    "Ethi": [(0x1200, 0x139F), (0x2D80, 0x2DDF), (0xAB00, 0xAB2F)],
+    "Tibt": [(0x0F00, 0x0FFF)],
+    "Hebr": [(0x0590, 0x05FF), (0xFB1D, 0xFB4F)],
+    "Mymr": [(0x1000, 0x109F), (0xA9E0, 0xA9FF), (0xAA60, 0xAA7F)],
+    "Tfng": [(0x2D30, 0x2D7F)],
+    "Grek": [(0x0370, 0x03FF), (0x1F00, 0x1FFF)],
+    "Gujr": [(0x0A80, 0x0AFF)],
+    "Armn": [(0x0530, 0x058F), (0xFB13, 0xFB17)],
+    "Knda": [(0x0C80, 0x0CFF)],
+    "Geor": [(0x10A0, 0x10FF), (0x2D00, 0x2D2F)],
+    "Khmr": [(0x1780, 0x17FF), (0x19E0, 0x19FF)],
+    "Laoo": [(0x0E80, 0x0EFF)],
+    "Mlym": [(0x0D00, 0x0D7F)],
+    "Orya": [(0x0B00, 0x0B7F)],
+    "Guru": [(0x0A00, 0x0A7F)],
+    "Sinh": [(0x0D80, 0x0DFF)],
+    "Taml": [(0x0B80, 0x0BFF)],
+    "Telu": [(0x0C00, 0x0C7F)],
+    "Thai": [(0x0E00, 0x0E7F)],
+    "Hang": [(0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF), (0x4E00, 0x9FFF)],
+    "Hans": [(0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x3000, 0x303F), (0xFF00, 0xFFEF)],
+    "Hant": [(0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x3000, 0x303F), (0xFF00, 0xFFEF)],
+    "Jpan": [(0x3040, 0x30FF), (0x31F0, 0x31FF), (0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x3000, 0x303F),
+             (0xFF00, 0xFFEF)],
+}
+# the model needs these in any language
+SPECIAL_TOKENS = ["<s>", "</s>", "<unk>", "<pad>"]
+# language code pieces, only the one of the target language may be generated
+_LANG_CODE = re.compile(r"^[a-z]{3}_[A-Z][a-z]{3}$")
+
+
+def default_vmap_dir() -> str:
+    return f"{xdg_data_home()}/ctranslate2/vmaps"
+
+
+def _is_common(char: str) -> bool:
+    """ digits, punctuation, symbols and spaces are used by every language """
+    return char == "▁" or unicodedata.category(char)[0] in "NPSZ"
+
+
+def _in_script(char: str, ranges: List[Tuple[int, int]]) -> bool:
+    code = ord(char)
+    return any(start <= code <= end for start, end in ranges)
+
+
+def vocab_from_script(pieces: Iterable[str], script: str) -> Set[str]:
+    """
+    Pieces written only with characters of a script, digits and punctuation.
+
+    Args:
+        pieces (Iterable[str]): Every piece of the SentencePiece model.
+        script (str): FLORES script subtag, eg. "Cyrl".
+
+    Returns:
+        Set[str]: The pieces usable by languages written in that script.
+
+    Raises:
+        ValueError: If the script has no known unicode ranges.
+    """
+    if script not in SCRIPT_RANGES:
+        raise ValueError(f"No unicode ranges known for script {script}, build its vocabulary from a corpus")
+    ranges = SCRIPT_RANGES[script]
+    return {piece for piece in pieces
+            if piece and all(_is_common(c) or _in_script(c, ranges) for c in piece)}
+
+
+def vocab_from_corpus(pieces_per_line: Iterable[List[str]], min_count: int = 1) -> Set[str]:
+    """
+    Pieces seen in a tokenized corpus of the target language.
+
+    Args:
+        pieces_per_line (Iterable[List[str]]): The corpus, tokenized with the SentencePiece model.
+        min_count (int, optional): Ignore pieces seen fewer times. Defaults to 1.
+
+    Returns:
+        Set[str]: The pieces used by the language.
+    """
+    counts = Counter(piece for pieces in pieces_per_line for piece in pieces)
+    return {piece for piece, count in counts.items() if count >= min_count}
+
+
+def common_pieces(pieces: Iterable[str]) -> Set[str]:
+    """ pieces made only of digits, punctuation and symbols, numbers and punctuation must survive in any language """
+    return {piece for piece in pieces if piece and all(_is_common(c) for c in piece)}
+
+
+def vocab_path(flores: str, vmap_dir: Optional[str] = None) -> str:
+    return os.path.join(vmap_dir or default_vmap_dir(), f"{flores}.vocab")
+
+
+def write_vocab(path: str, tokens: Iterable[str]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(sorted(tokens)) + "\n")
+
+
+def load_vocab(path: str) -> Set[str]:
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.rstrip("\n")}
+
+
+def vmap_model(model_path: str, tokens: Iterable[str], base_path: Optional[str] = None) -> str:
+    """
+    A view of a model directory with a `vmap.txt` allowing only the given target tokens.
+
+    The model files are symlinked, the weights are not copied. Views are reused while the tokens do not change.
+
+    Args:
+        model_path (str): The CTranslate2 model directory.
+        tokens (Iterable[str]): Target tokens the model may generate.
+        base_path (str, optional): Where views are created. Defaults to `xdg_data_home()/ctranslate2/vmap_models`.
+
+    Returns:
+        str: The model directory to load with `use_vmap` support.
+    """
+    content = "\t" + " ".join(sorted(set(tokens))) + "\n"
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+    model_path = os.path.realpath(model_path)
+    view = os.path.join(base_path or f"{xdg_data_home()}/ctranslate2/vmap_models",
+                        f"{os.path.basename(model_path)}-{digest}")
+    if os.path.isfile(os.path.join(view, "vmap.txt")):
+        return view
+    tmp = f"{view}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for name in os.listdir(model_path):
+        if name != "vmap.txt":
+            os.symlink(os.path.join(model_path, name), os.path.join(tmp, name))
+    # an empty source n-gram, these tokens are candidates for every input
+    with open(os.path.join(tmp, "vmap.txt"), "w", encoding="utf-8") as f:
+        f.write(content)
+    try:
+        os.rename(tmp, view)
+    except OSError:
+        # created meanwhile by another process
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+    return view
+
+
+def build_vocab(flores: str, pieces: List[str], corpus: Optional[Iterable[List[str]]] = None,
+                min_count: int = 1) -> Set[str]:
+    """
+    Vocabulary of a target language, special tokens, its language code, digits and punctuation included.
+
+    Args:
+        flores (str): The FLORES code, eg. "spa_Latn".
+        pieces (List[str]): Every piece of the SentencePiece model.
+        corpus (Iterable[List[str]], optional): A tokenized corpus of the language, the script of the
+            language is used when not given.
+        min_count (int, optional): Ignore corpus pieces seen fewer times. Defaults to 1.
+
+    Returns:
+        Set[str]: The tokens the model may generate for this language.
+    """
+    if corpus is not None:
+        tokens = vocab_from_corpus(corpus, min_count)
+    else:
+        tokens = vocab_from_script(pieces, flores.split("_")[1])
+    tokens = {token for token in tokens if not _LANG_CODE.match(token)}
+    return tokens | common_pieces(pieces) | set(SPECIAL_TOKENS) | {flores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("languages", nargs="+", help="target languages, eg. es pt-br")
+    parser.add_argument("--corpus", nargs="*", default=[], metavar="LANG=PATH",
+                        help="text files in the target language, one sentence per line")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--min-count", type=int, default=1, help="ignore corpus pieces seen fewer times")
+    parser.add_argument("--output", default=default_vmap_dir(), help="the vmap_dir the vocabularies are written to")
+    args = parser.parse_args()
+
+    import sentencepiece as spm
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    sp = spm.SentencePieceProcessor()
+    sp.load(NLLB200Translator.download_tokenizer(args.tokenizer))
+    pieces = [sp.id_to_piece(i) for i in range(sp.get_piece_size())]
+    corpora = dict(item.split("=", 1) for item in args.corpus)
+    for lang in args.languages:
+        flores = NLLB200Translator.LANGUAGES.resolve(lang)
+        if not flores:
+            raise ValueError(f"Invalid language: {lang}")
+        corpus = None
+        if lang in corpora:
+            with open(corpora[lang], encoding="utf-8") as f:
+                corpus = [sp.encode(line.strip(), out_type=str) for line in f if line.strip()]
+        tokens = build_vocab(flores, pieces, corpus, args.min_count)
+        path = vocab_path(flores, args.output)
+        write_vocab(path, tokens)
+        LOG.info(f"{flores}: {len(tokens)} of {len(pieces)} tokens -> {path}")
+        print(f"{flores}\t{len(tokens)}\t{path}")
+
+
+if __name__ == "__main__":
+    main()
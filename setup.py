@@ -3,6 +3,10 @@ from setuptools import setup
 
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
 TX_ENTRY_POINT = 'ovos-translate-plugin-nllb = ovos_translate_plugin_nllb:NLLB200Translator'
+AUTOTUNE_ENTRY_POINT = 'ovos-nllb-autotune = ovos_translate_plugin_nllb.autotune:main'
+SERVER_ENTRY_POINT = 'ovos-nllb-server = ovos_translate_plugin_nllb.server:main'
+PRETRANSLATE_ENTRY_POINT = 'ovos-nllb-pretranslate = ovos_translate_plugin_nllb.pretranslate:main'
+VMAP_ENTRY_POINT = 'ovos-nllb-vmap = ovos_translate_plugin_nllb.vmap:main'
 
 
 def get_version():
@@ -78,6 +82,7 @@ setup(
         'Programming Language :: Python :: 3.11',
     ],
     entry_points={
-        'neon.plugin.lang.translate': TX_ENTRY_POINT
+        'neon.plugin.lang.translate': TX_ENTRY_POINT,
+        'console_scripts': [AUTOTUNE_ENTRY_POINT, SERVER_ENTRY_POINT, PRETRANSLATE_ENTRY_POINT, VMAP_ENTRY_POINT]
     }
 )
\ No newline at end of file
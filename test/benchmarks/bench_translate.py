@@ -0,0 +1,109 @@
+"""
+Offline performance benchmark of the translate() hot path.
+
+Measures per-stage latency (language resolution, SentencePiece encode, translate_batch, detokenize),
+throughput at several batch sizes and peak RSS, and prints the results as JSON so runs can be compared.
+Without --model a tiny synthetic model is generated, no network or GPU needed.
+
+    python test/benchmarks/bench_translate.py --output before.json
+"""
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from os.path import dirname, realpath
+from typing import Callable, Dict, List
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from synthetic_model import CORPUS, build_synthetic_model
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 1024 / 1024 if platform.system() == "Darwin" else peak / 1024
+
+
+def time_it(fn: Callable, runs: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {"median_ms": statistics.median(timings) * 1000,
+            "p95_ms": timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000}
+
+
+def stage_latencies(tx: NLLB200Translator, sentences: List[str], runs: int) -> Dict[str, Dict[str, float]]:
+    src_lang, tgt_lang = tx._resolve_languages("en-us", "es")
+    encoded = tx._encode(sentences, src_lang)
+    prefix = [[tgt_lang]] * len(sentences)
+    hypotheses = tx._translate_batch(encoded, prefix)
+    return {
+        "resolve_languages": time_it(lambda: tx._resolve_languages("en-us", "es"), runs),
+        "encode": time_it(lambda: tx._encode(sentences, src_lang), runs),
+        "translate_batch": time_it(lambda: tx._translate_batch(encoded, prefix), runs),
+        "decode": time_it(lambda: tx._decode(hypotheses, tgt_lang), runs),
+        "translate": time_it(lambda: tx.translate(sentences, "es", "en-us"), runs),
+    }
+
+
+def throughput(tx: NLLB200Translator, batch_sizes: List[int], runs: int) -> Dict[str, float]:
+    results = {}
+    for batch_size in batch_sizes:
+        batch = [CORPUS[i % len(CORPUS)] for i in range(batch_size)]
+        elapsed = time_it(lambda: tx.translate(batch, "es", "en"), runs)["median_ms"] / 1000
+        results[str(batch_size)] = batch_size / elapsed
+    return results
+
+
+def run(config: Dict, batch_sizes: List[int], runs: int) -> Dict:
+    start = time.perf_counter()
+    tx = NLLB200Translator(config=config)
+    load_s = time.perf_counter() - start
+    tx.translate(CORPUS, "es", "en")  # warm up
+    return {
+        "config": config,
+        "load_seconds": load_s,
+        "stages": stage_latencies(tx, CORPUS, runs),
+        "sentences_per_second": throughput(tx, batch_sizes, runs),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="model name or path, defaults to a synthetic model")
+    parser.add_argument("--tokenizer", help="tokenizer name or path, required with --model")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-decoding-length", type=int, default=64)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            config = {"model": args.model,
+                      "tokenizer": args.tokenizer or "flores200_sacrebleu_tokenizer_spm"}
+        else:
+            model_dir, tokenizer_path = build_synthetic_model(tmp)
+            config = {"model": model_dir, "tokenizer": tokenizer_path}
+        config["max_decoding_length"] = args.max_decoding_length
+        results = run(config, args.batch_sizes, args.runs)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+translate_to_many() against one translate() call per target language.
+
+    python test/benchmarks/benchmark_fan_out.py --targets es pt fr de it nl
+"""
+import argparse
+import statistics
+import sys
+import time
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+NOTIFICATION = "Your package has been delivered and is waiting at the front door"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--targets", nargs="+", default=["es", "pt", "fr", "de", "it", "nl"])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    tx = NLLB200Translator(config={"model": args.model, "tokenizer": args.tokenizer})
+    tx.translate(NOTIFICATION, "es", "en")  # warm up
+
+    sequential, fan_out = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        for target in args.targets:
+            tx.translate(NOTIFICATION, target, "en")
+        sequential.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tx.translate_to_many(NOTIFICATION, args.targets, "en")
+        fan_out.append(time.perf_counter() - start)
+
+    seq, fan = statistics.median(sequential), statistics.median(fan_out)
+    print(f"{len(args.targets)} targets: sequential {seq * 1000:.1f} ms  "
+          f"translate_to_many {fan * 1000:.1f} ms  speedup x{seq / fan:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+translate_markup() on large HTML, SSML and Markdown documents, against translating text node by text node.
+
+The documents mimic web pages and skill answers: paragraphs with inline markup, plus navigation,
+buttons and footers repeated on every page.
+
+    python test/benchmarks/benchmark_markup.py --synthetic --pages 20
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.markup import escape, split_markup, unescape
+from synthetic_model import build_synthetic_model
+
+SENTENCES = ["The weather today is sunny and warm", "Your package was delivered this morning",
+             "The museum is closed on Mondays", "The train to the airport leaves every twenty minutes",
+             "Please close the window before you leave", "The restaurant opens at eight in the evening",
+             "The children are playing in the garden", "Do not forget your umbrella"]
+BOILERPLATE = ["Home", "News", "Contact us", "Read more", "Privacy policy", "All rights reserved"]
+
+
+def html_page(rng: random.Random, paragraphs: int) -> str:
+    nav = "".join(f'<li><a href="/{i}">{item}</a></li>' for i, item in enumerate(BOILERPLATE[:3]))
+    body = "".join(f"<p>{rng.choice(SENTENCES)}, <b>{rng.choice(SENTENCES).lower()}</b> &amp; "
+                   f"{rng.choice(SENTENCES).lower()} {rng.randint(1, 1000)}.</p>\n"
+                   f'<a class="button" href="#">{BOILERPLATE[3]}</a>\n' for _ in range(paragraphs))
+    return (f"<html><head><title>{BOILERPLATE[1]}</title></head><body><ul>{nav}</ul>\n{body}"
+            f"<footer>{BOILERPLATE[4]} &copy; {BOILERPLATE[5]}</footer></body></html>")
+
+
+def ssml_page(rng: random.Random, paragraphs: int) -> str:
+    body = "".join(f'<p><s>{rng.choice(SENTENCES)}.</s><break time="300ms"/><s>{rng.choice(SENTENCES)} '
+                   f'<say-as interpret-as="cardinal">{rng.randint(1, 1000)}</say-as>.</s></p>'
+                   for _ in range(paragraphs))
+    return f'<speak xml:lang="en-US">{body}</speak>'
+
+
+def markdown_page(rng: random.Random, paragraphs: int) -> str:
+    body = "".join(f"- {rng.choice(SENTENCES)}, **{rng.choice(SENTENCES).lower()}** {rng.randint(1, 1000)}\n"
+                   f"- [{BOILERPLATE[3]}](https://example.com/{i})\n" for i in range(paragraphs))
+    return f"# {BOILERPLATE[1]}\n\n{body}\n`{BOILERPLATE[0]}` {BOILERPLATE[5]}\n"
+
+
+PAGES = {"html": html_page, "ssml": ssml_page, "markdown": markdown_page}
+
+
+def node_by_node(tx: NLLB200Translator, payload: str, markup: str) -> str:
+    """ one translate() call per text node """
+    out = []
+    for piece, translatable in split_markup(payload, markup):
+        text, entities = unescape(piece)
+        if translatable and any(c.isalpha() for c in text):
+            lead, trail = piece[:len(piece) - len(piece.lstrip())], piece[len(piece.rstrip()):]
+            piece = lead + escape(tx.translate(" ".join(text.split()), "es", "en"), entities,
+                                  markup != "markdown") + trail
+        out.append(piece)
+    return "".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--synthetic", action="store_true", help="use a generated model instead of --model")
+    parser.add_argument("--pages", type=int, default=20, help="documents per format")
+    parser.add_argument("--paragraphs", type=int, default=10, help="paragraphs per document")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            model, tokenizer = build_synthetic_model(join(tmp, "model"), d_model=256, ffn_dim=1024, num_layers=4)
+        else:
+            model, tokenizer = args.model, args.tokenizer
+        tx = NLLB200Translator(config={"model": model, "tokenizer": tokenizer, "max_decoding_length": 64})
+        tx.translate("warm up", "es", "en")
+        rng = random.Random(0)
+        for markup, page in PAGES.items():
+            payloads = [page(rng, args.paragraphs) for _ in range(args.pages)]
+            nodes = [piece.strip() for payload in payloads
+                     for piece, translatable in split_markup(payload, markup)
+                     if translatable and any(c.isalpha() for c in piece)]
+            baseline, batched = [], []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                for payload in payloads:
+                    node_by_node(tx, payload, markup)
+                baseline.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                tx.translate_markup(payloads, "es", "en", markup=markup)
+                batched.append(time.perf_counter() - start)
+            base, new = statistics.median(baseline), statistics.median(batched)
+            size_kb = sum(len(p) for p in payloads) / 1024
+            print(f"{markup:8}  {size_kb:6.0f} KB  {len(nodes):5d} nodes ({len(set(nodes))} distinct)  "
+                  f"node by node {len(nodes) / base:7.1f} nodes/s  batched {len(nodes) / new:7.1f} nodes/s  "
+                  f"speedup x{base / new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Cost of the hot path instrumentation: translate() with metrics disabled, enabled, and the bare span bookkeeping.
+
+    python test/benchmarks/benchmark_metrics_overhead.py --synthetic
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.metrics import STAGES
+from synthetic_model import CORPUS, build_synthetic_model
+
+
+def time_calls(tx: NLLB200Translator, sentences, calls: int) -> float:
+    """ median seconds of a single sentence translate() call """
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        tx.translate(sentences[i % len(sentences)], "es", "en")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def span_overhead(tx: NLLB200Translator, number: int = 200000) -> float:
+    """ seconds spent entering and leaving the spans of one translate() call """
+    def one_call():
+        for stage in STAGES:
+            with tx._span(stage):
+                pass
+    return timeit.timeit(one_call, number=number) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--synthetic", action="store_true", help="use a generated model instead of --model")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            model, tokenizer = build_synthetic_model(join(tmp, "model"), d_model=256, ffn_dim=1024, num_layers=4)
+        else:
+            model, tokenizer = args.model, args.tokenizer
+        config = {"model": model, "tokenizer": tokenizer, "max_decoding_length": 32}
+        disabled = NLLB200Translator(config=config)
+        enabled = NLLB200Translator(config={**config, "metrics": True})
+        enabled.metrics.add_callback(lambda record: None)
+        for tx in (disabled, enabled):
+            time_calls(tx, CORPUS, 10)  # warm up
+
+        off, on = [], []
+        for _ in range(3):
+            off.append(time_calls(disabled, CORPUS, args.calls))
+            on.append(time_calls(enabled, CORPUS, args.calls))
+        off, on = min(off), min(on)
+        spans_off, spans_on = span_overhead(disabled), span_overhead(enabled)
+
+    print(f"translate() median   disabled {off * 1000:8.3f} ms   enabled {on * 1000:8.3f} ms "
+          f"({(on - off) / off * 100:+.1f}%)")
+    print(f"span bookkeeping     disabled {spans_off * 1e6:8.3f} us   enabled {spans_on * 1e6:8.3f} us "
+          f"per call ({spans_off / off * 100:.4f}% / {spans_on / off * 100:.3f}% of a translation)")
+
+
+if __name__ == "__main__":
+    main()
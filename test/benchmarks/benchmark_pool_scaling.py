@@ -0,0 +1,62 @@
+"""
+Throughput of NLLBWorkerPool at 1, 2, 4, ... worker processes, against a single in-process translator.
+
+    python test/benchmarks/benchmark_pool_scaling.py --max-workers 16
+    python test/benchmarks/benchmark_pool_scaling.py --synthetic  # no download needed
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.pool import NLLBWorkerPool
+from synthetic_model import CORPUS, build_synthetic_model
+
+
+def measure(translate, sentences, rounds) -> float:
+    translate(sentences[:8])  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        translate(sentences)
+    return len(sentences) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--synthetic", action="store_true", help="use a generated model instead of --model")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sentences", type=int, default=512)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            model, tokenizer = build_synthetic_model(join(tmp, "model"), d_model=256, ffn_dim=1024, num_layers=4)
+        else:
+            model, tokenizer = args.model, args.tokenizer
+        config = {"model": model, "tokenizer": tokenizer, "max_decoding_length": 64}
+        sentences = (CORPUS * (args.sentences // len(CORPUS) + 1))[:args.sentences]
+
+        tx = NLLB200Translator(config=config)
+        baseline = measure(lambda s: tx.translate(s, "es", "en"), sentences, args.rounds)
+        print(f"single process      {baseline:8.1f} sentences/s")
+        del tx
+
+        workers = 1
+        while workers <= args.max_workers:
+            with NLLBWorkerPool(config, workers=workers) as pool:
+                pool.wait_until_ready()
+                speed = measure(lambda s: pool.translate(s, "es", "en"), sentences, args.rounds)
+            print(f"{workers:3d} workers         {speed:8.1f} sentences/s  x{speed / baseline:.2f}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
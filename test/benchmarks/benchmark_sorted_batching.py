@@ -0,0 +1,111 @@
+"""
+translate() deduplication, and sorting by length ourselves, measured separately.
+
+    caller order      every sentence in one translate_batch call, CTranslate2 sorts and splits it
+    dedup             translate(): distinct sentences only, still one call
+    dedup + sorted    distinct sentences sorted into sub-batches, one blocking call each
+
+CTranslate2 already sorts by length when `max_batch_size` is set, and runs its sub-batches in parallel
+on the `inter_threads` replicas, so sorting ahead of it only serializes the work.
+The input mimics assistant traffic: many short, repeated commands mixed with a few long answers.
+
+    python test/benchmarks/benchmark_sorted_batching.py --synthetic --inter-threads 2
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.document import bucket_by_length
+from synthetic_model import build_synthetic_model
+
+SHORT = ["stop", "what time is it", "turn off the lights", "play some music", "what's the weather",
+         "set a timer for five minutes", "volume up", "cancel"]
+LONG = ["Here is what I found on the web about the history of the printing press, which was invented "
+        "around 1440 by Johannes Gutenberg and changed how knowledge spread across Europe",
+        "Your package has been delivered and is waiting at the front door, the courier left a note saying "
+        "that the next delivery attempt for the second parcel will be tomorrow between nine and noon",
+        "The nearest pharmacy is two kilometres away and closes at nine in the evening, there is another "
+        "one open all night next to the central train station"]
+
+
+def skewed_inputs(n: int, duplicate_ratio: float, seed: int = 0):
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(n):
+        if inputs and rng.random() < duplicate_ratio:
+            inputs.append(rng.choice(inputs))
+        elif rng.random() < 0.15:
+            inputs.append(f"{rng.choice(LONG)} ({i})")
+        else:
+            inputs.append(f"{rng.choice(SHORT)} {i}")
+    return inputs
+
+
+def caller_order(tx: NLLB200Translator, sentences, src_lang, tgt_lang):
+    """ the previous behaviour, every sentence in a single batch """
+    hypotheses = tx._translate_batch(tx._encode(sentences, src_lang), [[tgt_lang]] * len(sentences))
+    return tx._decode(hypotheses, tgt_lang)
+
+
+def sorted_sub_batches(tx: NLLB200Translator, sentences, src_lang, tgt_lang):
+    """ distinct sentences sorted by length into sub-batches, translated one after the other """
+    unique = list(dict.fromkeys(sentences))
+    subworded = tx._encode(unique, src_lang)
+    translated = [""] * len(unique)
+    for batch in bucket_by_length([len(s) for s in subworded], tx.max_batch_size):
+        hypotheses = tx._translate_batch([subworded[i] for i in batch], [[tgt_lang]] * len(batch))
+        for i, tr in zip(batch, tx._decode(hypotheses, tgt_lang)):
+            translated[i] = tr
+    by_text = dict(zip(unique, translated))
+    return [by_text[s] for s in sentences]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--synthetic", action="store_true", help="use a generated model instead of --model")
+    parser.add_argument("--sentences", type=int, default=128)
+    parser.add_argument("--duplicates", type=float, default=0.5, help="share of repeated inputs")
+    parser.add_argument("--inter-threads", type=int, default=2, help="CTranslate2 model replicas")
+    parser.add_argument("--max-batch-size", type=int, default=256, help="source tokens per sub-batch")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            model, tokenizer = build_synthetic_model(join(tmp, "model"), d_model=256, ffn_dim=1024, num_layers=4)
+        else:
+            model, tokenizer = args.model, args.tokenizer
+        tx = NLLB200Translator(config={"model": model, "tokenizer": tokenizer, "max_decoding_length": 64,
+                                       "inter_threads": args.inter_threads, "max_batch_size": args.max_batch_size})
+        sentences = skewed_inputs(args.sentences, args.duplicates)
+        src_lang, tgt_lang = tx._resolve_languages("en", "es")
+        tx.translate(sentences[:4], "es", "en")  # warm up
+
+        modes = {"caller order": lambda: caller_order(tx, sentences, src_lang, tgt_lang),
+                 "dedup": lambda: tx.translate(sentences, "es", "en"),
+                 "dedup + sorted": lambda: sorted_sub_batches(tx, sentences, src_lang, tgt_lang)}
+        timings = {name: [] for name in modes}
+        for _ in range(args.runs):
+            for name, run in modes.items():
+                start = time.perf_counter()
+                run()
+                timings[name].append(time.perf_counter() - start)
+
+    base = statistics.median(timings["caller order"])
+    print(f"{len(sentences)} sentences, {len(set(sentences))} distinct, {args.inter_threads} replicas")
+    for name, samples in timings.items():
+        median = statistics.median(samples)
+        print(f"{name:16}  {median * 1000:8.1f} ms  speedup x{base / median:.2f}")
+
+
+if __name__ == "__main__":
+    main()
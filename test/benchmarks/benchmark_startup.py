@@ -0,0 +1,103 @@
+"""
+Cold start time of the plugin: first install over the network, later starts resolved from the
+install manifest, and offline mode with the server gone.
+
+Every start runs in a fresh interpreter against a synthetic model served from a local HTTP server,
+which also counts the requests each start makes and adds `--latency-ms` to each of them.
+
+    python test/benchmarks/benchmark_startup.py --runs 5 --latency-ms 100
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from synthetic_model import build_synthetic_model
+
+REPO = dirname(dirname(dirname(realpath(__file__))))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from ovos_translate_plugin_nllb import NLLB200Translator
+tx = NLLB200Translator(config=json.loads(sys.argv[1]))
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.server.n_requests += 1
+        time.sleep(self.server.latency)
+        super().do_HEAD()
+
+    def do_GET(self):
+        self.server.n_requests += 1
+        time.sleep(self.server.latency)
+        super().do_GET()
+
+
+def cold_start(config, data_home) -> float:
+    env = {**os.environ, "XDG_DATA_HOME": data_home, "PYTHONPATH": REPO}
+    out = subprocess.run([sys.executable, "-c", CHILD, json.dumps(config)], env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=100, help="simulated round trip time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir, tokenizer = build_synthetic_model(join(tmp, "build"), d_model=256, ffn_dim=1024, num_layers=4)
+        served = join(tmp, "served")
+        os.makedirs(served)
+        shutil.make_archive(join(served, "nllb-synthetic"), "zip", dirname(model_dir), os.path.basename(model_dir))
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=served))
+        server.n_requests = 0
+        server.latency = args.latency_ms / 1000
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/nllb-synthetic.zip"
+        config = {"model": url, "tokenizer": tokenizer}
+
+        results = {}
+        installs = []
+        for i in range(args.runs):
+            data_home = join(tmp, f"install_{i}")
+            installs.append(cold_start(config, data_home))
+        results["first start (download)"] = (installs, server.n_requests / args.runs)
+
+        data_home = join(tmp, "install_0")
+        server.n_requests = 0
+        warm = [cold_start(config, data_home) for _ in range(args.runs)]
+        results["installed, network up"] = (warm, server.n_requests / args.runs)
+
+        server.shutdown()
+        server.server_close()
+        offline = [cold_start({**config, "offline": True}, data_home) for _ in range(args.runs)]
+        results["installed, offline"] = (offline, 0)
+
+    for name, (times, n_requests) in results.items():
+        print(f"{name:24s} median {statistics.median(times) * 1000:8.1f} ms  "
+              f"http requests per start {n_requests:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Time to first word of translate_stream() against the blocking translate() path.
+
+    python test/benchmarks/benchmark_streaming.py --runs 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+SENTENCES = [
+    "Hello World",
+    "The weather today is sunny with a high of twenty degrees and a light breeze from the west",
+    "Here is what I found on the web about the history of the printing press in Europe",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    tx = NLLB200Translator(config={"model": args.model, "tokenizer": args.tokenizer, "beam_size": 1})
+    tx.translate(SENTENCES[0], "es", "en")  # warm up
+
+    for sentence in SENTENCES:
+        blocking, first, total = [], [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            tx.translate(sentence, "es", "en")
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            stream = tx.translate_stream(sentence, "es", "en")
+            next(stream, None)
+            first.append(time.perf_counter() - start)
+            for _ in stream:
+                pass
+            total.append(time.perf_counter() - start)
+        print(f"{len(sentence.split()):3d} words: blocking {statistics.median(blocking) * 1000:7.1f} ms  "
+              f"stream first word {statistics.median(first) * 1000:7.1f} ms  "
+              f"stream total {statistics.median(total) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Lookup latency and hit rate of the translation memory on a synthetic templated corpus.
+
+Utterances are generated from assistant style templates with random numbers, names and cities,
+queries add unseen politeness prefixes and suffixes. The memory is filled with templated and free text
+"translations" and queried with a mix of both, the hit rate is compared to an exact match cache.
+
+    python test/benchmarks/benchmark_translation_memory.py --entries 10000
+"""
+import argparse
+import random
+import sys
+import time
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb.translation_memory import TranslationMemory
+
+# (source, translation), "{n}" numbers and "{name}" entities are kept verbatim by the translation
+TEMPLATES = [
+    ("set a timer for {n} minutes", "pon un temporizador de {n} minutos"),
+    ("wake me up at {n}", "despiértame a las {n}"),
+    ("remind me to call {name} in {n} hours", "recuérdame llamar a {name} en {n} horas"),
+    ("what's the weather in {name}", "qué tiempo hace en {name}"),
+    ("send a message to {name}", "envía un mensaje a {name}"),
+    ("set the volume to {n} percent", "pon el volumen al {n} por ciento"),
+    ("play the top {n} songs of {name}", "reproduce las {n} mejores canciones de {name}"),
+    ("how far is {name} from here", "a qué distancia está {name} de aquí"),
+]
+PREFIXES = ["", "please ", "hey, ", "could you "]
+SUFFIXES = ["", " please", " now", " for me"]
+NAMES = ["Anna", "Peter", "Lisbon", "Berlin", "Queen", "Madonna", "Tokyo", "Maria", "Oslo", "Nairobi"]
+WORDS = ("the of and to in is you that it he was for on are as with his they at be this have from or one had "
+         "by word but not what all were we when your can said there use an each which she do how their if will "
+         "up other about out many then them these so some her would make like him into time has look two more "
+         "write go see number no way could people my than first water been call who oil its now find long down "
+         "day did get come made may part").split()
+
+
+def templated(rng: random.Random, prefixes, suffixes):
+    source, target = rng.choice(TEMPLATES)
+    values = {"n": str(rng.randint(1, 500)), "name": rng.choice(NAMES) + rng.choice(["", "ville", "burg"])}
+    source = rng.choice(prefixes) + source.format(**values) + rng.choice(suffixes)
+    return source, target.format(**values)
+
+
+def free_text(rng: random.Random):
+    """ unrelated utterances, the model has to translate them """
+    sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+    return sentence, sentence[::-1]
+
+
+def synthetic_pairs(entries: int, queries: int, templated_ratio: float, seed: int = 0):
+    """
+    Stored pairs only use the plain wording of the templates, queries also use unseen prefixes and suffixes.
+    """
+    rng = random.Random(seed)
+    stored = [templated(rng, PREFIXES[:1], SUFFIXES[:1]) if rng.random() < 0.1 else free_text(rng)
+              for _ in range(entries)]
+    asked = [templated(rng, PREFIXES, SUFFIXES) if rng.random() < templated_ratio else free_text(rng)
+             for _ in range(queries)]
+    return stored + asked
+
+
+def run(tm: TranslationMemory, pairs, warmup: int):
+    for source, target in pairs[:warmup]:
+        tm.put(source, target, "eng_Latn", "spa_Latn")
+    exact = {source for source, _ in pairs[:warmup]}
+    latencies, exact_hits = [], 0
+    for source, target in pairs[warmup:]:
+        start = time.perf_counter()
+        translation = tm.get(source, "eng_Latn", "spa_Latn")
+        latencies.append(time.perf_counter() - start)
+        if translation is None:
+            tm.put(source, target, "eng_Latn", "spa_Latn")  # as the translator does after a miss
+        exact_hits += source in exact
+        exact.add(source)
+    latencies.sort()
+    queries = len(latencies)
+    return {"queries": queries,
+            "exact_cache_hit_rate": exact_hits / queries,
+            "hit_rate": (tm.hits + tm.fuzzy_hits) / queries,
+            "fuzzy_hit_rate": tm.fuzzy_hits / queries,
+            "p50_us": latencies[queries // 2] * 1e6,
+            "p99_us": latencies[int(queries * 0.99)] * 1e6,
+            "entries": len(tm)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000, help="utterances stored before querying")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--templated", type=float, default=0.7, help="share of templated queries")
+    args = parser.parse_args()
+
+    pairs = synthetic_pairs(args.entries, args.queries, args.templated)
+    for threshold in (1.0, 0.9, 0.8, 0.7):
+        tm = TranslationMemory(threshold=threshold, max_entries=args.entries + args.queries)
+        r = run(tm, pairs, args.entries)
+        print(f"threshold {threshold:.1f}: hit rate {r['hit_rate']:6.1%} (fuzzy {r['fuzzy_hit_rate']:5.1%}, "
+              f"exact cache {r['exact_cache_hit_rate']:5.1%})  lookup p50 {r['p50_us']:6.1f} us "
+              f"p99 {r['p99_us']:6.1f} us  {r['entries']} templates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Decode speed and output quality with and without a vocabulary map (`vmap_languages`).
+
+The target vocabulary is built from the script of the target language, or from `--corpus`.
+BLEU and chrF of both against the references of the bundled sample set must stay within `--tolerance`.
+
+    python test/benchmarks/benchmark_vmap.py
+    python test/benchmarks/benchmark_vmap.py --synthetic  # runs the code path, the scores are meaningless
+"""
+import argparse
+import math
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from os.path import dirname, join, realpath
+from typing import List
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+import sentencepiece as spm
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.vmap import build_vocab, vocab_path, write_vocab
+from synthetic_model import build_synthetic_model
+
+SAMPLE = join(dirname(realpath(__file__)), "data", "sample_en_es.tsv")
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+|[^\w\s]", text)
+
+
+def corpus_bleu(hypotheses: List[str], references: List[str], max_n: int = 4) -> float:
+    """ BLEU with punctuation split from words, 0-100 """
+    matches, totals = [0] * max_n, [0] * max_n
+    hyp_len = ref_len = 0
+    for hyp, ref in zip(hypotheses, references):
+        hyp, ref = _words(hyp), _words(ref)
+        hyp_len += len(hyp)
+        ref_len += len(ref)
+        for n in range(1, max_n + 1):
+            hyp_ngrams = Counter(tuple(hyp[i:i + n]) for i in range(len(hyp) - n + 1))
+            ref_ngrams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+            matches[n - 1] += sum((hyp_ngrams & ref_ngrams).values())
+            totals[n - 1] += max(len(hyp) - n + 1, 0)
+    if not hyp_len or not all(matches):
+        return 0.0
+    log_precision = sum(math.log(m / t) for m, t in zip(matches, totals)) / max_n
+    brevity = 1.0 if hyp_len > ref_len else math.exp(1 - ref_len / hyp_len)
+    return 100 * brevity * math.exp(log_precision)
+
+
+def corpus_chrf(hypotheses: List[str], references: List[str], max_n: int = 6, beta: float = 2.0) -> float:
+    """ character n-gram F-score, whitespace ignored, 0-100 """
+    matches, hyp_totals, ref_totals = [0] * max_n, [0] * max_n, [0] * max_n
+    for hyp, ref in zip(hypotheses, references):
+        hyp, ref = "".join(hyp.split()), "".join(ref.split())
+        for n in range(1, max_n + 1):
+            hyp_ngrams = Counter(hyp[i:i + n] for i in range(len(hyp) - n + 1))
+            ref_ngrams = Counter(ref[i:i + n] for i in range(len(ref) - n + 1))
+            matches[n - 1] += sum((hyp_ngrams & ref_ngrams).values())
+            hyp_totals[n - 1] += sum(hyp_ngrams.values())
+            ref_totals[n - 1] += sum(ref_ngrams.values())
+    precision = sum(m / t for m, t in zip(matches, hyp_totals) if t) / max_n
+    recall = sum(m / t for m, t in zip(matches, ref_totals) if t) / max_n
+    if not precision and not recall:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+def run(tx: NLLB200Translator, sources: List[str], target: str, runs: int):
+    """ best time of `runs` translations of the sample, one sentence per call like an assistant """
+    best, translations = float("inf"), []
+    for _ in range(runs):
+        start = time.perf_counter()
+        translations = [tx.translate(s, target, "en") for s in sources]
+        best = min(best, time.perf_counter() - start)
+    return best, translations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--synthetic", action="store_true", help="use a generated model instead of --model")
+    parser.add_argument("--corpus", help="target language text to build the vocabulary from")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="accepted BLEU/chrF drop")
+    args = parser.parse_args()
+
+    with open(SAMPLE, encoding="utf-8") as f:
+        sources, references = zip(*(line.rstrip("\n").split("\t") for line in f if line.strip()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            model, tokenizer = build_synthetic_model(join(tmp, "model"), d_model=256, ffn_dim=1024, num_layers=4)
+        else:
+            model, tokenizer = args.model, args.tokenizer
+        sp = spm.SentencePieceProcessor()
+        sp.load(NLLB200Translator.download_tokenizer(tokenizer))
+        pieces = [sp.id_to_piece(i) for i in range(sp.get_piece_size())]
+        corpus = None
+        if args.corpus:
+            with open(args.corpus, encoding="utf-8") as f:
+                corpus = [sp.encode(line.strip(), out_type=str) for line in f if line.strip()]
+        vocab = build_vocab("spa_Latn", pieces, corpus)
+        write_vocab(vocab_path("spa_Latn", tmp), vocab)
+
+        config = {"model": model, "tokenizer": tokenizer, "beam_size": 4}
+        full = NLLB200Translator(config=config)
+        restricted = NLLB200Translator(config={**config, "vmap_languages": ["es"], "vmap_dir": tmp})
+        run(full, sources[:2], "es", 1)  # warm up
+        run(restricted, sources[:2], "es", 1)
+        full_time, full_out = run(full, sources, "es", args.runs)
+        vmap_time, vmap_out = run(restricted, sources, "es", args.runs)
+
+    full_bleu, vmap_bleu = corpus_bleu(full_out, references), corpus_bleu(vmap_out, references)
+    full_chrf, vmap_chrf = corpus_chrf(full_out, references), corpus_chrf(vmap_out, references)
+    print(f"vocabulary {len(vocab)} of {len(pieces)} tokens")
+    print(f"full vocabulary  {full_time * 1000:8.1f} ms  BLEU {full_bleu:5.1f}  chrF {full_chrf:5.1f}")
+    print(f"vmap             {vmap_time * 1000:8.1f} ms  BLEU {vmap_bleu:5.1f}  chrF {vmap_chrf:5.1f}  "
+          f"speedup x{full_time / vmap_time:.2f}")
+    print(f"identical outputs {sum(a == b for a, b in zip(full_out, vmap_out))}/{len(sources)}")
+    if full_bleu - vmap_bleu > args.tolerance or full_chrf - vmap_chrf > args.tolerance:
+        print("quality dropped with the vocabulary map")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import sys
+from os.path import dirname, realpath
+
+import pytest
+
+sys.path.append(dirname(realpath(__file__)))
+from synthetic_model import build_synthetic_model
+
+
+@pytest.fixture(scope="session")
+def synthetic_model(tmp_path_factory):
+    """ (model dir, tokenizer path) of a tiny randomly initialized model """
+    return build_synthetic_model(str(tmp_path_factory.mktemp("synthetic_nllb")))
+
+
+@pytest.fixture(scope="session")
+def synthetic_translator(synthetic_model):
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    model_dir, tokenizer_path = synthetic_model
+    return NLLB200Translator(config={"model": model_dir,
+                                     "tokenizer": tokenizer_path,
+                                     "max_decoding_length": 64})
@@ -0,0 +1,69 @@
+"""
+Load test comparing the per-call translate() path against the micro-batching scheduler.
+
+    python test/benchmarks/load_test_batching.py --threads 32 --requests 512
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+SENTENCES = [
+    "I didn't catch that",
+    "Setting a timer for five minutes",
+    "The weather today is sunny with a high of twenty degrees",
+    "Playing music",
+    "Here is what I found on the web about the history of the printing press",
+    "Good morning",
+]
+
+
+def run_load(tx: NLLB200Translator, threads: int, n_requests: int) -> dict:
+    latencies = []
+
+    def call(i):
+        t = time.perf_counter()
+        tx.translate(SENTENCES[i % len(SENTENCES)], "es", "en")
+        latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "sentences_per_second": n_requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    config = {"model": args.model, "tokenizer": args.tokenizer}
+    for label, extra in (("per-call", {}),
+                         ("micro-batching", {"micro_batching": True,
+                                             "batch_max_wait_ms": args.max_wait_ms})):
+        tx = NLLB200Translator(config={**config, **extra})
+        tx.translate(SENTENCES[0], "es", "en")  # warm up
+        stats = run_load(tx, args.threads, args.requests)
+        print(f"{label:>15}: {stats['sentences_per_second']:8.1f} sent/s  "
+              f"p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms")
+        if tx.scheduler is not None:
+            tx.scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load test of the HTTP server: concurrent clients sending single sentence /translate requests.
+
+Reports throughput, latency percentiles and how many requests were rejected with 429.
+
+    # against a running ovos-nllb-server
+    python test/benchmarks/load_test_server.py --url http://127.0.0.1:5000 --clients 64
+    # start a server in-process on a generated model
+    python test/benchmarks/load_test_server.py --synthetic --clients 64
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, join, realpath
+from urllib.parse import urlsplit
+
+sys.path.append(dirname(realpath(__file__)))
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from synthetic_model import CORPUS, build_synthetic_model
+
+
+def start_server(config, max_queue) -> str:
+    from ovos_translate_plugin_nllb import NLLB200Translator
+    from ovos_translate_plugin_nllb.server import TranslationServer
+
+    server = TranslationServer(NLLB200Translator(config=config), "127.0.0.1", 0, max_queue=max_queue)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    return f"http://127.0.0.1:{server.port}"
+
+
+def client(url: str, deadline: float, results: list):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    i = 0
+    while time.monotonic() < deadline:
+        body = json.dumps({"q": CORPUS[i % len(CORPUS)], "source": "en", "target": "es"})
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/translate", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            status = 0
+        results.append((status, time.perf_counter() - start))
+        i += 1
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="server to test, started in-process when not given")
+    parser.add_argument("--model", default="nllb-200_600M_int8")
+    parser.add_argument("--tokenizer", default="flores200_sacrebleu_tokenizer_spm")
+    parser.add_argument("--synthetic", action="store_true", help="use a generated model instead of --model")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--max-queue", type=int, default=1024, help="queue size of the in-process server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if not url:
+            if args.synthetic:
+                model, tokenizer = build_synthetic_model(join(tmp, "model"), d_model=256, ffn_dim=1024,
+                                                         num_layers=4)
+            else:
+                model, tokenizer = args.model, args.tokenizer
+            url = start_server({"model": model, "tokenizer": tokenizer, "max_decoding_length": 64},
+                               args.max_queue)
+
+        results = []
+        deadline = time.monotonic() + args.duration
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            for _ in range(args.clients):
+                pool.submit(client, url, deadline, results)
+        elapsed = time.perf_counter() - start
+
+    ok = sorted(latency for status, latency in results if status == 200)
+    rejected = sum(1 for status, _ in results if status == 429)
+    failed = len(results) - len(ok) - rejected
+    print(f"{args.clients} clients, {elapsed:.1f}s: {len(ok) / elapsed:.1f} translations/s, "
+          f"{rejected} rejected (429), {failed} failed")
+    if len(ok) >= 2:
+        q = statistics.quantiles(ok, n=100)
+        print(f"latency p50 {q[49] * 1000:.1f} ms  p95 {q[94] * 1000:.1f} ms  p99 {q[98] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
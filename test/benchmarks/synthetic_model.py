@@ -0,0 +1,109 @@
+"""
+Tiny randomly initialized NLLB-like CTranslate2 model and SentencePiece tokenizer.
+
+Translations are gibberish, but every code path of the plugin runs exactly as with the real
+checkpoints, without network access or a GPU.
+"""
+import io
+import os
+import re
+import sys
+from os.path import dirname, realpath
+from typing import Tuple
+
+import numpy as np
+import sentencepiece as spm
+from ctranslate2 import specs
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+CORPUS = [
+    "I didn't catch that",
+    "Setting a timer for five minutes",
+    "The weather today is sunny with a high of twenty degrees",
+    "Here is what I found on the web about the history of the printing press",
+    "Your package has been delivered and is waiting at the front door",
+    "Hola mundo, que tal estas hoy",
+    "Bom dia, o jantar esta pronto",
+]
+
+
+def _variable_shape(name: str, d_model: int, ffn_dim: int, vocab_size: int) -> Tuple[int, ...]:
+    if name.endswith(("gamma", "beta")):
+        return d_model,
+    if "embeddings" in name or "projection" in name:
+        return vocab_size, d_model
+    if "self_attention/linear_0" in name:
+        return 3 * d_model, d_model
+    if "/attention/linear_1" in name:
+        return 2 * d_model, d_model
+    if "ffn/linear_0" in name:
+        return ffn_dim, d_model
+    if "ffn/linear_1" in name:
+        return d_model, ffn_dim
+    return d_model, d_model
+
+
+def _set_variable(spec, name: str, value: np.ndarray):
+    obj = spec
+    *path, attr = name.split("/")
+    for part in path:
+        match = re.fullmatch(r"(.*)_(\d+)", part)
+        if match and isinstance(getattr(obj, match.group(1), None), list):
+            obj = getattr(obj, match.group(1))[int(match.group(2))]
+        else:
+            obj = getattr(obj, part)
+    setattr(obj, attr, value)
+
+
+def build_synthetic_model(output_dir: str, d_model: int = 16, ffn_dim: int = 32,
+                          num_layers: int = 1, seed: int = 0) -> Tuple[str, str]:
+    """
+    Generate the model in `output_dir`.
+
+    Returns:
+        Tuple[str, str]: The CTranslate2 model directory and the SentencePiece model path.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # every NLLB language code is a single piece, like in the flores200 tokenizer
+    lang_codes = sorted(NLLB200Translator.LANG_MAP)
+    proto = io.BytesIO()
+    spm.SentencePieceTrainer.train(sentence_iterator=iter(CORPUS * 20), model_writer=proto,
+                                   vocab_size=len(lang_codes) + 64, user_defined_symbols=lang_codes,
+                                   hard_vocab_limit=False, minloglevel=2)
+    tokenizer_path = os.path.join(output_dir, "synthetic_spm.model")
+    with open(tokenizer_path, "wb") as f:
+        f.write(proto.getvalue())
+
+    sp = spm.SentencePieceProcessor(model_proto=proto.getvalue())
+    pieces = [sp.id_to_piece(i) for i in range(sp.get_piece_size())]
+    special = ["<s>", "<pad>", "</s>", "<unk>"]
+    vocab = special + [p for p in pieces if p not in special]
+
+    spec = specs.TransformerSpec.from_config(num_layers=(num_layers, num_layers), num_heads=2)
+    rng = np.random.default_rng(seed)
+    for name, value in spec.variables().items():
+        if value is not None:
+            continue
+        shape = _variable_shape(name, d_model, ffn_dim, len(vocab))
+        if name.endswith("gamma"):
+            value = np.ones(shape, np.float32)
+        elif name.endswith("beta"):
+            value = np.zeros(shape, np.float32)
+        else:
+            value = rng.normal(0, 0.5, shape).astype(np.float32)
+        _set_variable(spec, name, value)
+    # nudge the decoder towards </s> so outputs have a realistic length
+    bias = np.zeros(len(vocab), np.float32)
+    bias[vocab.index("</s>")] = 1.0
+    spec.decoder.projection.bias = bias
+
+    spec.register_source_vocabulary(vocab)
+    spec.register_target_vocabulary(vocab)
+    spec.validate()
+    spec.optimize(quantization="int8")
+    model_dir = os.path.join(output_dir, "synthetic_ct2")
+    os.makedirs(model_dir, exist_ok=True)
+    spec.save(model_dir)
+    return model_dir, tokenizer_path
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from synthetic_model import CORPUS
+
+
+def test_resolve_languages(benchmark, synthetic_translator):
+    benchmark(synthetic_translator._resolve_languages, "en-us", "es")
+
+
+def test_encode(benchmark, synthetic_translator):
+    benchmark(synthetic_translator._encode, CORPUS, "eng_Latn")
+
+
+def test_translate_batch(benchmark, synthetic_translator):
+    encoded = synthetic_translator._encode(CORPUS, "eng_Latn")
+    benchmark(synthetic_translator._translate_batch, encoded, [["spa_Latn"]] * len(encoded))
+
+
+def test_decode(benchmark, synthetic_translator):
+    encoded = synthetic_translator._encode(CORPUS, "eng_Latn")
+    hypotheses = synthetic_translator._translate_batch(encoded, [["spa_Latn"]] * len(encoded))
+    benchmark(synthetic_translator._decode, hypotheses, "spa_Latn")
+
+
+@pytest.mark.parametrize("batch_size", [1, 8, 32])
+def test_translate_throughput(benchmark, synthetic_translator, batch_size):
+    batch = [CORPUS[i % len(CORPUS)] for i in range(batch_size)]
+    benchmark.extra_info["batch_size"] = batch_size
+    result = benchmark(synthetic_translator.translate, batch, "es", "en")
+    assert len(result if batch_size > 1 else [result]) == batch_size
+
+
+@pytest.mark.parametrize("code", ["es", "en-us", "zh-Hant-TW", "eng_Latn"])
+def test_resolve_code_uncached(benchmark, code):
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    benchmark(NLLB200Translator.LANGUAGES._resolve, code)
+
+
+def test_available_languages(benchmark):
+    from ovos_translate_plugin_nllb import NLLB200Translator
+
+    benchmark(lambda: "es" in NLLB200Translator.available_languages)
@@ -0,0 +1,49 @@
+import asyncio
+import sys
+import unittest
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+
+class AsyncTranslateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.translator = NLLB200Translator()
+
+    def test_atranslate(self):
+        translated = asyncio.run(self.translator.atranslate("Hello World", "es", "en"))
+        self.assertEqual(translated, self.translator.translate("Hello World", "es", "en"))
+
+    def test_concurrent_coroutines(self):
+        utts = ["Hello World", "How are you?", "Set a timer for five minutes", "Good morning"]
+        expected = self.translator.translate(utts, "es", "en")
+
+        async def main():
+            return await asyncio.gather(*[self.translator.atranslate(utts[i % len(utts)], "es", "en")
+                                          for i in range(32)])
+
+        results = asyncio.run(main())
+        self.assertEqual(results, [expected[i % len(utts)] for i in range(32)])
+
+    def test_atranslate_batch(self):
+        utts = ["Hello World", "Good morning"]
+        translated = asyncio.run(self.translator.atranslate_batch(utts, "es", "en"))
+        self.assertEqual(translated, self.translator.translate(utts, "es", "en"))
+
+    def test_cancellation(self):
+        async def main():
+            task = asyncio.create_task(self.translator.atranslate("Hello World", "es", "en"))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # the translator is still usable after a cancelled call
+            return await self.translator.atranslate("Hello World", "es", "en")
+
+        self.assertEqual(asyncio.run(main()), self.translator.translate("Hello World", "es", "en"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import sys
+import unittest
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb.autotune import TUNABLE_KEYS, candidate_settings, profile_path
+
+
+class AutotuneTests(unittest.TestCase):
+    def test_candidate_settings(self):
+        candidates = candidate_settings("cpu", n_cores=8, batch_sizes=[1024])
+        splits = {(c["inter_threads"], c["intra_threads"]) for c in candidates}
+        self.assertEqual(splits, {(1, 8), (2, 4), (4, 2), (8, 1)})
+        for c in candidates:
+            self.assertEqual(set(c), set(TUNABLE_KEYS))
+            self.assertEqual(c["max_batch_size"], 1024)
+
+    def test_profile_path(self):
+        self.assertEqual(profile_path("/models/nllb-200_600M_int8/"), profile_path("nllb-200_600M_int8"))
+        self.assertTrue(profile_path("nllb-200_600M_int8").endswith("/ctranslate2/nllb-200_600M_int8.profile.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import contextvars
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb.batching import BatchScheduler
+
+
+class FakeModel:
+    """ "translates" by upper casing tokens, records every batch it receives """
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, sources, prefixes):
+        with self.lock:
+            self.batches.append(len(sources))
+        time.sleep(self.delay)
+        return [prefix + [t.upper() for t in src] for src, prefix in zip(sources, prefixes)]
+
+
+class BatchSchedulerTests(unittest.TestCase):
+    def test_results_routed_to_callers(self):
+        model = FakeModel()
+        scheduler = BatchScheduler(model, max_wait_ms=20)
+        try:
+            def call(i):
+                return scheduler.submit([f"w{i}"], [f"lang{i % 3}"]).result()
+
+            with ThreadPoolExecutor(16) as pool:
+                results = list(pool.map(call, range(64)))
+        finally:
+            scheduler.shutdown()
+        self.assertEqual(results, [[f"lang{i % 3}", f"W{i}"] for i in range(64)])
+        # concurrent requests must have been merged
+        self.assertLess(len(model.batches), 64)
+        self.assertEqual(sum(model.batches), 64)
+
+    def test_token_budget(self):
+        model = FakeModel(delay=0)
+        scheduler = BatchScheduler(model, max_wait_ms=50, max_batch_tokens=10)
+        try:
+            out = scheduler.translate([["a"] * 4] * 5, [["x"]] * 5)
+        finally:
+            scheduler.shutdown()
+        self.assertEqual(len(out), 5)
+        self.assertTrue(all(n * 4 <= 10 for n in model.batches))
+
+    def test_errors_propagate(self):
+        def broken(sources, prefixes):
+            raise RuntimeError("boom")
+
+        scheduler = BatchScheduler(broken, max_wait_ms=1)
+        try:
+            with self.assertRaises(RuntimeError):
+                scheduler.submit(["a"], ["x"]).result(timeout=5)
+        finally:
+            scheduler.shutdown()
+
+    def test_caller_context(self):
+        var = contextvars.ContextVar("caller", default=None)
+        seen = []
+
+        def model(sources, prefixes):
+            seen.append(var.get())
+            return sources
+
+        scheduler = BatchScheduler(model, max_wait_ms=1)
+        try:
+            var.set("request-1")
+            scheduler.submit(["a"], ["x"]).result(timeout=5)
+        finally:
+            scheduler.shutdown()
+        self.assertEqual(seen, ["request-1"])
+
+    def test_shutdown(self):
+        scheduler = BatchScheduler(FakeModel(delay=0))
+        scheduler.shutdown()
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(["a"], ["x"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import sqlite3
+import sys
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.cache import DiskCache, TranslationCache
+
+
+def key(text, tgt="spa_Latn"):
+    return ("nllb-200_600M_int8", "flores200_sacrebleu_tokenizer_spm", "", "eng_Latn", tgt, "default", 4, 256, 1, text)
+
+
+class TranslationCacheTests(unittest.TestCase):
+    def test_hit_miss(self):
+        cache = TranslationCache()
+        self.assertIsNone(cache.get(key("hello")))
+        cache.put(key("hello"), "hola")
+        self.assertEqual(cache.get(key("hello")), "hola")
+        # target language is part of the key
+        self.assertIsNone(cache.get(key("hello", "por_Latn")))
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 2)
+
+    def test_entry_eviction(self):
+        cache = TranslationCache(max_entries=2)
+        cache.put(key("a"), "A")
+        cache.put(key("b"), "B")
+        cache.get(key("a"))  # "b" is now least recently used
+        cache.put(key("c"), "C")
+        self.assertIsNone(cache.get(key("b")))
+        self.assertEqual(cache.get(key("a")), "A")
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_size_eviction(self):
+        cache = TranslationCache(max_bytes=10)
+        cache.put(key("aaa"), "AAA")
+        cache.put(key("bbb"), "BBB")
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.stats["bytes"], 10)
+        # entries larger than the whole budget are never stored
+        cache.put(key("c" * 20), "C")
+        self.assertIsNone(cache.get(key("c" * 20)))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = join(tmp, "cache.db")
+            cache = TranslationCache(disk=DiskCache(path))
+            cache.put(key("hello"), "hola")
+            cache.disk.close()
+
+            # simulate a restart
+            cache = TranslationCache(disk=DiskCache(path))
+            self.assertEqual(cache.get(key("hello")), "hola")
+            self.assertEqual(cache.stats["disk_hits"], 1)
+            self.assertEqual(len(cache), 1)
+            cache.clear()
+            self.assertEqual(len(cache.disk), 0)
+            cache.disk.close()
+
+    def test_disk_entry_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = DiskCache(join(tmp, "cache.db"), max_entries=2)
+            disk.put(key("a"), "A")
+            disk.put(key("b"), "B")
+            disk.get(key("a"))  # "b" is now least recently used
+            disk.put(key("c"), "C")
+            self.assertIsNone(disk.get(key("b")))
+            self.assertEqual(disk.get(key("a")), "A")
+            self.assertEqual(disk.get(key("c")), "C")
+            self.assertEqual(len(disk), 2)
+            self.assertEqual(disk.evictions, 1)
+            disk.close()
+
+    def test_disk_deferred_touch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = join(tmp, "cache.db")
+            disk = DiskCache(path)
+            disk.put(key("a"), "A")
+
+            def last_used():
+                db = sqlite3.connect(path)
+                try:
+                    return db.execute("SELECT last_used FROM translations").fetchone()[0]
+                finally:
+                    db.close()
+
+            stored = last_used()
+            # hits are not written one by one
+            self.assertEqual(disk.get(key("a")), "A")
+            self.assertEqual(last_used(), stored)
+            disk.close()
+            self.assertGreater(last_used(), stored)
+
+    def test_disk_size_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # a row is the 64 character key hash plus the translation
+            disk = DiskCache(join(tmp, "cache.db"), max_bytes=3 * 74)
+            for text in "abcd":
+                disk.put(key(text), text * 10)
+            self.assertEqual(len(disk), 3)
+            self.assertLessEqual(disk.n_bytes, 3 * 74)
+            self.assertIsNone(disk.get(key("a")))
+            # replacing a row does not count it twice
+            disk.put(key("d"), "d" * 10)
+            self.assertEqual(len(disk), 3)
+            disk.close()
+
+            # lower limits apply to an existing database
+            disk = DiskCache(join(tmp, "cache.db"), max_entries=1)
+            self.assertEqual(len(disk), 1)
+            self.assertEqual(disk.get(key("d")), "d" * 10)
+            disk.close()
+
+    def test_disk_migration(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = join(tmp, "cache.db")
+            db = sqlite3.connect(path)
+            db.execute("CREATE TABLE translations (key TEXT PRIMARY KEY, translation TEXT NOT NULL)")
+            db.execute("INSERT INTO translations VALUES (?, ?)", (DiskCache._hash(key("hello")), "hola"))
+            db.commit()
+            db.close()
+            disk = DiskCache(path)
+            self.assertEqual(disk.get(key("hello")), "hola")
+            self.assertEqual(disk.n_bytes, 68)
+            disk.close()
+
+
+class TranslatorCacheKeyTests(unittest.TestCase):
+    def test_no_model_load(self):
+        tx = NLLB200Translator(config={"lazy_load": True, "cache": True})
+        tx.cache.put(tx._cache_key("hello", "eng_Latn", "spa_Latn"), "hola")
+        # served from the cache, the model is never loaded
+        self.assertEqual(tx.translate("hello", "es", "en"), "hola")
+        self.assertFalse(tx.is_loaded)
+        self.assertIsNone(tx._translator)
+
+    def test_decoding_options(self):
+        keys = {NLLB200Translator(config={"lazy_load": True, **config})._cache_key("hello", "eng_Latn", "spa_Latn")
+                for config in ({}, {"beam_size": 2}, {"max_decoding_length": 16}, {"length_penalty": 0.5},
+                               {"compute_type": "int8"}, {"model": "nllb-200_1.3B_int8"},
+                               {"tokenizer": "other_spm"}, {"vmap_languages": ["es", "pt"]})}
+        self.assertEqual(len(keys), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+from unittest import mock
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.cascade import NLLBCascade, expected_size_mb, model_size_mb
+
+
+def fake_model(path, size_mb):
+    os.makedirs(path)
+    with open(join(path, "model.bin"), "wb") as f:
+        f.write(b"\0" * int(size_mb * 1024 * 1024))
+    return path
+
+
+class CascadeRoutingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.models = [fake_model(join(self.tmp.name, name), size)
+                       for name, size in (("small", 1), ("medium", 2), ("large", 3))]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cascade(self, **kwargs):
+        # lazy_load, the fake models are never loaded
+        return NLLBCascade(config={"lazy_load": True}, models=self.models, **kwargs)
+
+    def test_memory_budget(self):
+        self.assertAlmostEqual(model_size_mb(self.models[1]), 2)
+        self.assertEqual(len(self.cascade(memory_budget_mb=100).tiers), 3)
+        cascade = self.cascade(memory_budget_mb=3.5)
+        self.assertEqual(cascade.models, self.models[:2])
+        # the smallest model is always loaded
+        self.assertEqual(self.cascade(memory_budget_mb=0.5).models, self.models[:1])
+
+    def test_over_budget_not_downloaded(self):
+        download = NLLB200Translator.download
+        with mock.patch.object(NLLB200Translator, "download", side_effect=download) as fetch, \
+                mock.patch("requests.head", side_effect=AssertionError("network access")), \
+                mock.patch("requests.get", side_effect=AssertionError("network access")), \
+                mock.patch("huggingface_hub.snapshot_download", side_effect=AssertionError("network access")):
+            cascade = NLLBCascade(config={"lazy_load": True}, memory_budget_mb=100,
+                                  models=[self.models[0], "nllb-200-3.3B-ct2-int8"])
+        self.assertEqual(cascade.models, self.models[:1])
+        self.assertEqual([c.args[0] for c in fetch.call_args_list], self.models[:1])
+
+    def test_expected_size(self):
+        self.assertAlmostEqual(expected_size_mb(self.models[2]), 3)
+        self.assertGreater(expected_size_mb("nllb-200-3.3B-ct2-int8"), 3000)
+        with mock.patch("requests.head") as head:
+            head.return_value.headers = {"Content-Length": str(5 * 1024 * 1024)}
+            self.assertEqual(expected_size_mb("https://example.com/nllb-custom.zip"), 5)
+
+    def test_language_pairs(self):
+        cascade = self.cascade(low_resource=["fur"])
+        self.assertEqual(cascade.route(10, "eng_Latn", "spa_Latn"), (0, False))
+        self.assertEqual(cascade.route(10, "eng_Latn", "fur_Latn"), (2, False))
+        # neither list, the middle model
+        self.assertEqual(cascade.route(10, "eng_Latn", "gle_Latn"), (1, False))
+        cascade = self.cascade(high_resource=["en"], default_model=2)
+        self.assertEqual(cascade.route(10, "eng_Latn", "spa_Latn"), (2, False))
+
+    def test_saturation(self):
+        cascade = self.cascade(low_resource=["fur"], max_in_flight=2)
+        cascade.tiers[2].in_flight = 2
+        self.assertEqual(cascade.route(10, "eng_Latn", "fur_Latn"), (1, True))
+        cascade.tiers[1].in_flight = 2
+        cascade.tiers[0].in_flight = 2
+        # nothing smaller left
+        self.assertEqual(cascade.route(10, "eng_Latn", "fur_Latn"), (0, True))
+
+    def test_deadline(self):
+        cascade = self.cascade(low_resource=["fur"])
+        cascade.tiers[2].seconds_per_token = 0.01
+        cascade.tiers[1].seconds_per_token = 0.002
+        self.assertEqual(cascade.route(10, "eng_Latn", "fur_Latn", deadline=0.5), (2, False))
+        # 100 tokens take about 1s on the large model, 0.2s on the medium one
+        self.assertEqual(cascade.route(100, "eng_Latn", "fur_Latn", deadline=0.5), (1, True))
+        self.assertEqual(cascade.route(1000, "eng_Latn", "fur_Latn", deadline=0.5), (0, True))
+        self.assertEqual(cascade.route(1000, "eng_Latn", "fur_Latn"), (2, False))
+
+
+class CascadeTranslateTests(unittest.TestCase):
+    def test_translate(self):
+        cascade = NLLBCascade(models=["nllb-200_600M_int8"], memory_budget_mb=8192,
+                              low_resource=["fur"])
+        self.assertEqual(cascade.translate("hello world", "es", "en"), "hola mundo")
+        cascade.translate(["hello world", "good morning"], "fur", "en", deadline_ms=10000)
+        stats = cascade.stats
+        self.assertEqual(stats["nllb-200_600M_int8"]["requests"], 2)
+        self.assertEqual(stats["nllb-200_600M_int8"]["sentences"], 3)
+        self.assertGreater(stats["nllb-200_600M_int8"]["ms_per_token"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import sys
+import unittest
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.document import DocumentTranslator, bucket_by_length, iter_paragraphs, split_sentences
+
+DOCUMENT = """The weather today is sunny. Tomorrow it will rain!
+Dr. Smith said it would be cold.
+
+  Good morning.
+
+
+Bye.
+"""
+
+
+class DocumentHelpersTests(unittest.TestCase):
+    def test_split_sentences(self):
+        text = "Hello there. How are you? Mr. Smith said \"hi.\" Use e.g. this one.\nNext line"
+        sentences = split_sentences(text)
+        self.assertEqual([s for s, _ in sentences],
+                         ["Hello there.", "How are you?", "Mr. Smith said \"hi.\"", "Use e.g. this one.", "Next line"])
+        self.assertEqual("".join(s + ws for s, ws in sentences), text)
+
+    def test_split_cjk(self):
+        self.assertEqual(split_sentences("你好。今天很好！"), [("你好。", ""), ("今天很好！", "")])
+
+    def test_iter_paragraphs(self):
+        paragraphs = list(iter_paragraphs(io.StringIO(DOCUMENT)))
+        self.assertEqual(len(paragraphs), 3)
+        self.assertEqual(paragraphs[1], ("  Good morning.\n", "\n\n"))
+        self.assertEqual("".join(p + sep for p, sep in paragraphs), DOCUMENT)
+
+    def test_iter_paragraphs_max_chars(self):
+        text = "".join(f"Line number {i}.\n" for i in range(100)) + "\nLast.\n"
+        paragraphs = list(iter_paragraphs(text, max_chars=100))
+        # cut at line breaks once 100 characters are buffered
+        self.assertGreater(len(paragraphs), 10)
+        self.assertTrue(all(len(p) < 120 and p.endswith("\n") for p, _ in paragraphs))
+        self.assertEqual("".join(p + sep for p, sep in paragraphs), text)
+
+    def test_bucket_by_length(self):
+        lengths = [5, 100, 3, 50, 7]
+        batches = bucket_by_length(lengths, 120)
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(5)))
+        for batch in batches:
+            self.assertLessEqual(max(lengths[i] for i in batch) * len(batch), 120)
+        self.assertEqual(batches[0], [2, 0, 4])
+
+
+class DocumentTranslateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.translator = NLLB200Translator()
+
+    def test_structure_preserved(self):
+        paragraphs = list(self.translator.translate_document(DOCUMENT, "es", "en"))
+        self.assertEqual(len(paragraphs), 3)
+        self.assertTrue(paragraphs[1].startswith("  "))
+        self.assertTrue(paragraphs[1].endswith("\n\n\n"))
+        self.assertEqual(paragraphs[0].count("\n"), 3)
+
+    def test_from_lines(self):
+        lines = iter(DOCUMENT.splitlines(keepends=True))
+        self.assertEqual("".join(self.translator.translate_document(lines, "es", "en")),
+                         "".join(self.translator.translate_document(DOCUMENT, "es", "en")))
+
+    def test_no_blank_lines(self):
+        read = []
+
+        def lines():
+            for i in range(2000):
+                read.append(i)
+                yield f"Hello world number {i}.\n"
+
+        translated = DocumentTranslator(self.translator, window_tokens=64).translate(lines(), "es", "en")
+        first = next(translated)
+        # translated window by window, not after reading the whole input
+        self.assertTrue(first.endswith("\n"))
+        self.assertLess(len(read), 100)
+        rest = "".join(translated)
+        self.assertEqual((first + rest).count("\n"), 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+import hashlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join, realpath
+from unittest import mock
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import download
+from ovos_translate_plugin_nllb.download import ChecksumError, download_file, install_archive, stream_unzip, unzip
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """ serves `server.files`, honoring single range requests like the model hosts do """
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self):
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return None
+        start, end = 0, len(data) - 1
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match and self.server.ranges:
+            start = int(match.group(1))
+            end = int(match.group(2) or end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return data[start:end + 1]
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("Range"))
+        body = self._send_headers()
+        if body is None:
+            return
+        if self.server.drop_after is not None:
+            # simulate a dropped connection
+            body, self.server.drop_after = body[:self.server.drop_after], None
+        self.wfile.write(body)
+
+
+class LocalServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.files = {}
+        self.server.requests = []
+        self.server.ranges = True
+        self.server.drop_after = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def serve(self, name, data):
+        self.server.files[f"/{name}"] = data
+        return f"http://127.0.0.1:{self.server.server_port}/{name}"
+
+
+class DownloadFileTests(LocalServerTests):
+    def test_parallel_ranges(self):
+        data = os.urandom(100_000)
+        url = self.serve("model.bin", data)
+        with mock.patch.object(download, "MIN_PART_SIZE", 10_000):
+            path = download_file(url, join(self.dir, "model.bin"), connections=4)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertTrue(all(r.startswith("bytes=") for r in self.server.requests))
+        self.assertEqual(os.listdir(self.dir), ["model.bin"])
+
+    def test_resume(self):
+        data = os.urandom(50_000)
+        url = self.serve("model.bin", data)
+        target = join(self.dir, "model.bin")
+        self.server.drop_after = 20_000
+        with self.assertRaises(Exception):
+            download_file(url, target, chunk_size=4096, retries=0)
+        self.assertFalse(os.path.exists(target))
+        self.assertTrue(os.path.isfile(f"{target}.part.json"))
+
+        download_file(url, target)
+        with open(target, "rb") as f:
+            self.assertEqual(f.read(), data)
+        # the second attempt only asked for the missing bytes, minus the chunk cut by the dropped connection
+        start, end = map(int, re.fullmatch(r"bytes=(\d+)-(\d+)", self.server.requests[-1]).groups())
+        self.assertGreater(start, 20_000 - 4096)
+        self.assertEqual(end, 49_999)
+        self.assertFalse(os.path.exists(f"{target}.part.json"))
+
+    def test_checksum(self):
+        data = b"tokenizer" * 1000
+        url = self.serve("spm.model", data)
+        target = join(self.dir, "spm.model")
+        with self.assertRaises(ChecksumError):
+            download_file(url, target, sha256="0" * 64)
+        self.assertEqual(os.listdir(self.dir), [])
+        download_file(url, target, sha256=hashlib.sha256(data).hexdigest())
+        self.assertTrue(os.path.isfile(target))
+
+    def test_no_range_support(self):
+        data = os.urandom(30_000)
+        url = self.serve("model.bin", data)
+        self.server.ranges = False
+        path = download_file(url, join(self.dir, "model.bin"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(self.server.requests, [None])
+
+
+def make_zip(compression=zipfile.ZIP_DEFLATED, seekable=True):
+    files = {"nllb/model.bin": os.urandom(40_000),
+             "nllb/config.json": b'{"add_source_bos": false}',
+             "nllb/shared_vocabulary.txt": b"<s>\n</s>\n" * 500}
+    buf = io.BytesIO()
+
+    class Unseekable(io.RawIOBase):
+        def writable(self):
+            return True
+
+        def write(self, b):
+            return buf.write(b)
+
+    with zipfile.ZipFile(buf if seekable else Unseekable(), "w", compression) as z:
+        z.writestr("nllb/", b"")
+        for name, data in files.items():
+            z.writestr(name, data)
+    return buf.getvalue(), files
+
+
+class StreamUnzipTests(unittest.TestCase):
+    def check(self, archive, files):
+        with tempfile.TemporaryDirectory() as d:
+            stream_unzip(io.BytesIO(archive), d, chunk_size=4096)
+            for name, data in files.items():
+                with open(join(d, name), "rb") as f:
+                    self.assertEqual(f.read(), data)
+
+    def test_deflated(self):
+        self.check(*make_zip())
+
+    def test_stored(self):
+        self.check(*make_zip(zipfile.ZIP_STORED))
+
+    def test_data_descriptors(self):
+        # archives written to a pipe have no sizes in the local headers
+        self.check(*make_zip(seekable=False))
+
+    def test_corrupt(self):
+        archive, _ = make_zip(zipfile.ZIP_STORED)
+        pos = archive.index(b"<s>\n</s>")
+        corrupt = archive[:pos] + b"X" + archive[pos + 1:]
+        with tempfile.TemporaryDirectory() as d, self.assertRaises(ChecksumError):
+            stream_unzip(io.BytesIO(corrupt), d)
+
+    def test_path_traversal(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as z:
+            z.writestr("../evil.txt", b"x")
+        with tempfile.TemporaryDirectory() as d, self.assertRaises(ValueError):
+            stream_unzip(io.BytesIO(buf.getvalue()), d)
+
+
+class InstallArchiveTests(LocalServerTests):
+    def check_installed(self, files):
+        dest = join(self.dir, "nllb-test")
+        for name, data in files.items():
+            with open(join(dest, name.split("/", 1)[1]), "rb") as f:
+                self.assertEqual(f.read(), data)
+        # no archive, staging folder or download state left behind
+        self.assertEqual(sorted(f for f in os.listdir(self.dir) if not f.endswith(".lock")), ["nllb-test"])
+
+    def test_resumable(self):
+        archive, files = make_zip()
+        url = self.serve("nllb-test.zip", archive)
+        install_archive(url, join(self.dir, "nllb-test"), stream=False,
+                        sha256=hashlib.sha256(archive).hexdigest())
+        self.check_installed(files)
+
+    def test_existing_archive(self):
+        archive, files = make_zip()
+        url = self.serve("nllb-test.zip", archive)
+        sha256 = hashlib.sha256(archive).hexdigest()
+        # a complete archive from an earlier run is used as is
+        with open(join(self.dir, "nllb-test.zip"), "wb") as f:
+            f.write(archive)
+        install_archive(url, join(self.dir, "nllb-test"), stream=False, sha256=sha256)
+        self.check_installed(files)
+        self.assertEqual(self.server.requests, [])
+
+    def test_existing_archive_corrupt(self):
+        archive, files = make_zip()
+        url = self.serve("nllb-test.zip", archive)
+        # same size, different content, downloaded again instead of extracted
+        with open(join(self.dir, "nllb-test.zip"), "wb") as f:
+            f.write(b"\0" * len(archive))
+        install_archive(url, join(self.dir, "nllb-test"), stream=False, sha256=hashlib.sha256(archive).hexdigest())
+        self.check_installed(files)
+        self.assertTrue(self.server.requests)
+
+    def test_stored_data_descriptors(self):
+        # stored members without sizes in the local headers can only be read from the central directory
+        archive, files = make_zip(zipfile.ZIP_STORED, seekable=False)
+        self.assertTrue(all(info.flag_bits & 0x08 for info in zipfile.ZipFile(io.BytesIO(archive)).infolist()))
+        url = self.serve("nllb-test.zip", archive)
+        install_archive(url, join(self.dir, "nllb-test"), stream=False,
+                        sha256=hashlib.sha256(archive).hexdigest())
+        self.check_installed(files)
+
+    def test_unzip_path_traversal(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as z:
+            z.writestr("../evil.txt", b"x")
+        archive = join(self.dir, "evil.zip")
+        with open(archive, "wb") as f:
+            f.write(buf.getvalue())
+        with self.assertRaises(ValueError):
+            unzip(archive, join(self.dir, "out"))
+        self.assertFalse(os.path.exists(join(self.dir, "evil.txt")))
+
+    def test_streaming(self):
+        archive, files = make_zip()
+        url = self.serve("nllb-test.zip", archive)
+        install_archive(url, join(self.dir, "nllb-test"), stream=True,
+                        sha256=hashlib.sha256(archive).hexdigest())
+        self.check_installed(files)
+
+    def test_streaming_checksum(self):
+        archive, _ = make_zip()
+        url = self.serve("nllb-test.zip", archive)
+        with self.assertRaises(ChecksumError):
+            install_archive(url, join(self.dir, "nllb-test"), stream=True, sha256="0" * 64)
+        self.assertFalse(os.path.exists(join(self.dir, "nllb-test")))
+        self.assertFalse(os.path.exists(join(self.dir, ".nllb-test.installing")))
+
+    def test_concurrent_installs(self):
+        archive, files = make_zip()
+        url = self.serve("nllb-test.zip", archive)
+        threads = [threading.Thread(target=install_archive, args=(url, join(self.dir, "nllb-test")))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.check_installed(files)
+        # only the first installer downloaded the archive
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
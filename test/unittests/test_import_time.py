@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+import unittest
+from os.path import dirname, realpath
+
+ROOT = dirname(dirname(dirname(realpath(__file__))))
+# loaded when a model is loaded or downloaded, never by plugin discovery
+HEAVY_MODULES = ("ctranslate2", "sentencepiece", "huggingface_hub", "requests")
+# the package alone, ovos-plugin-manager is imported first and not counted
+MAX_IMPORT_MS = 60
+MAX_IMPORT_RSS_MB = 10
+
+SCRIPT = f"""
+import json, resource, sys
+sys.path.insert(0, {ROOT!r})
+import ovos_plugin_manager.templates.language
+before = set(sys.modules)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+from ovos_translate_plugin_nllb import NLLB200Translator
+languages = NLLB200Translator.available_languages
+print(json.dumps({{"modules": sorted(set(sys.modules) - before), "languages": len(languages),
+                  "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024}}))
+"""
+
+
+def import_package():
+    """ (modules imported by the package, number of languages, RSS growth in MB, import time in ms) """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", SCRIPT],
+                            capture_output=True, text=True, check=True)
+    # "import time: self [us] | cumulative | imported package", the package line comes after its imports
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == "ovos_translate_plugin_nllb":
+            cumulative_us = int(parts[1])
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["modules"], report["languages"], report["rss_mb"], cumulative_us / 1000
+
+
+class ImportTimeTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.modules, cls.languages, cls.rss_mb, cls.import_ms = import_package()
+
+    def test_no_heavy_imports(self):
+        heavy = [m for m in self.modules if m.split(".")[0] in HEAVY_MODULES]
+        self.assertEqual(heavy, [])
+        # the plugin manager only needs the class and its languages
+        self.assertGreater(self.languages, 150)
+
+    def test_import_time(self):
+        self.assertGreater(self.import_ms, 0)
+        self.assertLess(self.import_ms, MAX_IMPORT_MS)
+
+    def test_import_rss(self):
+        self.assertLess(self.rss_mb, MAX_IMPORT_RSS_MB)
+
+
+if __name__ == '__main__':
+    unittest.main()
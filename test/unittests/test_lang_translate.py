@@ -1,5 +1,6 @@
 import sys
 import unittest
+from unittest import mock
 from os.path import dirname, realpath
 
 sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
@@ -18,6 +19,43 @@ class LangTranslateTests(unittest.TestCase):
         translated = self.translator.translate("Hello World", "es-es", "en-us")
         self.assertEqual(translated.lower(), "hola mundo")
 
+    def test_translate_many(self):
+        items = [("Hello World", "en", "es"),
+                 ("Hola Mundo", "es", "en"),
+                 ("Hello World", "en-us", "pt-pt")]
+        translated = self.translator.translate_many(items)
+        self.assertEqual(len(translated), 3)
+        self.assertEqual(translated[0].lower(), "hola mundo")
+        self.assertEqual(translated[1].lower(), "hello world")
+        for tx, (utt, source, target) in zip(translated, items):
+            self.assertEqual(tx, self.translator.translate(utt, target, source))
+
+    def test_translate_to_many(self):
+        targets = ["es", "pt-pt", "fr"]
+        translated = self.translator.translate_to_many("Hello World", targets, "en")
+        self.assertEqual(list(translated), targets)
+        self.assertEqual(translated["es"].lower(), "hola mundo")
+        for target in targets:
+            self.assertEqual(translated[target], self.translator.translate("Hello World", target, "en"))
+
+    def test_translate_sorted_dedup(self):
+        long_sentence = "The weather today is sunny with a high of twenty degrees and a light breeze from the west"
+        utts = ["Hello World", long_sentence, "Hello  World", "Good morning", "Hello World"]
+        with mock.patch.object(self.translator, "_encode", wraps=self.translator._encode) as encode, \
+                mock.patch.object(self.translator, "_translate_batch",
+                                  wraps=self.translator._translate_batch) as translate_batch:
+            translated = self.translator.translate(utts, "es", "en")
+        # duplicates are only subworded and translated once
+        self.assertEqual(len(encode.call_args.args[0]), 3)
+        # a single model call, CTranslate2 splits it over its replicas
+        self.assertEqual(translate_batch.call_count, 1)
+        self.assertEqual(len(translated), 5)
+        self.assertEqual(translated[0].lower(), "hola mundo")
+        self.assertEqual(translated[0], translated[2])
+        self.assertEqual(translated[0], translated[4])
+        self.assertEqual(translated[1], self.translator.translate(long_sentence, "es", "en"))
+        self.assertEqual(translated[3], self.translator.translate("Good morning", "es", "en"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import unittest
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.languages import LanguageResolver, normalize_tag
+
+
+class LanguageResolverTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.resolver = LanguageResolver(NLLB200Translator.LANG_MAP)
+
+    def test_normalize(self):
+        self.assertEqual(normalize_tag("en"), ("en", None, None))
+        self.assertEqual(normalize_tag("EN_us"), ("en", None, "US"))
+        self.assertEqual(normalize_tag("zh-hant-tw"), ("zh", "Hant", "TW"))
+        self.assertEqual(normalize_tag("es-419"), ("es", None, "419"))
+        self.assertEqual(normalize_tag("sr-Latn-RS-x-private"), ("sr", "Latn", "RS"))
+
+    def test_case_and_separators(self):
+        for code in ["en", "en-us", "en-US", "en_us", "EN-us", "eng", "eng_Latn", "eng-latn"]:
+            self.assertEqual(self.resolver.resolve(code), "eng_Latn", code)
+
+    def test_chinese_scripts(self):
+        self.assertEqual(self.resolver.resolve("zh"), "zho_Hans")
+        self.assertEqual(self.resolver.resolve("zh-CN"), "zho_Hans")
+        self.assertEqual(self.resolver.resolve("zh-Hans"), "zho_Hans")
+        self.assertEqual(self.resolver.resolve("zh-TW"), "zho_Hant")
+        self.assertEqual(self.resolver.resolve("zh-HK"), "zho_Hant")
+        self.assertEqual(self.resolver.resolve("zh-Hant"), "zho_Hant")
+        # an explicit script wins over the region
+        self.assertEqual(self.resolver.resolve("zh-Hans-TW"), "zho_Hans")
+
+    def test_script_variants(self):
+        self.assertEqual(self.resolver.resolve("taq"), "taq_Latn")
+        self.assertEqual(self.resolver.resolve("taq-Tfng"), "taq_Tfng")
+        self.assertEqual(self.resolver.resolve("bjn"), "bjn_Latn")
+        self.assertEqual(self.resolver.resolve("bjn-Arab"), "bjn_Arab")
+        self.assertEqual(self.resolver.resolve("ace-Arab"), "ace_Arab")
+        # NLLB only has Cyrillic serbian
+        self.assertEqual(self.resolver.resolve("sr-Latn"), "srp_Cyrl")
+
+    def test_unsupported(self):
+        self.assertIsNone(self.resolver.resolve("xx"))
+        self.assertIsNone(self.resolver.resolve(""))
+
+    def test_translator(self):
+        tx = NLLB200Translator(config={"lazy_load": True})
+        self.assertEqual(tx._resolve_languages("en-us", "zh-TW"), ("eng_Latn", "zho_Hant"))
+        with self.assertRaises(ValueError):
+            tx._resolve_languages("en", "xx")
+        self.assertIsInstance(NLLB200Translator.available_languages, frozenset)
+        self.assertIn("zh", tx.supported_translations("en"))
+
+
+if __name__ == '__main__':
+    unittest.main()
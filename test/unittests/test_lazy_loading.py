@@ -0,0 +1,45 @@
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+
+class LazyLoadingTests(unittest.TestCase):
+    def test_lazy_load(self):
+        tx = NLLB200Translator(config={"lazy_load": True})
+        self.assertFalse(tx.ready)
+        self.assertIsNone(tx._translator)
+        translated = tx.translate("Hello World", "es", "en")
+        self.assertTrue(tx.ready)
+        self.assertEqual(translated.lower(), "hola mundo")
+
+    def test_background_load(self):
+        tx = NLLB200Translator(config={"background_load": True})
+        # calls made during warm up wait for it instead of failing
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: tx.translate("Hello World", "es", "en"), range(4)))
+        self.assertTrue(tx.wait_until_ready(timeout=0))
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(results[0].lower(), "hola mundo")
+
+    def test_not_ready_during_warmup(self):
+        tx = NLLB200Translator(config={"lazy_load": True, "warmup": True})
+        translate_batch = tx._translate_batch
+        seen = []
+
+        def warmup(*args, **kwargs):
+            seen.append(tx.ready)
+            return translate_batch(*args, **kwargs)
+
+        tx._translate_batch = warmup
+        tx.load()
+        # only the end of the load marks the model ready
+        self.assertEqual(seen, [False])
+        self.assertTrue(tx.ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+from unittest import mock
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+import ovos_translate_plugin_nllb
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.manifest import check_manifest, load_manifest, manifest_path, write_manifest
+
+
+def make_model(path):
+    os.makedirs(path, exist_ok=True)
+    for name, data in {"model.bin": b"\0" * 1000, "config.json": b"{}", "shared_vocabulary.json": b"[]"}.items():
+        with open(join(path, name), "wb") as f:
+            f.write(data)
+    return path
+
+
+class ManifestTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {"XDG_DATA_HOME": self.tmp.name})
+        self.env.start()
+        self.base = join(self.tmp.name, "ctranslate2")
+        # any network access is a test failure
+        self.no_network = mock.patch("requests.get", side_effect=AssertionError("network used"))
+        self.no_network.start()
+
+    def tearDown(self):
+        self.no_network.stop()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_write_and_check(self):
+        path = make_model(join(self.base, "nllb-test"))
+        write_manifest("nllb-test", path, source="http://example.com/nllb-test.zip")
+        manifest = load_manifest("nllb-test")
+        self.assertEqual(manifest_path("nllb-test"), join(self.base, "nllb-test.manifest.json"))
+        self.assertEqual(sorted(manifest["files"]), ["config.json", "model.bin", "shared_vocabulary.json"])
+        self.assertEqual(manifest["files"]["model.bin"]["size"], 1000)
+        self.assertTrue(check_manifest(manifest))
+        self.assertTrue(check_manifest(manifest, full=True))
+
+    def test_detects_damage(self):
+        path = make_model(join(self.base, "nllb-test"))
+        manifest = write_manifest("nllb-test", path)
+        with open(join(path, "model.bin"), "r+b") as f:
+            f.write(b"\1")
+        # same size, only a full check reads the content
+        self.assertTrue(check_manifest(manifest))
+        self.assertFalse(check_manifest(manifest, full=True))
+        os.truncate(join(path, "model.bin"), 10)
+        self.assertFalse(check_manifest(manifest))
+        os.remove(join(path, "config.json"))
+        self.assertFalse(check_manifest(manifest))
+
+    def test_startup_without_network(self):
+        path = make_model(join(self.base, "nllb-200_600M_int8"))
+        # installed before manifests existed, the manifest is created from the files on disk
+        self.assertEqual(NLLB200Translator.download("nllb-200_600M_int8"), path)
+        self.assertIsNotNone(load_manifest("nllb-200_600M_int8"))
+        with mock.patch.object(ovos_translate_plugin_nllb, "install_archive") as install:
+            self.assertEqual(NLLB200Translator.download("nllb-200_600M_int8", verify=True), path)
+            install.assert_not_called()
+
+    def test_reinstall_damaged(self):
+        path = make_model(join(self.base, "nllb-200_600M_int8"))
+        NLLB200Translator.download("nllb-200_600M_int8")
+        os.truncate(join(path, "model.bin"), 10)
+        with self.assertRaises(FileNotFoundError):
+            NLLB200Translator.download("nllb-200_600M_int8", offline=True)
+        with mock.patch.object(ovos_translate_plugin_nllb, "install_archive",
+                               side_effect=lambda url, dest, **kwargs: make_model(dest)) as install:
+            NLLB200Translator.download("nllb-200_600M_int8")
+            install.assert_called_once()
+        self.assertTrue(check_manifest(load_manifest("nllb-200_600M_int8"), full=True))
+
+    def test_offline(self):
+        with self.assertRaises(FileNotFoundError):
+            NLLB200Translator.download("nllb-200_600M_int8", offline=True)
+        with self.assertRaises(FileNotFoundError):
+            NLLB200Translator.download_tokenizer(offline=True)
+
+    def test_huggingface(self):
+        snapshot = make_model(join(self.tmp.name, "hf", "snapshot"))
+        name = "nllb-200-distilled-1.3B-ct2-int8"
+        # imported when a model is downloaded
+        with mock.patch("huggingface_hub.snapshot_download", return_value=snapshot) as dl:
+            self.assertEqual(NLLB200Translator.download(name), snapshot)
+            dl.assert_called_once()
+            self.assertEqual(dl.call_args.kwargs["repo_id"], "OpenNMT/nllb-200-distilled-1.3B-ct2-int8")
+            self.assertIn("model.bin", dl.call_args.kwargs["allow_patterns"])
+            # resolved from the manifest, no hub round trips
+            self.assertEqual(NLLB200Translator.download(name), snapshot)
+            dl.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
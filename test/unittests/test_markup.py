@@ -0,0 +1,77 @@
+import sys
+import unittest
+from os.path import dirname, realpath
+from unittest import mock
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.markup import escape, split_markup, unescape
+
+HTML = ('<p class="intro">Hello <b>world</b> &amp; friends&nbsp;!</p>\n'
+        '<script>if (a<b) x = "</p>";</script><code>print(x)</code>'
+        '<span translate="no">OpenVoiceOS</span><br><img alt="logo" src="a.png">Goodbye')
+SSML = ('<speak xml:lang="en-US"><p>Good morning.</p>'
+        '<say-as interpret-as="characters">ABC</say-as> <break time="1s"/>See you later</speak>')
+MARKDOWN = "# Weather\n\n- Today is **sunny**\n- [Forecast](https://example.com/a_b) for `tomorrow`\n\n```\nno translation\n```\n"
+
+
+def text_nodes(payload, markup):
+    return [piece.strip() for piece, translatable in split_markup(payload, markup)
+            if translatable and piece.strip()]
+
+
+class MarkupSplitTests(unittest.TestCase):
+    def test_round_trip(self):
+        for payload, markup in ((HTML, "html"), (SSML, "ssml"), (MARKDOWN, "markdown")):
+            self.assertEqual("".join(piece for piece, _ in split_markup(payload, markup)), payload)
+
+    def test_html(self):
+        # script, code and translate="no" content is skipped, "<b" inside the script is not a tag
+        self.assertEqual(text_nodes(HTML, "html"), ["Hello", "world", "&amp; friends&nbsp;!", "Goodbye"])
+
+    def test_ssml(self):
+        self.assertEqual(text_nodes(SSML, "ssml"), ["Good morning.", "See you later"])
+
+    def test_markdown(self):
+        self.assertEqual(text_nodes(MARKDOWN, "markdown"),
+                         ["Weather", "Today is", "sunny", "Forecast", "for"])
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            split_markup("text", "rtf")
+
+    def test_entities(self):
+        text, entities = unescape("Tom &amp; Jerry&nbsp;&#169;")
+        self.assertEqual(text, "Tom & Jerry\xa0©")
+        self.assertEqual(escape("Tom & Jerry\xa0© <3", entities), "Tom &amp; Jerry&nbsp;&#169; &lt;3")
+        # markdown does not need "<" escaped
+        self.assertEqual(escape("a < b", {}, escape_markup=False), "a < b")
+
+
+class MarkupTranslateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.translator = NLLB200Translator()
+
+    def test_single_batch(self):
+        payloads = ["<p>hello world</p>", "<div><b>hello world</b> <i>good morning</i></div>"]
+        with mock.patch.object(self.translator, "_translate_sentences",
+                               wraps=self.translator._translate_sentences) as translate:
+            translated = self.translator.translate_markup(payloads, "es", "en")
+        self.assertEqual(translate.call_count, 1)
+        self.assertEqual(translated[0], "<p>hola mundo</p>")
+        self.assertTrue(translated[1].startswith("<div><b>hola mundo</b> <i>"))
+        self.assertTrue(translated[1].endswith("</i></div>"))
+
+    def test_markup_kept(self):
+        translated = self.translator.translate_markup(HTML, "es", "en")
+        for markup in ('<p class="intro">', "<b>", "</b>", '<script>if (a<b) x = "</p>";</script>',
+                       "<code>print(x)</code>", '<span translate="no">OpenVoiceOS</span>',
+                       '<br><img alt="logo" src="a.png">'):
+            self.assertIn(markup, translated)
+        translated = self.translator.translate_markup(SSML, "es", "en", markup="ssml")
+        self.assertIn('<say-as interpret-as="characters">ABC</say-as> <break time="1s"/>', translated)
+
+
+if __name__ == '__main__':
+    unittest.main()
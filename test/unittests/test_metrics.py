@@ -0,0 +1,98 @@
+import socket
+import sys
+import unittest
+import urllib.request
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.metrics import STAGES, Metrics
+
+
+class MetricsTests(unittest.TestCase):
+    def test_call_record(self):
+        metrics = Metrics()
+        records = []
+        metrics.add_callback(records.append)
+        with metrics.call("translate"):
+            with metrics.span("encode"):
+                pass
+            with metrics.call("nested"):
+                metrics.add_span("translate_batch", 0.5)
+                metrics.add_batch(2, 10, 20)
+        # spans outside of a call are still counted
+        metrics.add_span("encode", 0.1)
+
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record["call"], "translate")
+        self.assertEqual(set(record["spans"]), {"encode", "translate_batch"})
+        self.assertEqual(record["batch_sizes"], [2])
+        self.assertEqual(record["output_tokens"], 20)
+        self.assertEqual(record["tokens_per_second"], 40)
+        self.assertEqual(metrics.counts["encode"], 2)
+
+    def test_summary(self):
+        metrics = Metrics(window=100)
+        for i in range(1, 101):
+            metrics.add_span("decode", i / 1000)
+        metrics.add_span("translate_batch", 2)
+        metrics.add_batch(4, 40, 60)
+        summary = metrics.summary()
+        self.assertAlmostEqual(summary["stages"]["decode"]["p50"], 0.051)
+        self.assertAlmostEqual(summary["stages"]["decode"]["p99"], 0.1)
+        self.assertEqual(summary["stages"]["encode"]["count"], 0)
+        self.assertEqual(summary["output_tokens_per_second"], 30)
+        self.assertEqual(summary["batch_size"]["p50"], 4)
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        metrics.add_span("encode", 0.25)
+        metrics.add_batch(1, 5, 7)
+        text = metrics.prometheus()
+        self.assertIn('nllb_stage_seconds{stage="encode",quantile="0.5"} 0.250000', text)
+        self.assertIn('nllb_stage_seconds_count{stage="encode"} 1', text)
+        self.assertIn("nllb_output_tokens_total 7", text)
+
+        port = metrics.start_prometheus_server(0, "127.0.0.1")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                self.assertEqual(response.read().decode(), metrics.prometheus())
+        finally:
+            metrics.close()
+
+    def test_disabled(self):
+        tx = NLLB200Translator(config={"lazy_load": True})
+        self.assertIsNone(tx.metrics)
+        tx._resolve_languages("en", "es")
+
+    def test_shutdown_releases_port(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        tx = NLLB200Translator(config={"lazy_load": True, "metrics": True, "metrics_port": port,
+                                       "metrics_log_interval": 60})
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            self.assertEqual(response.status, 200)
+        tx.shutdown()
+        # a restarted service can bind the same port again
+        metrics = Metrics()
+        try:
+            self.assertEqual(metrics.start_prometheus_server(port), port)
+        finally:
+            metrics.close()
+
+    def test_translate_spans(self):
+        tx = NLLB200Translator(config={"metrics": True})
+        records = []
+        tx.metrics.add_callback(records.append)
+        tx.translate(["hello world", "good morning"], "es", "en")
+        self.assertEqual(len(records), 1)
+        self.assertEqual(set(records[0]["spans"]), set(STAGES))
+        self.assertEqual(records[0]["sentences"], 2)
+        self.assertGreater(records[0]["output_tokens"], 0)
+        self.assertGreater(tx.metrics.summary()["output_tokens_per_second"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
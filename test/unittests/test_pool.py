@@ -0,0 +1,93 @@
+import os
+import signal
+import sys
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb.pool import NLLBWorkerPool, _parse_cpulist, split_cores
+
+
+class CoreSplitTests(unittest.TestCase):
+    def test_parse_cpulist(self):
+        self.assertEqual(_parse_cpulist("0-3,8,10-11\n"), {0, 1, 2, 3, 8, 10, 11})
+
+    def test_split_single_node(self):
+        self.assertEqual(split_cores(4, [set(range(8))]), [[0, 1], [2, 3], [4, 5], [6, 7]])
+        # more workers than cores, they share
+        self.assertEqual(split_cores(3, [{0, 1}]), [[0], [1], [0]])
+
+    def test_split_numa(self):
+        nodes = [set(range(0, 4)), set(range(4, 8))]
+        # a worker never spans two nodes
+        self.assertEqual(split_cores(4, nodes), [[0, 1], [2, 3], [4, 5], [6, 7]])
+        self.assertEqual(split_cores(2, nodes), [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertEqual(split_cores(1, nodes), [[0, 1, 2, 3, 4, 5, 6, 7]])
+
+
+class WorkerPoolFailureTests(unittest.TestCase):
+    def test_model_not_loadable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tokenizer = join(tmp, "spm.model")
+            with open(tokenizer, "wb") as f:
+                f.write(b"not a model")
+            # an empty model directory, every worker fails to load it
+            with NLLBWorkerPool(config={"model": tmp, "tokenizer": tokenizer}, workers=2) as pool:
+                with self.assertRaises(RuntimeError) as ctx:
+                    pool.wait_until_ready(120)
+                self.assertIn("could not be loaded", str(ctx.exception))
+                self.assertIsNotNone(ctx.exception.__cause__)
+                self.assertFalse(pool.ready)
+                self.assertIs(pool.error, ctx.exception)
+                with self.assertRaises(RuntimeError):
+                    pool.translate("Hello World", "es", "en")
+
+
+class WorkerPoolTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.pool = NLLBWorkerPool(workers=2, chunk_tokens=8)
+        # raises if the model can not be loaded
+        if not cls.pool.wait_until_ready(600):
+            cls.pool.shutdown(wait=False)
+            raise RuntimeError("NLLB workers did not load the model in time")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.pool.shutdown()
+
+    def test_translate(self):
+        self.assertEqual(self.pool.translate("Hello World", "es", "en").lower(), "hola mundo")
+        # lists are split over the workers and come back in order
+        translated = self.pool.translate(["Hello World", "Good morning"] * 4, "es", "en")
+        self.assertEqual(len(translated), 8)
+        self.assertEqual(translated[0].lower(), "hola mundo")
+        self.assertEqual(translated[0::2], [translated[0]] * 4)
+        self.assertEqual(translated[1::2], [translated[1]] * 4)
+
+    def test_return_types(self):
+        # the same types as NLLB200Translator.translate
+        self.assertIsInstance(self.pool.translate("Hello World", "es", "en"), str)
+        self.assertIsInstance(self.pool.translate(["Hello World"], "es", "en"), str)
+        self.assertEqual(self.pool.translate([], "es", "en"), [])
+        self.assertEqual(len(self.pool.translate(["Hello World", "Good morning"], "es", "en")), 2)
+
+    def test_translate_many(self):
+        items = [("Hello World", "en", "es"),
+                 ("Hola Mundo", "es", "en"),
+                 ("Hello World", "en-us", "pt-pt")]
+        translated = self.pool.translate_many(items)
+        self.assertEqual(translated[0].lower(), "hola mundo")
+        self.assertEqual(translated[1].lower(), "hello world")
+
+    def test_worker_restart(self):
+        os.kill(self.pool._workers[0].process.pid, signal.SIGKILL)
+        # requests keep working while the worker is restarted
+        self.assertEqual(self.pool.translate("Hello World", "es", "en").lower(), "hola mundo")
+        self.assertTrue(self.pool.wait_until_ready(120))
+        self.assertTrue(all(w.process.is_alive() for w in self.pool._workers))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.pretranslate import (PretranslatedStore, build_store, collect_sentences,
+                                                     expand_line, find_resource_files)
+
+
+class UpperTranslator:
+    """ stands in for the model, records what it was asked to translate """
+    model = "upper"
+
+    def __init__(self):
+        self.translated = []
+
+    def _resolve_languages(self, source, target):
+        return NLLB200Translator.LANGUAGES.resolve(source), NLLB200Translator.LANGUAGES.resolve(target)
+
+    def _translate_sentences(self, sentences, src_lang, tgt_lang):
+        self.translated += sentences
+        return [f"{tgt_lang}:{s.upper()}" for s in sentences]
+
+
+def write(path, text):
+    os.makedirs(dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class PretranslateTests(unittest.TestCase):
+    def test_expand_line(self):
+        self.assertEqual(expand_line("(hello|hi)  [there]"), ["hello", "hello there", "hi", "hi there"])
+        self.assertEqual(expand_line("stop|halt", ".voc"), ["halt", "stop"])
+        self.assertEqual(expand_line("# comment"), [])
+        self.assertEqual(expand_line("   "), [])
+
+    def test_collect(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write(join(tmp, "skill-a", "locale", "en-us", "hello.dialog"), "hello there\n(hi|hello) there\n")
+            write(join(tmp, "skill-a", "locale", "en-us", "stop.voc"), "stop|halt\n")
+            write(join(tmp, "skill-a", "locale", "pt-pt", "hello.dialog"), "olá\n")
+            write(join(tmp, "skill-b", "locale", "en-US", "time.intent"), "what time is it\n")
+            files = list(find_resource_files([tmp], "en-us"))
+            self.assertEqual(len(files), 3)
+            self.assertEqual(collect_sentences(files), ["hello there", "hi there", "halt", "stop", "what time is it"])
+
+    def test_incremental_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = join(tmp, "store.db")
+            translator = UpperTranslator()
+            stats = build_store(translator, ["hello", "good  morning"], "en-us", ["es", "pt"], path=path)
+            self.assertEqual(stats, {"sentences": 2, "translated": 4, "kept": 0, "removed": 0})
+
+            translator = UpperTranslator()
+            stats = build_store(translator, ["hello", "good night"], "en-us", ["es", "pt"], path=path)
+            # only the changed line is translated again
+            self.assertEqual(translator.translated, ["good night", "good night"])
+            self.assertEqual(stats, {"sentences": 2, "translated": 2, "kept": 2, "removed": 2})
+
+            store = PretranslatedStore(path)
+            self.assertEqual(len(store), 4)
+            self.assertEqual(store.get(" good   night", "eng_Latn", "spa_Latn"), "spa_Latn:GOOD NIGHT")
+            self.assertIsNone(store.get("good morning", "eng_Latn", "spa_Latn"))
+            self.assertIsNone(store.get("hello", "eng_Latn", "deu_Latn"))
+            store.close()
+
+    def test_translate_uses_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = join(tmp, "store.db")
+            build_store(UpperTranslator(), ["turn on the lights"], "en", ["es"], path=path)
+            tx = NLLB200Translator(config={"lazy_load": True, "pretranslated_path": path})
+            self.assertEqual(tx.translate("turn on the lights ", "es-es", "en-us"), "spa_Latn:TURN ON THE LIGHTS")
+            self.assertEqual(tx.translate_many([("turn on the lights", "en", "es")]), ["spa_Latn:TURN ON THE LIGHTS"])
+            # answered without loading the model
+            self.assertFalse(tx.is_loaded)
+            self.assertEqual(tx.pretranslated.hits, 2)
+
+    def test_missing_store(self):
+        tx = NLLB200Translator(config={"lazy_load": True, "pretranslated_path": "/does/not/exist.db"})
+        self.assertIsNone(tx.pretranslated)
+
+
+if __name__ == '__main__':
+    unittest.main()
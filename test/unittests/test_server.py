@@ -0,0 +1,154 @@
+import asyncio
+import http.client
+import json
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, realpath
+from unittest import mock
+from urllib.parse import urlencode
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.server import TranslationServer
+
+
+class ServerTestCase(unittest.TestCase):
+    config = {}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.translator = NLLB200Translator(config=cls.config)
+        cls.server = TranslationServer(cls.translator, "127.0.0.1", 0, max_queue=8, max_wait_ms=50)
+        cls.loop = asyncio.new_event_loop()
+        threading.Thread(target=cls.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(cls.server.start(), cls.loop).result()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        asyncio.run_coroutine_threadsafe(cls.server.stop(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+
+    def request(self, method, path, payload=None, form=False):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=60)
+        headers, body = {}, None
+        if payload is not None:
+            if form:
+                body, headers["Content-Type"] = urlencode(payload, doseq=True), "application/x-www-form-urlencoded"
+            else:
+                body, headers["Content-Type"] = json.dumps(payload), "application/json"
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        result = response.status, json.loads(response.read())
+        conn.close()
+        return result
+
+
+class TranslationServerTests(ServerTestCase):
+    def test_translate(self):
+        status, result = self.request("POST", "/translate", {"q": "Hello World", "source": "en", "target": "es"})
+        self.assertEqual(status, 200)
+        self.assertEqual(result["translatedText"].lower(), "hola mundo")
+        status, result = self.request("POST", "/translate", {"q": ["Hello World", "Hello World"],
+                                                             "source": "en", "target": "es"})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(result["translatedText"]), 2)
+        # LibreTranslate clients may send form data
+        status, result = self.request("POST", "/translate", {"q": "Hello World", "source": "en", "target": "es"},
+                                      form=True)
+        self.assertEqual(status, 200)
+        self.assertEqual(result["translatedText"].lower(), "hola mundo")
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.request("POST", "/translate", {"q": "Hello", "source": "en"})[0], 400)
+        self.assertEqual(self.request("POST", "/translate", {"q": "Hello", "source": "auto", "target": "es"})[0], 400)
+        self.assertEqual(self.request("POST", "/translate", {"q": "Hello", "source": "en", "target": "xx"})[0], 400)
+        self.assertEqual(self.request("GET", "/translate")[0], 405)
+        self.assertEqual(self.request("GET", "/nothing")[0], 404)
+
+    def test_languages(self):
+        status, languages = self.request("GET", "/languages")
+        self.assertEqual(status, 200)
+        codes = {lang["code"] for lang in languages}
+        self.assertIn("en", codes)
+        self.assertIn("es", languages[0]["targets"])
+
+    def test_health(self):
+        status, health = self.request("GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertTrue(health["ready"])
+
+    def test_queue_full(self):
+        status, result = self.request("POST", "/translate", {"q": ["Hello"] * 9, "source": "en", "target": "es"})
+        self.assertEqual(status, 429)
+        self.assertIn("error", result)
+
+    def test_cross_client_batching(self):
+        payload = {"q": "Hello World", "source": "en", "target": "es"}
+        with mock.patch.object(self.translator, "translate_many", wraps=self.translator.translate_many) as batch:
+            with ThreadPoolExecutor(4) as pool:
+                responses = list(pool.map(lambda _: self.request("POST", "/translate", payload), range(4)))
+        self.assertTrue(all(status == 200 for status, _ in responses))
+        # requests arriving within the batching window share translate_many calls
+        self.assertLess(batch.call_count, 4)
+
+
+class BatchFailureTests(ServerTestCase):
+    config = {"lazy_load": True, "share_model": False}
+
+    def test_failed_sentence_isolated(self):
+        def translate_many(items):
+            if any(text == "bad" for text, _, _ in items):
+                raise RuntimeError("bad sentence")
+            return [text.upper() for text, _, _ in items]
+
+        texts = ["good", "bad", "fine", "well"]
+        with mock.patch.object(self.translator, "translate_many", side_effect=translate_many) as batch:
+            with ThreadPoolExecutor(len(texts)) as pool:
+                responses = list(pool.map(lambda q: self.request("POST", "/translate",
+                                                                 {"q": q, "source": "en", "target": "es"}), texts))
+        self.assertEqual(responses[1][0], 500)
+        for (status, result), text in zip(responses[:1] + responses[2:], texts[:1] + texts[2:]):
+            self.assertEqual(status, 200)
+            self.assertEqual(result["translatedText"], text.upper())
+        # merged into a batch that failed and was retried item by item
+        self.assertTrue(any(len(call.args[0]) > 1 for call in batch.call_args_list))
+        self.assertFalse(self.translator.is_loaded)
+
+
+class UnloadedServerTests(ServerTestCase):
+    config = {"lazy_load": True, "share_model": False}
+
+    def setUp(self) -> None:
+        # a model nobody loaded yet
+        self.translator = self.server.translator = NLLB200Translator(config=self.config)
+
+    def test_lazy_load(self):
+        self.assertFalse(self.translator.is_loaded)
+        status, health = self.request("GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertFalse(health["loaded"])
+        # the first translation loads the model instead of answering 503
+        status, result = self.request("POST", "/translate", {"q": "Hello World", "source": "en", "target": "es"})
+        self.assertEqual(status, 200)
+        self.assertEqual(result["translatedText"].lower(), "hola mundo")
+        self.assertTrue(self.translator.is_loaded)
+
+    def test_idle_unloaded(self):
+        self.translator.load()
+        self.translator.unload()
+        self.assertFalse(self.translator.ready)
+        status, result = self.request("POST", "/translate", {"q": "Hello World", "source": "en", "target": "es"})
+        self.assertEqual(status, 200)
+        self.assertEqual(result["translatedText"].lower(), "hola mundo")
+
+    def test_background_load(self):
+        with mock.patch.object(NLLB200Translator, "loading", new_callable=mock.PropertyMock, return_value=True):
+            self.assertEqual(self.request("GET", "/health")[0], 503)
+            self.assertEqual(self.request("POST", "/translate",
+                                          {"q": "Hello World", "source": "en", "target": "es"})[0], 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import gc
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.registry import SharedModelRegistry, MODEL_REGISTRY
+
+
+class SharedModelRegistryTests(unittest.TestCase):
+    def test_refcount(self):
+        registry = SharedModelRegistry()
+        loads = []
+
+        def factory():
+            loads.append(1)
+            return object()
+
+        a = registry.acquire("model", factory)
+        b = registry.acquire("model", factory)
+        self.assertIs(a, b)
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(registry.refcount("model"), 2)
+        registry.release("model")
+        self.assertIn("model", registry)
+        registry.release("model")
+        self.assertNotIn("model", registry)
+        # releasing unknown keys is a no-op
+        registry.release("model")
+
+    def test_concurrent_acquire(self):
+        registry = SharedModelRegistry()
+        loads = []
+
+        def factory():
+            loads.append(1)
+            return object()
+
+        with ThreadPoolExecutor(16) as pool:
+            models = list(pool.map(lambda _: registry.acquire("model", factory), range(64)))
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len({id(m) for m in models}), 1)
+        self.assertEqual(registry.refcount("model"), 64)
+
+
+class SharedTranslatorTests(unittest.TestCase):
+    def test_instances_share_model(self):
+        # a setting no other test uses, these are the only holders of the model
+        config = {"inter_threads": 2}
+        a = NLLB200Translator(config=config)
+        b = NLLB200Translator(config=config)
+        self.assertIs(a._translator, b._translator)
+        self.assertIs(a._sp, b._sp)
+        key = a._model_key
+        self.assertEqual(MODEL_REGISTRY.refcount(key), 2)
+        self.assertEqual(a.translate("Hello World", "es", "en"), b.translate("Hello World", "es", "en"))
+
+        # a different compute type needs its own copy of the weights
+        c = NLLB200Translator(config={**config, "compute_type": "int8_float32"})
+        self.assertIsNot(a._translator, c._translator)
+
+        del a, b, c
+        gc.collect()
+        self.assertNotIn(key, MODEL_REGISTRY)
+
+    def test_micro_batching_released(self):
+        a = NLLB200Translator()
+        gc.collect()  # instances left over by other tests
+        refs = MODEL_REGISTRY.refcount(a._model_key)
+        b = NLLB200Translator(config={"micro_batching": True})
+        b.translate("Hello World", "es", "en")
+        self.assertEqual(MODEL_REGISTRY.refcount(a._model_key), refs + 1)
+        # the scheduler thread does not keep the translator alive
+        scheduler = b.scheduler
+        del b
+        gc.collect()
+        self.assertEqual(MODEL_REGISTRY.refcount(a._model_key), refs)
+        scheduler._thread.join(5)
+        self.assertFalse(scheduler._thread.is_alive())
+
+    def test_shutdown(self):
+        a = NLLB200Translator()
+        gc.collect()  # instances left over by other tests
+        refs = MODEL_REGISTRY.refcount(a._model_key)
+        with NLLB200Translator(config={"micro_batching": True, "idle_timeout": 60}) as b:
+            b.translate("Hello World", "es", "en")
+            self.assertEqual(MODEL_REGISTRY.refcount(a._model_key), refs + 1)
+        self.assertEqual(MODEL_REGISTRY.refcount(a._model_key), refs)
+        self.assertFalse(b.is_loaded)
+        self.assertFalse(b.scheduler._thread.is_alive())
+        # released once, garbage collection does not release it again
+        del b
+        gc.collect()
+        self.assertEqual(MODEL_REGISTRY.refcount(a._model_key), refs)
+
+    def test_failed_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # an empty model directory, the tokenizer loads but the model does not
+            tx = NLLB200Translator(config={"model": tmp, "lazy_load": True})
+            sp_key = ("tokenizer", os.path.realpath(tx.download_tokenizer(tx.tokenizer)))
+            gc.collect()
+            refs = MODEL_REGISTRY.refcount(sp_key)
+            with self.assertRaises(Exception):
+                tx.load()
+            self.assertEqual(MODEL_REGISTRY.refcount(sp_key), refs)
+
+    def test_opt_out(self):
+        a = NLLB200Translator()
+        b = NLLB200Translator(config={"share_model": False})
+        self.assertIsNot(a._translator, b._translator)
+        self.assertIsNone(b._model_key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import sys
+import unittest
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+
+class StreamingTranslateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # streaming decodes greedily, compare against greedy blocking translations
+        cls.translator = NLLB200Translator(config={"beam_size": 1, "cache": True})
+
+    def test_stream_matches_translate(self):
+        for utt in ["Hello World", "The weather today is sunny with a high of twenty degrees"]:
+            chunks = list(self.translator.translate_stream(utt, "es", "en"))
+            self.assertEqual("".join(chunks), self.translator.translate(utt, "es", "en"))
+
+    def test_no_language_prefix(self):
+        chunks = list(self.translator.translate_stream("Hello World", "es", "en"))
+        self.assertTrue(chunks)
+        self.assertNotIn("spa_Latn", chunks[0])
+        self.assertEqual("".join(chunks).lower(), "hola mundo")
+
+    def test_cached(self):
+        utt = "Good morning to all of you"
+        translation = "".join(self.translator.translate_stream(utt, "es", "en"))
+        self.assertEqual(self.translator.cache.get(self.translator._cache_key(utt, "eng_Latn", "spa_Latn")),
+                         translation)
+        hits = self.translator.cache.stats["hits"]
+        self.assertEqual(list(self.translator.translate_stream(utt, "es", "en")), [translation])
+        self.assertEqual(self.translator.cache.stats["hits"], hits + 1)
+
+    def test_close_releases_model(self):
+        chunks = self.translator.translate_stream("The weather today is sunny with a high of twenty degrees",
+                                                  "es", "en")
+        next(chunks)
+        self.assertEqual(self.translator._in_flight, 1)
+        chunks.close()
+        self.assertEqual(self.translator._in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import unittest
+from os.path import dirname, realpath
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.translation_memory import SLOT, TranslationMemory
+
+
+class TranslationMemoryTests(unittest.TestCase):
+    def test_mask(self):
+        tm = TranslationMemory()
+        self.assertEqual(tm.mask("call  Anna at 5:30"), (f"call {SLOT} at {SLOT}", ["Anna", "5:30"]))
+        # the first word and "I" are not entities
+        self.assertEqual(tm.mask("Should I go"), ("Should I go", []))
+        tm = TranslationMemory(mask_entities=False)
+        self.assertEqual(tm.mask("call Anna at 5"), (f"call Anna at {SLOT}", ["5"]))
+
+    def test_substitution(self):
+        tm = TranslationMemory(threshold=1.0)
+        tm.put("remind me to call Anna at 5", "recuérdame llamar a Anna a las 5", "eng_Latn", "spa_Latn")
+        self.assertEqual(tm.get("remind me to call Peter at 7", "eng_Latn", "spa_Latn"),
+                         "recuérdame llamar a Peter a las 7")
+        # other language pair
+        self.assertIsNone(tm.get("remind me to call Peter at 7", "eng_Latn", "por_Latn"))
+        # fuzzy matching disabled
+        self.assertIsNone(tm.get("please remind me to call Peter at 7", "eng_Latn", "spa_Latn"))
+        self.assertEqual(tm.stats, {"hits": 1, "fuzzy_hits": 0, "misses": 2, "entries": 1})
+
+    def test_values_translated(self):
+        tm = TranslationMemory()
+        # "5.5" became "5,5", the translation can not be reused for other numbers
+        tm.put("it is 5.5 degrees", "hace 5,5 grados", "eng_Latn", "spa_Latn")
+        self.assertEqual(tm.get("it is 5.5 degrees", "eng_Latn", "spa_Latn"), "hace 5,5 grados")
+        self.assertIsNone(tm.get("it is 7.5 degrees", "eng_Latn", "spa_Latn"))
+
+    def test_threshold(self):
+        tm = TranslationMemory(threshold=0.7)
+        tm.put("set a timer for 5 minutes", "pon un temporizador de 5 minutos", "eng_Latn", "spa_Latn")
+        self.assertEqual(tm.get("set the timer for 10 minutes", "eng_Latn", "spa_Latn"),
+                         "pon un temporizador de 10 minutos")
+        self.assertIsNone(tm.get("turn off the lights", "eng_Latn", "spa_Latn"))
+        # a different number of slots never matches
+        self.assertIsNone(tm.get("set a timer for 5 minutes and 10 seconds", "eng_Latn", "spa_Latn"))
+        self.assertEqual(tm.fuzzy_hits, 1)
+
+    def test_no_fuzzy_by_default(self):
+        tm = TranslationMemory()
+        tm.put("please remind me to call the plumber tomorrow", "recuérdame llamar al fontanero mañana",
+               "eng_Latn", "spa_Latn")
+        # almost the same characters, the opposite meaning
+        self.assertIsNone(tm.get("please remind me not to call the plumber tomorrow", "eng_Latn", "spa_Latn"))
+        self.assertEqual(tm.fuzzy_hits, 0)
+
+    def test_eviction(self):
+        tm = TranslationMemory(max_entries=2)
+        tm.put("good morning", "buenos días", "eng_Latn", "spa_Latn")
+        tm.put("good night", "buenas noches", "eng_Latn", "spa_Latn")
+        tm.get("good morning", "eng_Latn", "spa_Latn")  # "good night" is now least recently used
+        tm.put("thank you", "gracias", "eng_Latn", "spa_Latn")
+        self.assertEqual(len(tm), 2)
+        self.assertIsNone(tm.get("good night", "eng_Latn", "spa_Latn"))
+        self.assertEqual(tm.get("good morning", "eng_Latn", "spa_Latn"), "buenos días")
+
+    def test_translator(self):
+        tx = NLLB200Translator(config={"lazy_load": True, "translation_memory": True})
+        tx.memory.put("set a timer for 5 minutes", "pon un temporizador de 5 minutos", "eng_Latn", "spa_Latn")
+        self.assertEqual(tx.translate("set a timer for 10 minutes", "es", "en"),
+                         "pon un temporizador de 10 minutos")
+        self.assertFalse(tx.is_loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
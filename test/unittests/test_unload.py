@@ -0,0 +1,65 @@
+import sys
+import time
+import unittest
+from os.path import dirname, realpath
+from unittest import mock
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+
+
+class UnloadTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # shared models are only unloaded by their last holder
+        cls.translator = NLLB200Translator(config={"share_model": False})
+
+    def test_unload_reload(self):
+        expected = self.translator.translate("Hello World", "es", "en")
+        rss = self.translator.unload()
+        self.assertFalse(self.translator.is_loaded)
+        self.assertFalse(self.translator.ready)
+        self.assertIn("rss_before_mb", rss)
+        self.assertLess(rss["rss_after_mb"], rss["rss_before_mb"])
+        # reloads transparently
+        self.assertEqual(self.translator.translate("Hello World", "es", "en"), expected)
+        self.assertTrue(self.translator.is_loaded)
+        # nothing to unload twice
+        self.translator.unload()
+        self.assertEqual(self.translator.unload(), {})
+        self.translator.load()
+        self.assertTrue(self.translator.is_loaded)
+
+    def test_unload_skipped(self):
+        tx = NLLB200Translator(config={"share_model": False})
+        model = tx._translator
+        # ctranslate2 may keep the model loaded, eg. while finishing a translation
+        tx._translator = mock.Mock(model_is_loaded=True)
+        self.assertEqual(tx.unload(), {})
+        tx._translator.unload_model.assert_called_once()
+        self.assertTrue(tx.ready)
+        tx._translator = model
+        # an already loaded model is marked ready again
+        tx._ready.clear()
+        tx.load()
+        self.assertTrue(tx.ready)
+
+    def test_idle_timeout(self):
+        tx = NLLB200Translator(config={"idle_timeout": 1, "share_model": False})
+        tx.translate("Hello World", "es", "en")
+        self.assertTrue(tx.is_loaded)
+        time.sleep(2.5)
+        self.assertFalse(tx.is_loaded)
+        self.assertEqual(tx.translate("Hello World", "es", "en").lower(), "hola mundo")
+
+    def test_memory_budget(self):
+        # the process never exceeds this budget, the model is kept
+        tx = NLLB200Translator(config={"idle_timeout": 1, "memory_budget_mb": 1024 * 1024,
+                                       "share_model": False})
+        tx.translate("Hello World", "es", "en")
+        time.sleep(2.5)
+        self.assertTrue(tx.is_loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+
+import sentencepiece as spm
+
+sys.path.append(dirname(dirname(dirname(realpath(__file__)))))
+from ovos_translate_plugin_nllb import NLLB200Translator
+from ovos_translate_plugin_nllb.vmap import build_vocab, load_vocab, vmap_model, vocab_from_corpus, \
+    vocab_from_script, vocab_path, write_vocab
+
+PIECES = ["<unk>", "<s>", "</s>", "▁hola", "▁mundo", "ñ", "▁привет", "мир", "▁123", ",", "▁",
+          "eng_Latn", "spa_Latn", "rus_Cyrl"]
+
+
+class VocabTests(unittest.TestCase):
+    def test_script(self):
+        latin = vocab_from_script(PIECES, "Latn")
+        self.assertTrue({"▁hola", "ñ", "▁123", ","} <= latin)
+        self.assertFalse({"▁привет", "мир"} & latin)
+        cyrillic = vocab_from_script(PIECES, "Cyrl")
+        self.assertTrue({"▁привет", "мир", "▁123"} <= cyrillic)
+        self.assertNotIn("▁hola", cyrillic)
+        with self.assertRaises(ValueError):
+            vocab_from_script(PIECES, "Xxxx")
+
+    def test_corpus(self):
+        corpus = [["▁hola", "▁mundo"], ["▁hola", ","]]
+        self.assertEqual(vocab_from_corpus(corpus), {"▁hola", "▁mundo", ","})
+        self.assertEqual(vocab_from_corpus(corpus, min_count=2), {"▁hola"})
+
+    def test_build_vocab(self):
+        vocab = build_vocab("spa_Latn", PIECES)
+        # its own language code, no other
+        self.assertIn("spa_Latn", vocab)
+        self.assertNotIn("eng_Latn", vocab)
+        self.assertTrue({"<s>", "</s>", "<unk>", "<pad>"} <= vocab)
+        # digits and punctuation survive a corpus that lacks them
+        vocab = build_vocab("rus_Cyrl", PIECES, corpus=[["▁привет"]])
+        self.assertTrue({"▁привет", "▁123", ",", "rus_Cyrl", "</s>"} <= vocab)
+        self.assertNotIn("мир", vocab)
+
+    def test_write_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = vocab_path("spa_Latn", tmp)
+            self.assertEqual(path, join(tmp, "spa_Latn.vocab"))
+            write_vocab(path, {"▁hola", "</s>"})
+            self.assertEqual(load_vocab(path), {"▁hola", "</s>"})
+
+
+class VmapModelTests(unittest.TestCase):
+    def test_view(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model = join(tmp, "model")
+            os.makedirs(model)
+            for name in ("model.bin", "config.json", "shared_vocabulary.json"):
+                with open(join(model, name), "w") as f:
+                    f.write(name)
+            view = vmap_model(model, ["▁hola", "</s>"], base_path=join(tmp, "views"))
+            self.assertTrue(os.path.islink(join(view, "model.bin")))
+            self.assertEqual(os.path.realpath(join(view, "model.bin")), os.path.realpath(join(model, "model.bin")))
+            with open(join(view, "vmap.txt"), encoding="utf-8") as f:
+                self.assertEqual(f.read(), "\t</s> ▁hola\n")
+            # same tokens, same view
+            self.assertEqual(vmap_model(model, ["</s>", "▁hola"], base_path=join(tmp, "views")), view)
+            self.assertNotEqual(vmap_model(model, ["▁mundo"], base_path=join(tmp, "views")), view)
+
+
+class TranslatorVmapTests(unittest.TestCase):
+    def test_use_vmap(self):
+        tx = NLLB200Translator(config={"lazy_load": True})
+        self.assertFalse(tx._use_vmap(["spa_Latn"]))
+        tx._vmap_langs = frozenset({"spa_Latn", "por_Latn"})
+        self.assertTrue(tx._use_vmap(["spa_Latn", "por_Latn"]))
+        self.assertFalse(tx._use_vmap(["spa_Latn", "rus_Cyrl"]))
+
+    def test_missing_vocab(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tx = NLLB200Translator(config={"lazy_load": True, "vmap_dir": tmp})
+            self.assertEqual(tx._vmap_model("/some/model", ["es"]), ("/some/model", frozenset()))
+
+    def test_translate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sp = spm.SentencePieceProcessor()
+            sp.load(NLLB200Translator.download_tokenizer("flores200_sacrebleu_tokenizer_spm"))
+            pieces = [sp.id_to_piece(i) for i in range(sp.get_piece_size())]
+            write_vocab(vocab_path("spa_Latn", tmp), build_vocab("spa_Latn", pieces))
+            tx = NLLB200Translator(config={"vmap_languages": ["es"], "vmap_dir": tmp})
+            self.assertEqual(tx._vmap_langs, frozenset({"spa_Latn"}))
+            self.assertEqual(tx.translate("hello world", "es", "en"), "hola mundo")
+            # not covered by the vocabulary map, translated with the full vocabulary
+            self.assertTrue(tx.translate("hello world", "ru", "en"))
+
+
+if __name__ == '__main__':
+    unittest.main()